@@ -1,97 +1,424 @@
+import argparse
+import collections
 import datetime
+import importlib
+import logging
+import logging.handlers
 import math
+import multiprocessing
+import socket
 import sys
 import threading
 import time
-from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPainter, QColor, QFont, QPen
-from dronekit import connect, VehicleMode, LocationGlobalRelative
-from pymavlink import mavutil
-from flask import Flask, render_template, jsonify
-import folium
-import webview
-from math import sin, cos, sqrt, atan2, radians
-
-
-app = Flask(__name__)
-
-# Bağlantıyı global olarak tanımlayın
-vehicle = None
-
-# Aracınıza bağlanın
-def connect_vehicle():
-    global vehicle
-    connection_string = '127.0.0.1:14550'  # SITL bağlantı adresi
-    print("Bağlanıyor...")
-    vehicle = connect(connection_string, wait_ready=True)
-    print("Bağlandı")
-
-# Flask uygulamasını başlatın
-@app.route('/')
-def index():
-    initial_location = vehicle.location.global_frame
-    drone_map = folium.Map(location=[initial_location.lat, initial_location.lon], zoom_start=15)
-    map_html = 'templates/map.html'
-    drone_map.save(map_html)
-    return render_template('index.html', initial_location=initial_location)
-
-@app.route('/location')
-def location():
-    current_location = vehicle.location.global_frame
-    return jsonify(lat=current_location.lat, lon=current_location.lon)
-
-def start_flask_app():
-    app.run(debug=True, use_reloader=False)
+
+# Seconds spent importing each module, reported with --import-times; a module shared by several is
+# counted where it is first imported. NumPy and everything built on it (telemetry_store, strip_chart,
+# replay, geofence, geodesy, survey) and the map stack (Flask, folium, pywebview) are loaded through
+# _timed_import when first used, not here.
+IMPORT_TIMES = collections.OrderedDict()
+
+
+class _ImportTimer(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            IMPORT_TIMES.setdefault(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def _timed_import(name):
+    module = sys.modules.get(name)
+    if module is None:
+        with _ImportTimer(name):
+            module = importlib.import_module(name)
+    return module
+
+
+with _ImportTimer('PyQt5'):
+    from PyQt5 import QtCore, QtGui, QtWidgets
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QPainter, QColor, QFont, QPen
+with _ImportTimer('pymavlink'):
+    from pymavlink import mavutil
+with _ImportTimer('mavlink_core'):
+    from mavlink_core import MavlinkCore
+with _ImportTimer('mission'):
+    from mission import FENCE, MissionDispatcher, MissionEditor
+with _ImportTimer('parameters'):
+    from parameters import ParameterEditor
+with _ImportTimer('flight_recorder, stream_rates, link_health, setpoint'):
+    from flight_recorder import FlightRecorder
+    from stream_rates import StreamRateManager
+    from link_health import LinkHealthMonitor
+    from setpoint import SetpointStreamer
+with _ImportTimer('perf_overlay, profiling'):
+    from perf_overlay import PerformanceOverlay
+    import profiling
+
+
+def start_map_server(lat=0.0, lon=0.0, host='127.0.0.1', port=5000):
+    map_server = _timed_import('map_server')
+    flask_thread = threading.Thread(target=map_server.start_flask_app, args=(lat, lon, host, port))
+    flask_thread.daemon = True
+    flask_thread.start()
+    return map_server
+
+
+def _map_window_main(host, port):
+    import webview
+    # The server may still be rendering the folium page
+    for _ in range(100):
+        try:
+            socket.create_connection((host, port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+    webview.create_window("Harita Görüntüsü", f"http://{host}:{port}")
+    webview.start()
+
+
+def open_map_window(host='127.0.0.1', port=5000):
+    # pywebview needs the main thread of its process; in a child process it never blocks the Qt loop
+    process = multiprocessing.Process(target=_map_window_main, args=(host, port))
+    process.daemon = True
+    process.start()
+    return process
+
 
 class AutotuneThread(QtCore.QThread):
-    def __init__(self, vehicle):
+    def __init__(self, vehicle, rate=10):
         super().__init__()
         self.vehicle = vehicle
+        self.streamer = SetpointStreamer(vehicle, rate)  # rate in Hz, guided mode wants >= 2
 
     def run(self):
         self.send_ned_velocity(5, 0, 0, 25)
 
     def send_ned_velocity(self, velocity_x, velocity_y, velocity_z, duration):
-        msg = self.vehicle.message_factory.set_position_target_local_ned_encode(
-            0,  # time_boot_ms (not used)
-            0, 0,  # target system, target component
-            mavutil.mavlink.MAV_FRAME_LOCAL_NED,  # frame
-            0b0000111111000111,  # type_mask (only speeds enabled)
-            0, 0, 0,  # x, y, z positions (not used)
-            velocity_x, velocity_y, velocity_z,  # m/s
-            0, 0, 0,  # x, y, z acceleration (not used)
-            0, 0)  # yaw, yaw_rate (not used)
-
-        for _ in range(0, duration):
-            self.vehicle.send_mavlink(msg)
-            time.sleep(1)
+        # Velocity (m/s, NED) held for duration seconds; the streamer keeps the vehicle's setpoint fresh
+        self.streamer.set_velocity(velocity_x, velocity_y, velocity_z)
+        self.streamer.run_for(duration)
+
+
+_MISSING = object()
+
 
 class DataFetcher(QtCore.QThread):
     dataFetched = QtCore.pyqtSignal(object)
 
-    def __init__(self, vehicle):
+    # dronekit attribute name -> key used in the emitted data dict
+    ATTRIBUTES = {
+        'attitude': 'attitude',
+        'location.global_relative_frame': 'location',
+        'battery': 'battery',
+        'groundspeed': 'groundspeed',
+        'airspeed': 'airspeed',
+        'gps_0': 'gps',
+        'mode': 'mode',
+        'armed': 'armed',
+        'home_location': 'home_location',
+        'location.global_frame': 'current_location',
+    }
+
+    # Emits of all fetchers queued for the GUI thread but not delivered yet; grows when the GUI stalls
+    backlog = 0
+    _backlog_lock = threading.Lock()
+
+    def __init__(self, vehicle, max_rate=30, store=None):
         super().__init__()
         self.vehicle = vehicle
+        self.max_rate = max_rate
+        self.store = store  # TelemetryStore keeping the history of every change, at full rate
+        self.state = {}  # last emitted value per key
+        self._pending = {}  # coalesced changes waiting for the next emit
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._last_emit = 0.0
+        # Lives in the GUI thread, so this slot runs when the emit has made it through the event queue
+        self.dataFetched.connect(self._delivered)
+
+    @staticmethod
+    def _add_backlog(n):
+        with DataFetcher._backlog_lock:
+            DataFetcher.backlog += n
+            profiling.gauge('fetcher.backlog', DataFetcher.backlog)
+
+    def _delivered(self, _data):
+        self._add_backlog(-1)
+
+    @staticmethod
+    def _snapshot(value):
+        # dronekit value objects have no __eq__, compare their fields instead
+        if hasattr(value, '__dict__'):
+            return tuple(sorted(vars(value).items()))
+        return value
+
+    def publish(self, key, value):
+        # Called from the link thread; only queues values that actually changed
+        snapshot = self._snapshot(value)
+        with self._lock:
+            pending = key in self._pending
+            last = self._pending[key] if pending else self.state.get(key, _MISSING)
+            if self._snapshot(last) == snapshot:
+                return
+            if pending:
+                profiling.count('fetcher.superseded')  # replaced before the GUI saw it
+            self._pending[key] = value
+        if self.store is not None:
+            self.store.record(key, value)
+        self._wake.set()
+
+    def _on_attribute(self, _vehicle, attr_name, value):
+        key = self.ATTRIBUTES.get(attr_name)
+        if key is not None:
+            self.publish(key, value)
+
+    def snapshot(self):
+        # Full current state, used when the HUD is retargeted to this vehicle
+        with self._lock:
+            data = dict(self.state)
+            data.update(self._pending)
+        return data
+
+    def set_max_rate(self, max_rate):
+        self.max_rate = max_rate
+        self._wake.set()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        self.wait()
 
     def run(self):
-        while True:
-            data = {
-                'attitude': self.vehicle.attitude,
-                'location': self.vehicle.location.global_relative_frame,
-                'battery': self.vehicle.battery,
-                'groundspeed': self.vehicle.groundspeed,
-                'airspeed': self.vehicle.airspeed,
-                'gps': self.vehicle.gps_0,
-                'mode': self.vehicle.mode,
-                'armed': self.vehicle.armed,
-                'home_location': self.vehicle.home_location,
-                'current_location': self.vehicle.location.global_frame
-            }
+        self._running = True
+        for attr_name, key in self.ATTRIBUTES.items():
+            self.vehicle.add_attribute_listener(attr_name, self._on_attribute)
+        # Seed the HUD with whatever the vehicle already knows
+        self.publish('attitude', self.vehicle.attitude)
+        self.publish('location', self.vehicle.location.global_relative_frame)
+        self.publish('battery', self.vehicle.battery)
+        self.publish('groundspeed', self.vehicle.groundspeed)
+        self.publish('airspeed', self.vehicle.airspeed)
+        self.publish('gps', self.vehicle.gps_0)
+        self.publish('mode', self.vehicle.mode)
+        self.publish('armed', self.vehicle.armed)
+        self.publish('home_location', self.vehicle.home_location)
+        self.publish('current_location', self.vehicle.location.global_frame)
+
+        try:
+            while self._running:
+                self._wake.wait()
+                self._wake.clear()
+                if not self._running:
+                    break
+                # Rate limit: changes arriving inside the window are merged into one emit
+                if self.max_rate:
+                    delay = self._last_emit + 1.0 / self.max_rate - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                with profiling.span('fetcher.iteration'):
+                    with self._lock:
+                        delta, self._pending = self._pending, {}
+                        self.state.update(delta)
+                    if delta:
+                        self._last_emit = time.monotonic()
+                        self._add_backlog(1)
+                        self.dataFetched.emit(delta)
+        finally:
+            for attr_name in self.ATTRIBUTES:
+                self.vehicle.remove_attribute_listener(attr_name, self._on_attribute)
+
+class CommandDispatcher(QtCore.QObject):
+    commandFinished = QtCore.pyqtSignal(str, bool, str)  # name, accepted, detail
+
+    def __init__(self, vehicle):
+        super().__init__()
+        self.vehicle = vehicle
+
+    def command_long(self, name, command, *params, timeout=1.5, retries=3):
+        # Never blocks: the command runs on the MAVLink core loop and reports back through commandFinished
+        future = self.vehicle.call(self.vehicle.command_long(command, *params, timeout=timeout, retries=retries))
+        future.add_done_callback(lambda f: self._finished(name, f))
+
+    def _finished(self, name, future):
+        if future.exception() is not None:
+            self.commandFinished.emit(name, False, str(future.exception()))
+            return
+        result = future.result()
+        if result is None:
+            self.commandFinished.emit(name, False, "zaman aşımı")
+        else:
+            detail = mavutil.mavlink.enums['MAV_RESULT'][result].name.replace('MAV_RESULT_', '')
+            self.commandFinished.emit(name, result == mavutil.mavlink.MAV_RESULT_ACCEPTED, detail)
+
+    def set_mode(self, mode_name):
+        mode_mapping = self.vehicle.mode_mapping()
+        if mode_name not in mode_mapping:
+            self.commandFinished.emit(mode_name, False, "bilinmeyen mod")
+            return
+        self.command_long(mode_name, mavutil.mavlink.MAV_CMD_DO_SET_MODE,
+                          mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED, mode_mapping[mode_name])
+
+    def arm(self, armed=True):
+        self.command_long("ARM" if armed else "DISARM", mavutil.mavlink.MAV_CMD_COMPONENT_ARM_DISARM,
+                          1 if armed else 0)
+
+    def takeoff(self, altitude):
+        self.command_long("TAKEOFF", mavutil.mavlink.MAV_CMD_NAV_TAKEOFF, 0, 0, 0, 0, 0, 0, altitude)
+
+
+class VehicleLink(object):
+    def __init__(self, name, connection_string, vehicle, max_rate, stream_profile='varsayilan'):
+        self.name = name
+        self.connection_string = connection_string
+        self.vehicle = vehicle
+        # The MAVLink core reads every link on one asyncio loop; the fetcher is this link's worker
+        # and its pending dict is the bounded queue (one slot per telemetry key)
+        # Records from the first message on, so NumPy comes in with the first link rather than a menu
+        self.store = _timed_import('telemetry_store').TelemetryStore()
+        self.fetcher = DataFetcher(vehicle, max_rate=max_rate, store=self.store)
+        self.commands = CommandDispatcher(vehicle)
+        self.missions = MissionDispatcher(vehicle)
+        self.stream_rates = StreamRateManager(vehicle, stream_profile)
+        self.health = LinkHealthMonitor()
+        self.recorder = None  # FlightRecorder, when the fleet records tlogs
+        self.fence_status = None  # geofence.FenceStatus of the last position checked
+
+
+class FleetManager(QtCore.QObject):
+    linkAdded = QtCore.pyqtSignal(object)
+    linkFailed = QtCore.pyqtSignal(str, str)
+    linkRemoved = QtCore.pyqtSignal(int)  # index in links / the vehicle selector
+    activeChanged = QtCore.pyqtSignal(object)
+    dataFetched = QtCore.pyqtSignal(object)  # deltas of the active vehicle only
+    _openFailed = QtCore.pyqtSignal(object, str)
+    commandFinished = QtCore.pyqtSignal(object, str, bool, str)  # link, name, accepted, detail
+    healthUpdated = QtCore.pyqtSignal(object)  # link_health.LinkStats of the active vehicle
+    parametersLoaded = QtCore.pyqtSignal(object)  # link, after its cache load or download finished
+    fenceAlert = QtCore.pyqtSignal(object, object)  # link, geofence.FenceStatus whenever its state changes
+
+    def __init__(self, active_rate=30, background_rate=1, record_dir=None, stream_profile='varsayilan',
+                 parent=None):
+        super().__init__(parent)
+        self.active_rate = active_rate
+        self.background_rate = background_rate  # vehicles not shown on the HUD
+        self.record_dir = record_dir  # every link writes a tlog here when set
+        self.stream_profile = stream_profile  # stream_rates.PROFILES key requested from every vehicle
+        self.links = []
+        self.active = None
+        self.geofence = None  # geofence.Geofence every vehicle's position is checked against
+        self.core = MavlinkCore()
+        self.core.start()
+        self._openFailed.connect(self._open_failed)
+        self._health_timer = QtCore.QTimer(self)
+        self._health_timer.timeout.connect(self._check_health)
+        self._health_timer.start(1000)
+
+    def connect_vehicle(self, connection_string, baud=57600):
+        # Opening the port happens on the core loop, the GUI never waits for it or for a heartbeat
+        vehicle = self.core.connect(connection_string, baud=baud)
+        vehicle.on_error = lambda error: self._openFailed.emit(vehicle, str(error))
+        return self.add_vehicle(connection_string, vehicle)
+
+    def _open_failed(self, vehicle, error):
+        for link in self.links:
+            if link.vehicle is vehicle:
+                self.linkFailed.emit(link.connection_string, error)
+                self.remove_vehicle(link)
+                break
+
+    def add_vehicle(self, connection_string, vehicle):
+        name = f"#{len(self.links) + 1} {connection_string}"
+        link = VehicleLink(name, connection_string, vehicle, self.background_rate, self.stream_profile)
+        link.fetcher.dataFetched.connect(lambda data, link=link: self._on_data(link, data))
+        link.commands.commandFinished.connect(
+            lambda name, accepted, detail, link=link: self.commandFinished.emit(link, name, accepted, detail))
+        self.links.append(link)
+        link.health.attach(vehicle)
+        vehicle.parameters.add_listener(
+            lambda name, _value, link=link: self.parametersLoaded.emit(link) if name is None else None)
+        if self.record_dir:
+            link.recorder = FlightRecorder(self.record_dir, prefix=f"arac{len(self.links)}")
+            link.recorder.start()
+            link.recorder.attach(vehicle)
+        link.fetcher.start()
+        link.stream_rates.start()
+        self.linkAdded.emit(link)
+        if self.active is None:
+            self.set_active(link)
+        return link
+
+    def remove_vehicle(self, link):
+        link.stream_rates.stop()
+        link.health.detach(link.vehicle)
+        link.fetcher.stop()
+        if link.recorder is not None:
+            link.recorder.detach(link.vehicle)
+            link.recorder.stop()
+        link.vehicle.close()
+        index = self.links.index(link)
+        self.links.remove(link)
+        self.linkRemoved.emit(index)
+        if link is self.active:
+            self.set_active(self.links[0] if self.links else None)
+
+    def set_active(self, link):
+        if link is self.active:
+            return
+        if self.active is not None:
+            self.active.fetcher.set_max_rate(self.background_rate)
+        self.active = link
+        if link is not None:
+            link.fetcher.set_max_rate(self.active_rate)
+        self.activeChanged.emit(link)
+
+    def active_vehicle(self):
+        return self.active.vehicle if self.active is not None else None
+
+    def _check_health(self):
+        for link in self.links:
+            link.health.request_timesync()
+            stats = link.health.stats()
+            if stats.rx_packets:
+                link.stream_rates.update_link_quality(stats.quality)
+            if link is self.active:
+                self.healthUpdated.emit(stats)
+
+    def set_geofence(self, fence):
+        self.geofence = fence
+        for link in self.links:
+            link.fence_status = None
+            location = link.fetcher.snapshot().get('current_location')
+            if location is not None:
+                self._check_fence(link, location)
+
+    def _check_fence(self, link, location):
+        if location.lat is None or location.lon is None:
+            return
+        status = self.geofence.check(location.lat, location.lon)
+        # Alerts only when the state or the zone changes, not for every position
+        previous = link.fence_status[:2] if link.fence_status is not None else (_timed_import('geofence').OK, None)
+        link.fence_status = status
+        if status[:2] != previous:
+            self.fenceAlert.emit(link, status)
+
+    def _on_data(self, link, data):
+        # Background vehicles are checked too, at their lower rate
+        if self.geofence is not None and 'current_location' in data:
+            self._check_fence(link, data['current_location'])
+        if link is self.active:
             self.dataFetched.emit(data)
-            self.msleep(100)  # 100 ms delay
+
 
 class HorizonIndicator(QtWidgets.QWidget):
+    LADDER_HALF_WIDTH = 130  # pitch ladder lines span +-55 px, labels reach about +-110 px
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.pitch = 0.0
@@ -99,8 +426,22 @@ class HorizonIndicator(QtWidgets.QWidget):
         self.yaw = 0.0
         self.altitude = 0.0
         self.battery_voltage = 0.0
-        self.battery_current = 0.0
-        self.battery_percent = 0.0
+        self.battery_current = None  # None when the autopilot does not measure it (SYS_STATUS -1)
+        self.battery_percent = None
+
+        # Painting resources are created once instead of on every frame
+        self.sky_color = QColor(0, 102, 204)  # Blue color
+        self.ground_color = QColor(255, 140, 45)  # Orange color
+        self.horizon_pen = QPen(QColor(0, 0, 0), 1, Qt.SolidLine)
+        self.ladder_pen = QPen(QColor(255, 255, 0), 2, Qt.SolidLine)  # Yellow color
+        self.text_pen = QPen(QColor(0, 0, 0))
+        self.text_font = QFont('Arial', 15)
+        self.frame_pen = QPen(QColor(255, 255, 255), 2, Qt.SolidLine)
+        self.gyro_pen = QPen(QColor(0, 245, 0), 2, Qt.SolidLine)
+
+        # Pre-rendered layers, rebuilt only when the widget is resized
+        self._ladder = None
+        self._overlay = None
 
     def update_data(self, data):
         attitude = data.get('attitude')
@@ -120,57 +461,90 @@ class HorizonIndicator(QtWidgets.QWidget):
             self.battery_current = battery.current
             self.battery_percent = battery.level
 
-        self.update()  # Refresh the display
+        if attitude or location:
+            self.update()  # Refresh the display, battery values are not drawn
+
+    def resizeEvent(self, event):
+        self._ladder = None
+        self._overlay = None
+        super().resizeEvent(event)
+
+    def _new_layer(self, width, height):
+        ratio = self.devicePixelRatioF()
+        pixmap = QtGui.QPixmap(int(width * ratio), int(height * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        return pixmap
+
+    def renderLadder(self):
+        # Pitch lines and labels around (0, 0), rotated and shifted as a whole when painting
+        step = (self.height() / 2) * 1.1 / 50.0
+        half_height = int(30 * step) + 25
+        pixmap = self._new_layer(2 * self.LADDER_HALF_WIDTH, 2 * half_height)
+        qp = QPainter(pixmap)
+        qp.setRenderHint(QPainter.Antialiasing)
+        qp.setFont(self.font())
+        qp.translate(self.LADDER_HALF_WIDTH, half_height)
+        qp.setPen(self.ladder_pen)
 
-    def paintEvent(self, event):
-        qp = QPainter(self)
-        qp.setRenderHint(QPainter.Antialiasing)  # Enable anti-aliasing
-        self.drawHorizon(qp)
-        self.drawText(qp)
+        for p in range(-30, 31, 10):
+            if p == 0:
+                continue
+            y = p * step
+            qp.drawLine(-55, -int(y), 55, -int(y))
+            qp.drawText(60, -int(y + 5), str(p))
+            qp.drawText(-85, -int(y + 5), str(p))
+
+        qp.end()
+        return pixmap, QtCore.QPoint(self.LADDER_HALF_WIDTH, half_height)
+
+    def renderOverlay(self):
+        pixmap = self._new_layer(self.width(), self.height())
+        qp = QPainter(pixmap)
+        qp.setRenderHint(QPainter.Antialiasing)
         self.drawRectangle(qp)
         self.drawGyroLines(qp)
-        qp.end()  # Properly end the painting process
+        qp.end()
+        return pixmap
+
+    def paintEvent(self, event):
+        with profiling.span('hud.paint'):
+            if self._ladder is None:
+                self._ladder = self.renderLadder()
+            if self._overlay is None:
+                self._overlay = self.renderOverlay()
+
+            qp = QPainter(self)
+            self.drawHorizon(qp)
+            self.drawText(qp)
+            qp.drawPixmap(0, 0, self._overlay)  # frame and crosshair
+            qp.end()  # Properly end the painting process
 
     def drawHorizon(self, qp):
         center_x = self.width() // 2
         center_y = self.height() // 2
 
-        pitch_offset = (self.pitch / 90.0) * (self.height() / 2)
-
-        # Draw the sky
-        qp.save()
-        qp.setBrush(QColor(0, 102, 204))  # Blue color
-        qp.translate(0, pitch_offset)
-        qp.drawRect(0, -self.height(), self.width(), center_y + self.height())
-        qp.restore()
+        pitch_offset = int((self.pitch / 90.0) * (self.height() / 2))
+        horizon_y = center_y + pitch_offset
 
-        # Draw the ground
-        qp.save()
-        qp.setBrush(QColor(255, 140, 45))  # Orange color
-        qp.translate(0, pitch_offset)
-        qp.drawRect(0, center_y, self.width(), self.height() - center_y + self.height())
-        qp.restore()
+        # Sky and ground are axis aligned, plain fills are enough
+        qp.fillRect(0, 0, self.width(), max(0, horizon_y), self.sky_color)
+        qp.fillRect(0, horizon_y, self.width(), self.height() - horizon_y, self.ground_color)
+        qp.setPen(self.horizon_pen)
+        qp.drawLine(0, horizon_y, self.width(), horizon_y)
 
-        # Draw pitch lines and labels
+        # Draw the cached pitch ladder
+        ladder, origin = self._ladder
         qp.save()
-        qp.translate(center_x, center_y + pitch_offset)
+        qp.setRenderHint(QPainter.SmoothPixmapTransform)
+        qp.translate(center_x, horizon_y)
         qp.rotate(-self.roll)
-
-        qp.setPen(QPen(QColor(255, 255, 0), 2, Qt.SolidLine))  # Yellow color
-
-        for p in range(-30, 31, 10):
-            if p == 0:
-                continue
-            y = (p / 50.0) * (self.height() / 2) * 1.1
-            qp.drawLine(-55, -int(y), 55, -int(y))
-            qp.drawText(60, -int(y + 5), str(p))
-            qp.drawText(-85, -int(y + 5), str(p))
-
+        qp.drawPixmap(-origin.x(), -origin.y(), ladder)
         qp.restore()
 
     def drawText(self, qp):
-        qp.setPen(QColor(0, 0, 0))
-        qp.setFont(QFont('Arial', 15))
+        qp.setPen(self.text_pen)
+        qp.setFont(self.text_font)
 
         # Bottom-left text
         text_x = 10
@@ -182,10 +556,6 @@ class HorizonIndicator(QtWidgets.QWidget):
         qp.drawText(text_x, text_y_start + 2 * line_height, f'Yaw: {self.yaw:.2f}')
         qp.drawText(text_x, text_y_start + 3 * line_height, f'Altitude: {self.altitude:.2f}')
 
-        # Top-right text for battery
-        text_x = self.width() - 200
-        text_y_start = 20
-
     def drawRectangle(self, qp):
         # Rectangle for the gyroscope display
         margin = 0.40
@@ -199,8 +569,8 @@ class HorizonIndicator(QtWidgets.QWidget):
 
         radius = int(self.width() * 0.10)
 
-        qp.setPen(QPen(QColor(255, 255, 255), 2, Qt.SolidLine))
-        qp.setBrush(QColor(0, 0, 0, 0))
+        qp.setPen(self.frame_pen)
+        qp.setBrush(Qt.NoBrush)
 
         qp.drawRoundedRect(rect_x, rect_y, rect_width, rect_height, radius, radius)
 
@@ -210,37 +580,166 @@ class HorizonIndicator(QtWidgets.QWidget):
 
         line_length = 25
 
-        qp.setPen(QPen(QColor(0, 245, 0), 2, Qt.SolidLine))
+        qp.setPen(self.gyro_pen)
 
         qp.drawLine(center_x, center_y, center_x + line_length, center_y + line_length)
         qp.drawLine(center_x, center_y, center_x - line_length, center_y + line_length)
 
 
+class Sparkline(QtWidgets.QWidget):
+    # Small line chart of the link quality history (0..1), newest sample on the right
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.values = []
+        self.pen = QPen(QColor(0, 245, 0), 1, Qt.SolidLine)
+        self.warning_pen = QPen(QColor(255, 140, 45), 1, Qt.DashLine)
+
+    def set_values(self, values):
+        self.values = list(values)
+        self.update()
+
+    def paintEvent(self, event):
+        qp = QPainter(self)
+        qp.setRenderHint(QPainter.Antialiasing)
+        w, h = self.width(), self.height()
+        qp.setPen(self.warning_pen)
+        qp.drawLine(0, int(h * 0.1), w, int(h * 0.1))  # 90 % quality
+        if len(self.values) > 1:
+            step = w / float(len(self.values) - 1)
+            points = [QtCore.QPointF(i * step, (1.0 - v) * (h - 1)) for i, v in enumerate(self.values)]
+            qp.setPen(self.pen)
+            qp.drawPolyline(QtGui.QPolygonF(points))
+        qp.end()
+
+
+class MessageLog(object):
+    def __init__(self, capacity=1000, log_file=None, max_bytes=5 * 1024 * 1024, backup_count=5):
+        self.capacity = capacity
+        self.lines = collections.deque(maxlen=capacity)
+        self.text_browser = None
+        self._file_log = None
+        if log_file:
+            # Everything also goes to a rotating file, the widget only keeps the last `capacity` lines
+            handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                           backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self._file_log = logging.Logger('gcs.messages')
+            self._file_log.addHandler(handler)
+
+    def attach(self, text_browser):
+        self.text_browser = text_browser
+        text_browser.clear()
+        # QTextDocument drops the oldest blocks itself once the limit is reached
+        text_browser.document().setMaximumBlockCount(self.capacity)
+        for line in self.lines:
+            self._insert(line)
+
+    def append(self, message):
+        self.lines.append(message)
+        if self._file_log is not None:
+            self._file_log.info(message)
+        if self.text_browser is not None:
+            self._insert(message)
+            self.text_browser.moveCursor(QtGui.QTextCursor.End)
+
+    def _insert(self, message):
+        # As plain text: QTextBrowser.append would render STATUSTEXT or paths containing < and & as HTML
+        document = self.text_browser.document()
+        cursor = QtGui.QTextCursor(document)
+        cursor.movePosition(QtGui.QTextCursor.End)
+        if not document.isEmpty():
+            cursor.insertBlock()
+        cursor.insertText(message)
+
+    def close(self):
+        if self._file_log is not None:
+            for handler in self._file_log.handlers:
+                handler.close()
+
+
 class Ui_MainWindow(QtWidgets.QMainWindow):
 
-    def __init__(self):
+    def __init__(self, fleet=None, log_capacity=1000, log_file=None):
         super().__init__()
-        self.vehicle = None
-        self.message_log = []  # To store the log messages
+        self.fleet = fleet if fleet is not None else FleetManager()
+        self.vehicle = None  # vehicle currently shown on the HUD and targeted by the buttons
+        self.hud_max_rate = 30  # Hz, upper bound for HUD refreshes
+        self.replay = None  # TlogReplay driving the HUD instead of the live vehicle
+        self.map_stream = None  # map_server.LocationStream fed with the active vehicle's position
+        self.map_enabled = True  # False with --no-map, the map modules are never imported
+        self.tile_url = None  # --tile-url, the mission editor prefetches map tiles from it
+        self.map_server = None  # imported and started by harita_ac
+        self._map_window = None  # webview process
+        self.mission_editors = {}  # VehicleLink -> MissionEditor, kept so an edited mission survives closing
+        self.parameter_editors = {}  # VehicleLink -> ParameterEditor
+        self.telemetry = {}  # Latest value of every telemetry key (DataFetcher only sends changes)
+        self.message_log = MessageLog(log_capacity, log_file)  # To store the log messages
+        self.max_fps = 30  # label/HUD repaints per second, 0 = draw every update
+        self._dirty = {}  # telemetry received since the last frame
+        self._last_frame = 0.0
+        self._label_text = {}  # text currently shown on each value label
+        self._frame_timer = QtCore.QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.timeout.connect(self.render_frame)
         self.setupUi(self)
+        self.fleet.dataFetched.connect(self.canli_veri)
+        self.fleet.linkAdded.connect(self.arac_eklendi)
+        self.fleet.linkFailed.connect(self.baglanti_hatasi)
+        self.fleet.linkRemoved.connect(self.vehicle_selector.removeItem)
+        self.fleet.activeChanged.connect(self.aktif_arac_degisti)
+        self.fleet.commandFinished.connect(self.komut_sonucu)
+        self.fleet.healthUpdated.connect(self.telemetri)
+        self.fleet.parametersLoaded.connect(self.parametreler_yuklendi)
+        self.fleet.fenceAlert.connect(self.geofence_uyarisi)
+        # Clock and date only change once a second, independent of telemetry
+        self._clock_timer = QtCore.QTimer(self)
+        self._clock_timer.timeout.connect(self.saat_tarih)
+        self._clock_timer.start(1000)
+        self.saat_tarih()
 
     def update_data(self, data):
-        self.gyroscope.update_data(data)
-        self.yukseklik(data)
-        self.hava_hizi(data)
-        self.gps_hizi(data)
-        self.gps_sayisi(data)
-        self.roll_acisi(data)
-        self.pitch_acisi(data)
-        self.yaw_acisi(data)
-        self.batarya_durumu(data)
+        with profiling.span('ui.update_data'):
+            self.telemetry.update(data)
+            if self.map_stream is not None and ('current_location' in data or 'attitude' in data):
+                self.map_stream.publish_telemetry(self.telemetry)
+            # Changes are collected and drawn at most max_fps times per second
+            superseded = sum(1 for key in data if key in self._dirty)
+            if superseded:
+                profiling.count('ui.superseded', superseded)
+            self._dirty.update(data)
+            if self.max_fps <= 0:
+                self.render_frame()
+            elif not self._frame_timer.isActive():
+                delay = self._last_frame + 1.0 / self.max_fps - time.monotonic()
+                self._frame_timer.start(max(0, int(delay * 1000)))
+
+    # (span name, method) of every label setter, looked up per frame so instance overrides apply
+    FRAME_SETTERS = tuple(('ui.' + name, name) for name in (
+        'yukseklik', 'hava_hizi', 'gps_hizi', 'gps_sayisi', 'roll_acisi', 'pitch_acisi', 'yaw_acisi',
+        'batarya_durumu', 'arm', 'mod_durumu', 'uzaklik'))
+
+    def render_frame(self):
+        data, self._dirty = self._dirty, {}
+        if not data:
+            return
+        self._last_frame = time.monotonic()
+        profiling.count('ui.frames')
+        with profiling.span('ui.render_frame'):
+            with profiling.span('hud.update_data'):
+                self.gyroscope.update_data(data)
+            for span_name, setter in self.FRAME_SETTERS:
+                with profiling.span(span_name):
+                    getattr(self, setter)(data)
+
+    def set_label(self, label, text):
+        # QLabel.setText relayouts and repaints even for the same text, so skip unchanged values
+        if self._label_text.get(label) != text:
+            self._label_text[label] = text
+            label.setText(text)
+
+    def saat_tarih(self):
         self.saat()
         self.tarih()
-        self.arm(data)
-        self.mod_durumu(data)
-        self.telemetri()
-        self.uzaklik(data)
-
 
     def setupUi(self, MainWindow):
         MainWindow.setObjectName("MainWindow")
@@ -530,6 +1029,9 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.mode_value.setStyleSheet("color: rgb(0, 245, 0);")
         self.mode_value.setObjectName("mode_value")
         self.formLayout_4.setWidget(3, QtWidgets.QFormLayout.FieldRole, self.mode_value)
+        self.link_sparkline = Sparkline(self.centralwidget)
+        self.link_sparkline.setGeometry(QtCore.QRect(410, 262, 247, 30))
+        self.link_sparkline.setObjectName("link_sparkline")
         self.map = QtWidgets.QLabel(self.centralwidget)
         self.map.setGeometry(QtCore.QRect(120, 380, 500, 600))
         self.map.setStyleSheet("")
@@ -682,12 +1184,21 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.textBrowser.setStyleSheet("color: rgb(0, 245, 0);\n"
                                        "background-color: rgb(60, 60, 60);")
         self.textBrowser.setObjectName("textBrowser")
+        self.vehicle_selector = QtWidgets.QComboBox(self.centralwidget)
+        self.vehicle_selector.setGeometry(QtCore.QRect(1330, 190, 421, 30))
+        font = QtGui.QFont()
+        font.setPointSize(11)
+        self.vehicle_selector.setFont(font)
+        self.vehicle_selector.setStyleSheet("color: rgb(0, 245, 0);\n"
+                                            "background-color: rgb(60, 60, 60);")
+        self.vehicle_selector.setObjectName("vehicle_selector")
         self.logo.raise_()
         self.camera.raise_()
         self.gyroscope.raise_()
         self.formLayoutWidget_2.raise_()
         self.formLayoutWidget_3.raise_()
         self.formLayoutWidget_4.raise_()
+        self.link_sparkline.raise_()
         self.map.raise_()
         self.arm_button.raise_()
         self.disarm_button.raise_()
@@ -700,10 +1211,53 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.fbwa_button.raise_()
         self.layoutWidget.raise_()
         self.textBrowser.raise_()
+        self.vehicle_selector.raise_()
         MainWindow.setCentralWidget(self.centralwidget)
         self.menubar = QtWidgets.QMenuBar(MainWindow)
         self.menubar.setGeometry(QtCore.QRect(0, 0, 1920, 22))
         self.menubar.setObjectName("menubar")
+        self.menubar.setStyleSheet("color: rgb(0, 245, 0);")
+        self.menu_araclar = QtWidgets.QMenu(self.menubar)
+        self.menu_araclar.setObjectName("menu_araclar")
+        self.action_kayit_oynat = QtWidgets.QAction(MainWindow)
+        self.action_kayit_oynat.setObjectName("action_kayit_oynat")
+        self.menu_araclar.addAction(self.action_kayit_oynat)
+        self.action_harita = QtWidgets.QAction(MainWindow)
+        self.action_harita.setObjectName("action_harita")
+        self.menu_araclar.addAction(self.action_harita)
+        # Trend plots float next to the HUD so the fixed layout of the main window is untouched
+        self.strip_chart_dock = QtWidgets.QDockWidget(MainWindow)
+        self.strip_chart_dock.setObjectName("strip_chart_dock")
+        self.strip_charts = None  # StripChartPanel, built the first time the dock is shown
+        self._chart_store = None  # TelemetryStore the charts show
+        MainWindow.addDockWidget(Qt.BottomDockWidgetArea, self.strip_chart_dock)
+        self.strip_chart_dock.setFloating(True)
+        self.strip_chart_dock.resize(800, 700)
+        self.strip_chart_dock.hide()
+        self.strip_chart_dock.visibilityChanged.connect(self.grafikler_gorunur)
+        self.action_grafikler = self.strip_chart_dock.toggleViewAction()
+        self.action_grafikler.setObjectName("action_grafikler")
+        self.menu_araclar.addAction(self.action_grafikler)
+        self.action_parametreler = QtWidgets.QAction(MainWindow)
+        self.action_parametreler.setObjectName("action_parametreler")
+        self.menu_araclar.addAction(self.action_parametreler)
+        self.action_geofence = QtWidgets.QAction(MainWindow)
+        self.action_geofence.setObjectName("action_geofence")
+        self.menu_araclar.addAction(self.action_geofence)
+        self.action_geofence_yukle = QtWidgets.QAction(MainWindow)
+        self.action_geofence_yukle.setObjectName("action_geofence_yukle")
+        self.menu_araclar.addAction(self.action_geofence_yukle)
+        self.action_autotune = QtWidgets.QAction(MainWindow)
+        self.action_autotune.setObjectName("action_autotune")
+        self.menu_araclar.addAction(self.action_autotune)
+        # Timing overlay drawn over the HUD, F12 toggles it
+        self.perf_overlay = PerformanceOverlay(self.centralwidget)
+        self.action_performans = QtWidgets.QAction(MainWindow)
+        self.action_performans.setObjectName("action_performans")
+        self.action_performans.setCheckable(True)
+        self.action_performans.setShortcut("F12")
+        self.menu_araclar.addAction(self.action_performans)
+        self.menubar.addAction(self.menu_araclar.menuAction())
         MainWindow.setMenuBar(self.menubar)
         self.statusbar = QtWidgets.QStatusBar(MainWindow)
         self.statusbar.setObjectName("statusbar")
@@ -717,10 +1271,19 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.loiter_button.clicked.connect(self.loiter_butonu)
         self.manual_button.clicked.connect(self.manuel_butonu)
         self.disarm_button.clicked.connect(self.disarm_butonu)
-        self.autotune_button.clicked.connect(self.start_autotune_thread)
+        self.autotune_button.clicked.connect(self.gorev_ac)
         self.connect_button.clicked.connect(self.connect_vehicle)  # Connect button to the connect_vehicle function
+        self.vehicle_selector.currentIndexChanged.connect(self.arac_secildi)
+        self.action_kayit_oynat.triggered.connect(self.kayit_oynat)
+        self.action_harita.triggered.connect(self.harita_ac)
+        self.action_autotune.triggered.connect(self.start_autotune_thread)
+        self.action_parametreler.triggered.connect(self.parametreler_ac)
+        self.action_geofence.triggered.connect(self.geofence_ac)
+        self.action_geofence_yukle.triggered.connect(self.geofence_yukle)
+        self.action_performans.toggled.connect(self.perf_overlay.setVisible)
 
         self.retranslateUi(MainWindow)
+        self.message_log.attach(self.textBrowser)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
 
     def retranslateUi(self, MainWindow):
@@ -768,6 +1331,16 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
         self.ip_text.setText(_translate("MainWindow", "IP :"))
         self.baud_text.setText(_translate("MainWindow", "BAUD :"))
         self.connect_button.setText(_translate("MainWindow", "CONNECT"))
+        self.menu_araclar.setTitle(_translate("MainWindow", "ARAÇLAR"))
+        self.action_kayit_oynat.setText(_translate("MainWindow", "Kayıt Oynat..."))
+        self.action_harita.setText(_translate("MainWindow", "Harita"))
+        self.strip_chart_dock.setWindowTitle(_translate("MainWindow", "Grafikler"))
+        self.action_grafikler.setText(_translate("MainWindow", "Grafikler"))
+        self.action_autotune.setText(_translate("MainWindow", "Autotune (5 m/s, 25 s)"))
+        self.action_parametreler.setText(_translate("MainWindow", "Parametreler..."))
+        self.action_geofence.setText(_translate("MainWindow", "Geofence Aç..."))
+        self.action_geofence_yukle.setText(_translate("MainWindow", "Geofence'i Araca Yükle"))
+        self.action_performans.setText(_translate("MainWindow", "Performans"))
         self.textBrowser.setHtml(_translate("MainWindow",
                                             "<!DOCTYPE HTML PUBLIC \"-//W3C//DTD HTML 4.0//EN\" \"http://www.w3.org/TR/REC-html40/strict.dtd\">\n"
                                             "<html><head><meta name=\"qrichtext\" content=\"1\" /><style type=\"text/css\">\n"
@@ -779,193 +1352,403 @@ class Ui_MainWindow(QtWidgets.QMainWindow):
 
     def update_text_browser(self, message):
         self.message_log.append(message)
-        self.textBrowser.setText("\n".join(self.message_log))
-        self.textBrowser.moveCursor(QtGui.QTextCursor.End)
+
+    def canli_veri(self, data):
+        # Live telemetry is ignored while a recorded flight is replayed on the HUD
+        if self.replay is None:
+            self.update_data(data)
+
+    def kayit_oynat(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Kayıt Seç", "logs", "MAVLink tlog (*.tlog)")
+        if not path:
+            return
+        if self.replay is not None:
+            self.replay_controls.close()
+        replay = _timed_import('replay')
+        # The charts follow the replay while it runs
+        replay_store = _timed_import('telemetry_store').TelemetryStore()
+        self.replay = replay.TlogReplay(path, max_rate=self.hud_max_rate, store=replay_store)
+        self.replay.dataFetched.connect(self.update_data)
+        self.replay.finished.connect(self.kayit_bitti)
+        self.replay_controls = replay.ReplayControls(self.replay)
+        self.replay_controls.show()
+        self.grafik_kaynagi(replay_store)
+        self.telemetry = {}
+        self.replay.start()
+        self.update_text_browser(f"Kayıt oynatılıyor: {path}")
+
+    def grafik_kaynagi(self, store):
+        self._chart_store = store
+        if self.strip_charts is not None:
+            self.strip_charts.set_store(store)
+
+    def grafikler_gorunur(self, visible):
+        if visible and self.strip_charts is None:
+            strip_chart = _timed_import('strip_chart')
+            self.strip_charts = strip_chart.StripChartPanel(self.strip_chart_dock, max_fps=self.max_fps)
+            self.strip_chart_dock.setWidget(self.strip_charts)
+            self.strip_charts.set_store(self._chart_store)
+
+    def kayit_bitti(self):
+        if self.sender() is not self.replay:
+            return
+        self.replay = None
+        self.update_text_browser("Kayıt oynatma bitti.")
+        if self.fleet.active is not None:
+            self.grafik_kaynagi(self.fleet.active.store)
+            self.telemetry = {}
+            self.update_data(self.fleet.active.fetcher.snapshot())
+
+    def harita_ac(self):
+        if not self.map_enabled:
+            self.update_text_browser("Harita kapalı (--no-map).")
+            return
+        if self.map_server is None:
+            # The map starts centred on the vehicle when its position is already known
+            location = self.telemetry.get('current_location')
+            if location is not None and location.lat is not None:
+                self.map_server = start_map_server(location.lat, location.lon)
+            else:
+                self.map_server = start_map_server()
+            self.map_stream = self.map_server.location_stream
+            self.map_stream.publish_telemetry(self.telemetry)
+            self.update_text_browser(f"Harita sunucusu başlatıldı ({IMPORT_TIMES['map_server'] * 1000:.0f} ms).")
+        if self._map_window is None or not self._map_window.is_alive():
+            self._map_window = open_map_window()
 
     def connect_vehicle(self):
         ip = self.ip_value.text()
         baud = int(self.baud_value.text())
         connection_string = f"{ip}:{baud}"
-        global vehicle
-        vehicle = connect(connection_string, wait_ready=False)
-        self.data_fetcher = DataFetcher(vehicle)
-        self.data_fetcher.dataFetched.connect(self.update_data)
-        self.data_fetcher.start()
-        self.update_text_browser(f"Bağlantı kuruldu: {connection_string}")
+        self.update_text_browser(f"Bağlanıyor: {connection_string}")
+        self.fleet.connect_vehicle(connection_string)
+
+    def arac_eklendi(self, link):
+        self.vehicle_selector.addItem(link.name)
+        link.missions.finished.connect(
+            lambda name, accepted, detail, _items, link=link: self.komut_sonucu(link, name, accepted, detail))
+        self.update_text_browser(f"Araç eklendi: {link.name}")
+
+    def parametreler_yuklendi(self, link):
+        parameters = link.vehicle.parameters
+        if parameters.from_cache:
+            self.update_text_browser(f"[{link.name}] {len(parameters)} parametre önbellekten yüklendi, doğrulanıyor...")
+        else:
+            self.update_text_browser(f"[{link.name}] {len(parameters)} parametre hazır.")
+
+    def baglanti_hatasi(self, connection_string, error):
+        self.update_text_browser(f"Bağlantı kurulamadı: {connection_string} ({error})")
+
+    def arac_secildi(self, index):
+        if 0 <= index < len(self.fleet.links):
+            self.fleet.set_active(self.fleet.links[index])
+
+    def aktif_arac_degisti(self, link):
+        self.vehicle = link.vehicle if link is not None else None
+        self.telemetry = {}
+        if self.replay is None:
+            self.grafik_kaynagi(link.store if link is not None else None)
+        if link is None:
+            return
+        index = self.fleet.links.index(link)
+        if self.vehicle_selector.currentIndex() != index:
+            self.vehicle_selector.setCurrentIndex(index)
+        # Redraw everything from the new vehicle's last known state
+        self.update_data(link.fetcher.snapshot())
 
     def yukseklik(self, data):
         location = data.get('location')
         if location:
-            self.altitude_value.setText(f"{location.alt:.2f}")
+            self.set_label(self.altitude_value, f"{location.alt:.2f}")
 
     def hava_hizi(self, data):
         airspeed = data.get('airspeed')
-        self.airspeed_value.setText(f"{airspeed:.2f} m/s")
+        if airspeed is not None:
+            self.set_label(self.airspeed_value, f"{airspeed:.2f} m/s")
 
     def gps_hizi(self, data):
         groundspeed = data.get('groundspeed')
-        self.gpsspeed_value.setText(f"{groundspeed:.2f} m/s")
+        if groundspeed is not None:
+            self.set_label(self.gpsspeed_value, f"{groundspeed:.2f} m/s")
 
     def gps_sayisi(self, data):
         gps = data.get('gps')
         if gps:
-            self.gps_value.setText(str(gps.satellites_visible))
+            self.set_label(self.gps_value, str(gps.satellites_visible))
 
     def roll_acisi(self, data):
         attitude = data.get('attitude')
         if attitude:
-            self.roll_value.setText(f"{math.degrees(attitude.roll):.2f}")
+            self.set_label(self.roll_value, f"{math.degrees(attitude.roll):.2f}")
 
     def pitch_acisi(self, data):
         attitude = data.get('attitude')
         if attitude:
-            self.pitch_value.setText(f"{math.degrees(attitude.pitch):.2f}")
+            self.set_label(self.pitch_value, f"{math.degrees(attitude.pitch):.2f}")
 
     def yaw_acisi(self, data):
         attitude = data.get('attitude')
         if attitude:
-            self.yaw_value.setText(f"{math.degrees(attitude.yaw):.2f}")
+            self.set_label(self.yaw_value, f"{math.degrees(attitude.yaw):.2f}")
 
     def batarya_durumu(self, data):
         battery = data.get('battery')
         if battery:
-            self.battery_value.setText(f"{battery.level}%")
+            self.set_label(self.battery_value, f"{battery.level}%" if battery.level is not None else "—")
 
     def mod_durumu(self, data):
         current_mode = data.get('mode')
         if current_mode:
-            self.mode_value.setText(str(current_mode.name))
+            self.set_label(self.mode_value, str(current_mode.name))
 
     def arm(self, data):
-        armed = data.get('armed')
-        self.arm_value.setText("TRUE" if armed else "FALSE")
-
-    def telemetri(self):
-        self.telemetry_value.setText(str("%99"))
+        if 'armed' in data:
+            self.set_label(self.arm_value, "TRUE" if data['armed'] else "FALSE")
+
+    def telemetri(self, stats):
+        self.set_label(self.telemetry_value, f"%{stats.quality * 100:.0f}")
+        details = [f"Paket: {stats.rx_packets:.0f}/s",
+                   f"Alınan: {stats.rx_bytes / 1024:.1f} kB/s",
+                   f"Gönderilen: {stats.tx_bytes / 1024:.1f} kB/s"]
+        if stats.rtt is not None:
+            details.append(f"Gecikme: {stats.rtt * 1000:.0f} ms")
+        if stats.heartbeat_age is not None:
+            details.append(f"Son heartbeat: {stats.heartbeat_age:.1f} s")
+        if stats.rssi is not None:
+            details.append(f"RSSI: {stats.rssi} / {stats.remrssi}")
+        self.telemetry_value.setToolTip("\n".join(details))
+        self.link_sparkline.set_values(self.fleet.active.health.history)
+
+    def komutlar(self):
+        # Command dispatcher of the selected vehicle, None (with a log line) if nothing is connected
+        if self.fleet.active is None:
+            self.update_text_browser("Bağlı araç yok.")
+            return None
+        return self.fleet.active.commands
+
+    def komut_sonucu(self, link, name, accepted, detail):
+        prefix = "" if link is self.fleet.active else f"[{link.name}] "
+        if accepted:
+            self.update_text_browser(f"{prefix}{name} kabul edildi.")
+        else:
+            self.update_text_browser(f"{prefix}{name} başarısız: {detail}")
+
+    def mod_degistir(self, mode_name, message=None):
+        commands = self.komutlar()
+        if commands is None:
+            return
+        if self.vehicle.mode is not None and self.vehicle.mode.name == mode_name:
+            self.update_text_browser(f"Araç zaten {mode_name} modunda.")
+            return
+        commands.set_mode(mode_name)
+        self.update_text_browser(message or f"{mode_name} moduna geçiliyor...")
 
     def arm_butonu(self):
-        while not vehicle.is_armable:
+        commands = self.komutlar()
+        if commands is None:
+            return
+        if not self.vehicle.is_armable:
             self.update_text_browser("ARM için bekleniyor...")
-
-        vehicle.armed = True
-        while not vehicle.armed:
-            self.update_text_browser("ARM ediliyor...")
-
-        if vehicle.armed:
-            self.update_text_browser("Hava Aracı ARM Edildi.")
-        else:
-            self.update_text_browser("ARM edilemedi.")
+        commands.arm(True)
+        self.update_text_browser("ARM ediliyor...")
 
     def manuel_butonu(self):
-        if vehicle.mode.name != "GUIDED":
-            vehicle.mode = VehicleMode("GUIDED")
-            print("Araç GUIDED moduna geçti.")
-        else:
-            print("Araç zaten GUIDED modunda.")
+        self.mod_degistir("GUIDED")
 
     def fbwa_butonu(self):
+        commands = self.komutlar()
+        if commands is None:
+            return
         target_altitude = 25
-        vehicle.simple_takeoff(target_altitude)
-        if vehicle.location.global_relative_frame.alt > 1:
+        location = self.vehicle.location.global_relative_frame
+        if location is not None and location.alt > 1:
             self.update_text_browser("ARAÇ ZATEN HAVADA!")
         else:
+            commands.takeoff(target_altitude)
             self.update_text_browser("ARAÇ KALKIŞ YAPIYOR")
 
     def auto_butonu(self):
-        vehicle.mode = VehicleMode("STABILIZE")
+        self.mod_degistir("STABILIZE")
 
     def disarm_butonu(self):
-        if vehicle.armed:
-            if vehicle.location.global_relative_frame.alt > 1:  # 1 metre üzerinde ise
-                self.update_text_browser("ARAÇ HAVADA! İNİŞE GEÇİYOR")
-                vehicle.mode = VehicleMode("LAND")
-            else:
-                vehicle.disarm()
-                while vehicle.armed:  # Disarm işlemi gerçekleşene kadar bekle
-                    self.update_text_browser("DISARM ediliyor...")
-
-                if not vehicle.armed:
-                    self.update_text_browser("HAVA ARACI DISARM EDİLDİ.")
-                else:
-                    self.update_text_browser("DISARM edilemedi.")
+        commands = self.komutlar()
+        if commands is None or not self.vehicle.armed:
+            return
+        location = self.vehicle.location.global_relative_frame
+        if location is not None and location.alt > 1:  # 1 metre üzerinde ise
+            self.update_text_browser("ARAÇ HAVADA! İNİŞE GEÇİYOR")
+            commands.set_mode("LAND")
+        else:
+            commands.arm(False)
+            self.update_text_browser("DISARM ediliyor...")
 
     def fbwb_butonu(self):
-        if vehicle.mode.name == "LAND":
-            print("Araç zaten LAND modunda.")
-        else:
-            vehicle.mode = VehicleMode("LAND")
-            print("Araç LAND moduna geçirildi.")
+        self.mod_degistir("LAND")
 
     def rtl_butonu(self):
-        if vehicle.mode.name == "RTL":
-            self.update_text_browser("Araç zaten RTL modunda.")
-        else:
-            vehicle.mode = VehicleMode("RTL")
-            self.update_text_browser("EVE DÖNÜYOR.")
+        self.mod_degistir("RTL", "EVE DÖNÜYOR.")
 
     def loiter_butonu(self):
-        if vehicle.mode.name != "LOITER":
-            vehicle.mode = VehicleMode("LOITER")
-            print("Araç LOITER moduna geçti.")
+        self.mod_degistir("LOITER")
+
+    def gorev_ac(self):
+        if self.komutlar() is None:
+            return
+        link = self.fleet.active
+        editor = self.mission_editors.get(link)
+        if editor is None:
+            editor = self.mission_editors[link] = MissionEditor(link.missions, self, tile_url=self.tile_url)
+            editor.setWindowTitle(f"Görev Planlama - {link.name}")
+        editor.show()
+        editor.raise_()
+
+    def parametreler_ac(self):
+        if self.komutlar() is None:
+            return
+        link = self.fleet.active
+        editor = self.parameter_editors.get(link)
+        if editor is None:
+            editor = self.parameter_editors[link] = ParameterEditor(link.vehicle.parameters, self)
+            editor.setWindowTitle(f"Parametreler - {link.name}")
+        editor.show()
+        editor.raise_()
+
+    def geofence_ac(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Geofence Aç", "", "GeoJSON / KML (*.geojson *.json *.kml)")
+        if not path:
+            return
+        try:
+            geofence = _timed_import('geofence')
+            zones = geofence.load(path)
+        except (OSError, ValueError, KeyError, SyntaxError) as e:  # ElementTree.ParseError is a SyntaxError
+            self.update_text_browser(f"Geofence okunamadı: {e}")
+            return
+        inclusion = sum(zone.inclusion for zone in zones)
+        self.update_text_browser(f"Geofence: {inclusion} izinli, {len(zones) - inclusion} yasak bölge yüklendi.")
+        self.fleet.set_geofence(geofence.Geofence(zones))
+
+    def geofence_yukle(self):
+        if self.komutlar() is None:
+            return
+        if self.fleet.geofence is None:
+            self.update_text_browser("Önce bir geofence dosyası açın.")
+            return
+        self.fleet.active.missions.upload(self.fleet.geofence.mission_items(), FENCE)
+        self.update_text_browser("Geofence araca yükleniyor...")
+        for name in self.fleet.geofence.unsendable_holes():
+            self.update_text_browser(f"Uyarı: {name} yasak bölgesinin boşlukları araca gönderilemez, "
+                                     f"araçtaki sınır burada GCS'dekinden farklı")
+
+    def geofence_uyarisi(self, link, status):
+        geofence = _timed_import('geofence')
+        prefix = "" if link is self.fleet.active else f"[{link.name}] "
+        if status.state == geofence.BREACH:
+            self.update_text_browser(f"{prefix}GEOFENCE İHLALİ: {status.zone} ({status.distance:.0f} m)")
+        elif status.state == geofence.NEAR:
+            self.update_text_browser(f"{prefix}Geofence sınırına {status.distance:.0f} m: {status.zone}")
         else:
-            print("Araç zaten LOITER modunda.")
+            self.update_text_browser(f"{prefix}Geofence içinde.")
 
     def start_autotune_thread(self):
-        self.autotune_thread = AutotuneThread(vehicle)
+        if self.komutlar() is None:
+            return
+        self.autotune_thread = AutotuneThread(self.vehicle)
+        self.autotune_thread.finished.connect(self.autotune_bitti)
         self.autotune_thread.start()
 
+    def autotune_bitti(self):
+        stats = self.sender().streamer.stats()
+        self.update_text_browser(f"Autotune bitti: {stats.sent} setpoint, gecikme p99 {stats.p99:.2f} ms, "
+                                 f"en fazla {stats.max:.2f} ms, atlanan {stats.missed}")
+
     @staticmethod
     def haversine_distance(lat1, lon1, lat2, lon2):
-        # Dünya'nın yarıçapı (km)
-        R = 6371.0
-
-        lat1, lon1 = radians(lat1), radians(lon1)
-        lat2, lon2 = radians(lat2), radians(lon2)
-
-        dlon = lon2 - lon1
-        dlat = lat2 - lat1
-
-        a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlon / 2) ** 2
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-        distance = R * c
-
-        return distance
-
+        # km; geodesy.distance is the scalar fast path, track arrays go through geodesy.haversine
+        return _timed_import('geodesy').distance(lat1, lon1, lat2, lon2) / 1000.0
 
     def uzaklik(self, data):
-        home_location = data.get('home_location')
-        current_location = data.get('current_location')
+        if 'home_location' not in data and 'current_location' not in data:
+            return
+        home_location = self.telemetry.get('home_location')
+        current_location = self.telemetry.get('current_location')
         if home_location and current_location:
             distance = self.haversine_distance(home_location.lat, home_location.lon, current_location.lat, current_location.lon)
-            self.distance_value.setText(f"{distance:.2f} km")
+            self.set_label(self.distance_value, f"{distance:.2f} km")
 
     def saat(self):
         saat1 = datetime.datetime.now().strftime('%H:%M:%S')
-        self.saat_value.setText(saat1)
+        self.set_label(self.saat_value, saat1)
 
     def tarih(self):
         tarih1 = datetime.datetime.now().strftime("%d-%m-%Y")
-        self.tarih_value.setText(tarih1)
-
-if __name__ == "__main__":
-    # Aracınıza bağlanın
-    connect_vehicle()
-
-    # Flask uygulamasını ayrı bir iş parçacığında başlatın
-    flask_thread = threading.Thread(target=start_flask_app)
-    flask_thread.daemon = True
-    flask_thread.start()
+        self.set_label(self.tarih_value, tarih1)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ground Control Station for UAV")
+    parser.add_argument('--connect', default='127.0.0.1:14550',
+                        help="açılışta bağlanılacak adres (varsayılan SITL), boş bırakılırsa bağlanmaz")
+    parser.add_argument('--record-dir', default='logs', help="tlog kayıt klasörü, boş bırakılırsa kayıt yok")
+    parser.add_argument('--map', action='store_true', help="haritayı açılışta aç")
+    parser.add_argument('--no-map', action='store_true', help="Flask, folium ve pywebview hiç yüklenmez")
+    parser.add_argument('--headless', action='store_true',
+                        help="pencere açmadan bağlan ve kaydet; harita sunucusu tarayıcıdan izlenebilir")
+    parser.add_argument('--tile-url', metavar='URL',
+                        help="görev penceresindeki Harita İndir için toplu indirmeye izin veren karo sunucusu "
+                             "({z}/{x}/{y}); tile.openstreetmap.org kabul edilmez")
+    parser.add_argument('--log-file', metavar='DOSYA',
+                        help="mesaj kutusundaki her satırı dönen dosyaya da yaz (5 MB x 5)")
+    parser.add_argument('--import-times', action='store_true', help="import ve açılış sürelerini yazdır")
+    parser.add_argument('--metrics', type=int, nargs='?', const=9464, metavar='PORT',
+                        help="süre ölçümlerini http://127.0.0.1:PORT/metrics (Prometheus) ve /metrics.json olarak sun")
+    return parser.parse_args(argv)
+
+
+def print_import_times(started):
+    for name, seconds in IMPORT_TIMES.items():
+        print(f"import {name}: {seconds * 1000:.0f} ms", file=sys.stderr)
+    print(f"ready: {(time.perf_counter() - started) * 1000:.0f} ms after imports", file=sys.stderr)
+
+
+def run_headless(args, fleet):
+    fleet.linkAdded.connect(lambda link: print(f"Araç eklendi: {link.name}"))
+    fleet.linkFailed.connect(lambda cs, error: print(f"Bağlantı kurulamadı: {cs} ({error})"))
+    if not args.no_map:
+        location_stream = start_map_server().location_stream
+        telemetry = {}
+
+        def publish(data):
+            telemetry.update(data)
+            location_stream.publish_telemetry(telemetry)
+        fleet.dataFetched.connect(publish)
+        print("Harita: http://127.0.0.1:5000")
 
-    # PyQt5 uygulamasını başlatın
-    app = QtWidgets.QApplication(sys.argv)
-    MainWindow = QtWidgets.QMainWindow()
-    ui = Ui_MainWindow()
-    ui.setupUi(MainWindow)
-    MainWindow.show()
 
-    # Webview kullanarak haritayı pencere içinde gösterin
-    webview.create_window("Harita Görüntüsü", "http://127.0.0.1:5000")
-    webview.start()
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    args = parse_args()
+    started = time.perf_counter()
+
+    if args.headless:
+        app = QtCore.QCoreApplication(sys.argv)
+        fleet = FleetManager(record_dir=args.record_dir or None)
+        run_headless(args, fleet)
+    else:
+        app = QtWidgets.QApplication(sys.argv)
+        fleet = FleetManager(record_dir=args.record_dir or None)
+        ui = Ui_MainWindow(fleet, log_file=args.log_file)
+        ui.map_enabled = not args.no_map
+        ui.tile_url = args.tile_url
+        ui.show()
+        if args.map:
+            ui.harita_ac()
+
+    if args.metrics:
+        profiling.serve(port=args.metrics)
+
+    # Aracınıza bağlanın; port arka planda açılır, pencere beklemez
+    if args.connect:
+        fleet.connect_vehicle(args.connect)
+    if args.import_times:
+        QtCore.QTimer.singleShot(0, lambda: print_import_times(started))
 
     sys.exit(app.exec_())
@@ -0,0 +1,445 @@
+import argparse
+import collections
+import datetime
+import heapq
+import json
+import math
+import os
+import platform
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Before PyQt5 is imported through GCS: no display needed
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import Qt
+from pymavlink import mavutil
+from pymavlink.dialects.v20 import ardupilotmega as mavlink2
+
+import GCS
+
+
+# Hz per message type of the generated stream, roughly an ArduPlane on a telemetry radio with SR rates raised
+DEFAULT_RATES = collections.OrderedDict([
+    ('HEARTBEAT', 1), ('ATTITUDE', 50), ('GLOBAL_POSITION_INT', 10), ('VFR_HUD', 10), ('SYS_STATUS', 2),
+    ('GPS_RAW_INT', 5),
+])
+
+
+def float32(value):
+    # What a float field looks like after a MAVLink round trip
+    return struct.unpack('<f', struct.pack('<f', value))[0]
+
+
+def percentiles(samples):
+    # ms statistics of a list of seconds
+    if not samples:
+        return {'n': 0}
+    ms = np.asarray(samples) * 1000.0
+    p50, p90, p99 = np.percentile(ms, (50, 90, 99))
+    return {'n': len(ms), 'mean': round(float(ms.mean()), 3), 'p50': round(float(p50), 3),
+            'p90': round(float(p90), 3), 'p99': round(float(p99), 3), 'max': round(float(ms.max()), 3)}
+
+
+class PipeConnection(object):
+    # mavutil style connection reading from an OS pipe, so the core loop's add_reader wakes up as on a UDP socket
+    def __init__(self):
+        self.fd, self._write_fd = os.pipe()
+        os.set_blocking(self.fd, False)
+        self.mav = mavlink2.MAVLink(None)
+        self.mav.robust_parsing = True
+        self._pending = collections.deque()
+        self.bytes_in = 0
+        self.bytes_out = 0  # GCS -> vehicle traffic, counted and dropped
+
+    def feed(self, buf):
+        os.write(self._write_fd, buf)  # blocks when the GCS falls 64 kB behind, like a full socket buffer
+        self.bytes_in += len(buf)
+
+    def recv_msg(self):
+        if not self._pending:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return None
+            self._pending.extend(self.mav.parse_buffer(data) or ())
+            if not self._pending:
+                return None
+        return self._pending.popleft()
+
+    def write(self, buf):
+        self.bytes_out += len(buf)
+
+    def mode_mapping(self):
+        return mavutil.mode_mapping_bynumber(mavutil.mavlink.MAV_TYPE_FIXED_WING)
+
+    def close(self):
+        for fd in (self.fd, self._write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class SyntheticVehicle(object):
+    # ArduPlane-like telemetry at fixed per-message rates, written into a PipeConnection.
+    # ATTITUDE.roll is a ramp unique over 20000 messages, so a value shown on the HUD identifies its message.
+    def __init__(self, conn, rates=DEFAULT_RATES, system=1):
+        self.conn = conn
+        self.rates = rates
+        self.mav = mavlink2.MAVLink(self, srcSystem=system, srcComponent=1)
+        self.sent = {}  # ATTITUDE roll as received -> monotonic send time
+        self.count = 0
+        self._attitude_seq = 0
+
+    def write(self, buf):
+        self.conn.feed(buf)
+
+    def encode(self, name, t):
+        mav = self.mav
+        if name == 'HEARTBEAT':
+            return mav.heartbeat_encode(mavutil.mavlink.MAV_TYPE_FIXED_WING, mavutil.mavlink.MAV_AUTOPILOT_ARDUPILOTMEGA,
+                                        mavutil.mavlink.MAV_MODE_FLAG_CUSTOM_MODE_ENABLED |
+                                        mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED, 10, 4)
+        if name == 'ATTITUDE':
+            self._attitude_seq += 1
+            roll = ((self._attitude_seq % 20000) - 10000) * 5e-5
+            return mav.attitude_encode(int(t * 1000), roll, 0.1 * math.sin(t), (0.2 * t) % (2 * math.pi) - math.pi,
+                                       0, 0, 0)
+        # 300 m circle at 20 m/s around Ankara
+        angle = t * 20.0 / 300.0
+        lat, lon = 39.92 + 300.0 * math.cos(angle) / 111195.0, 32.85 + 300.0 * math.sin(angle) / 85180.0
+        if name == 'GLOBAL_POSITION_INT':
+            return mav.global_position_int_encode(int(t * 1000), int(lat * 1e7), int(lon * 1e7), 950000 + int(t % 50),
+                                                  100000, 0, 0, 0, int(math.degrees(angle) * 100) % 36000)
+        if name == 'VFR_HUD':
+            return mav.vfr_hud_encode(20.0 + math.sin(t), 19.0 + math.cos(t), int(math.degrees(angle)) % 360, 55,
+                                      100.0, 0.1)
+        if name == 'SYS_STATUS':
+            return mav.sys_status_encode(0, 0, 0, 500, 12600 - int(t), 1500, 80, 0, 0, 0, 0, 0, 0)
+        if name == 'GPS_RAW_INT':
+            return mav.gps_raw_int_encode(int(t * 1e6), 3, int(lat * 1e7), int(lon * 1e7), 950000, 90, 120, 2000,
+                                          0, 12)
+        raise ValueError(f"Üretilemeyen mesaj: {name}")
+
+    def run(self, duration, stop):
+        # Each type on its own fixed schedule; a tick more than a period late is skipped, not burst
+        start = time.monotonic()
+        queue = [(0.0, name) for name in self.rates]
+        heapq.heapify(queue)
+        while queue and not stop.is_set():
+            due, name = heapq.heappop(queue)
+            if due > duration:
+                break
+            delay = start + due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            now = time.monotonic()
+            msg = self.encode(name, now - start)
+            if name == 'ATTITUDE':
+                self.sent[float32(msg.roll)] = now
+            self.mav.send(msg)
+            self.count += 1
+            period = 1.0 / self.rates[name]
+            due += period
+            if start + due < time.monotonic() - period:
+                due = time.monotonic() - start + period
+            heapq.heappush(queue, (due, name))
+
+
+class TlogSource(object):
+    # Replays a recorded tlog into the pipe at its own pace (speed x), ATTITUDE rolls keyed like SyntheticVehicle
+    def __init__(self, conn, path, speed=1.0):
+        self.conn = conn
+        self.path = path
+        self.speed = speed
+        self.sent = {}
+        self.count = 0
+
+    def run(self, duration, stop):
+        log = mavutil.mavlink_connection(self.path, robust_parsing=True)
+        start = time.monotonic()
+        first = None
+        try:
+            while not stop.is_set():
+                msg = log.recv_msg()
+                if msg is None:
+                    break
+                if msg.get_type() == 'BAD_DATA':
+                    continue
+                first = msg._timestamp if first is None else first
+                due = (msg._timestamp - first) / self.speed
+                if due > duration:
+                    break
+                delay = start + due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if msg.get_type() == 'ATTITUDE':
+                    self.sent[msg.roll] = time.monotonic()
+                self.conn.feed(msg.get_msgbuf())
+                self.count += 1
+        finally:
+            log.close()
+
+
+class Probe(object):
+    # Hooks on one main window: message->label (roll label set), message->paint (HUD painted), frame and paint times
+    def __init__(self, window, sent):
+        self.sent = sent
+        self.label_latency = []
+        self.paint_latency = []
+        self.frame_times = []
+        self.paint_times = []
+        self.loop_lag = []
+        self.updates = 0
+        self._paint_key = None
+
+        roll_acisi = window.roll_acisi
+
+        def timed_roll(data):
+            roll_acisi(data)
+            attitude = data.get('attitude')
+            sent = self.sent.get(attitude.roll) if attitude else None
+            if sent is not None:
+                self.label_latency.append(time.monotonic() - sent)
+        window.roll_acisi = timed_roll
+
+        render_frame = window.render_frame
+
+        def timed_frame():
+            start = time.perf_counter()
+            render_frame()
+            self.frame_times.append(time.perf_counter() - start)
+        window._frame_timer.timeout.disconnect()
+        window._frame_timer.timeout.connect(timed_frame)
+        window.fleet.dataFetched.connect(self._count)
+
+        hud = window.gyroscope
+        hud_update = hud.update_data
+        hud_paint = hud.paintEvent
+
+        def keyed_update(data):
+            attitude = data.get('attitude')
+            if attitude:
+                self._paint_key = attitude.roll
+            hud_update(data)
+
+        def timed_paint(event):
+            start = time.perf_counter()
+            hud_paint(event)
+            self.paint_times.append(time.perf_counter() - start)
+            sent = self.sent.get(self._paint_key)
+            if sent is not None:
+                self.paint_latency.append(time.monotonic() - sent)
+                self._paint_key = None
+        hud.update_data = keyed_update
+        hud.paintEvent = timed_paint
+
+        # Event loop responsiveness: lateness of a 10 ms timer
+        self._lag_timer = QtCore.QTimer()
+        self._lag_timer.setTimerType(Qt.PreciseTimer)
+        self._lag_timer.timeout.connect(self._lag)
+        self._lag_due = None
+
+    def _count(self, _data):
+        self.updates += 1
+
+    def _lag(self):
+        now = time.monotonic()
+        if self._lag_due is not None:
+            self.loop_lag.append(max(0.0, now - self._lag_due))
+        self._lag_due = now + 0.010
+
+    def start(self):
+        self._lag_timer.start(10)
+
+    def stop(self):
+        self._lag_timer.stop()
+
+
+def cpu_seconds():
+    if resource is None:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_mb():
+    # Current and peak resident set size, None where /proc or resource is missing. Both come from the
+    # same /proc read when possible (VmHWM), so the peak is never below the current value.
+    current = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) / 1024.0
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    if peak is None and resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak / 1024.0 ** 2 if sys.platform == 'darwin' else peak / 1024.0  # bytes on macOS, kB elsewhere
+    if current is not None and peak is not None:
+        peak = max(peak, current)
+    return current, peak
+
+
+def bench_ui(duration, rates, tlog=None, speed=1.0, max_fps=30, settle=1.0):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+    fleet = GCS.FleetManager(record_dir=None)
+    window = GCS.Ui_MainWindow(fleet)
+    window.map_enabled = False
+    window.max_fps = max_fps
+    window.show()
+
+    conn = PipeConnection()
+    source = TlogSource(conn, tlog, speed) if tlog else SyntheticVehicle(conn, rates)
+    probe = Probe(window, source.sent)
+    vehicle = fleet.core.connect('benchmark', conn=conn)
+    link = fleet.add_vehicle('benchmark', vehicle)
+    received = collections.Counter()
+    vehicle.add_message_listener('*', lambda _vehicle, name, _msg: received.update((name,)))
+
+    stop = threading.Event()
+    generator = threading.Thread(target=source.run, args=(duration, stop), name='BenchmarkSource', daemon=True)
+    cpu_start, wall_start = cpu_seconds(), time.monotonic()
+    probe.start()
+    generator.start()
+    # Runs until the source is done and the last frames are drawn
+    QtCore.QTimer.singleShot(int((duration + settle) * 1000), app.quit)
+    app.exec_()
+    stop.set()
+    generator.join()
+    probe.stop()
+    wall = time.monotonic() - wall_start
+    cpu = cpu_seconds() - cpu_start
+    current_rss, peak_rss = rss_mb()
+
+    fleet.remove_vehicle(link)
+    fleet.core.stop()
+    conn.close()
+    window.close()
+    return {
+        'source': tlog or 'synthetic',
+        'duration_s': round(wall, 3),
+        'messages': {'sent': source.count, 'received': sum(received.values()),
+                     'sent_per_s': round(source.count / duration, 1), 'bytes_in': conn.bytes_in,
+                     'bytes_out': conn.bytes_out},
+        'hud_updates': probe.updates,
+        'frames': len(probe.frame_times),
+        'fps': round(len(probe.frame_times) / duration, 2),
+        'latency_ms': {'message_to_label': percentiles(probe.label_latency),
+                       'message_to_paint': percentiles(probe.paint_latency)},
+        'frame_ms': percentiles(probe.frame_times),
+        'hud_paint_ms': percentiles(probe.paint_times),
+        'loop_lag_ms': percentiles(probe.loop_lag),
+        'cpu_percent': round(100.0 * cpu / wall, 1),
+        'rss_mb': round(current_rss, 1) if current_rss is not None else None,
+        'max_rss_mb': round(peak_rss, 1) if peak_rss is not None else None,
+    }
+
+
+def bench_map(requests=2000):
+    # Flask routes through the test client: no socket, only routing, the handler and the response
+    try:
+        import map_server
+        import tile_cache
+    except ImportError as e:
+        return {'skipped': str(e)}
+    map_server.location_stream.publish(39.92, 32.85, 950.0, 90.0)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = tile_cache.TileCache(os.path.join(directory, 'bench.mbtiles'), url=None)
+        x, y = tile_cache.tile_xy(39.92, 32.85, 15)
+        cache.put([(15, x, y, b'\x89PNG' + bytes(20000))])
+        previous, map_server.tile_cache = map_server.tile_cache, cache
+        client = map_server.app.test_client()
+        try:
+            for route in ('/location', f'/tiles/15/{x}/{y}.png'):
+                times = []
+                start = time.perf_counter()
+                for _ in range(requests):
+                    begin = time.perf_counter()
+                    response = client.get(route)
+                    response.get_data()
+                    times.append(time.perf_counter() - begin)
+                elapsed = time.perf_counter() - start
+                result = percentiles(times)
+                result['requests_per_s'] = round(requests / elapsed, 1)
+                result['status'] = response.status_code
+                results[route.split('/')[1]] = result
+        finally:
+            map_server.tile_cache = previous
+            cache.close()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__) or '.',
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_rates(values):
+    rates = collections.OrderedDict(DEFAULT_RATES)
+    for value in values or ():
+        name, _, hz = value.partition('=')
+        if float(hz) <= 0:
+            rates.pop(name.upper(), None)
+        else:
+            rates[name.upper()] = float(hz)
+    return rates
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sentetik MAVLink kaynağıyla uçtan uca gecikme ve verim ölçümü "
+                                                 "(SITL ve ağ gerekmez)")
+    parser.add_argument('--duration', type=float, default=10.0, help="ölçüm süresi (s)")
+    parser.add_argument('--rate', action='append', metavar='MESAJ=HZ',
+                        help="mesaj hızı, ör. --rate ATTITUDE=100 (0 kapatır)")
+    parser.add_argument('--tlog', help="sentetik akış yerine bu kaydı oynat")
+    parser.add_argument('--speed', type=float, default=1.0, help="--tlog oynatma hızı")
+    parser.add_argument('--max-fps', type=int, default=30, help="Ui_MainWindow.max_fps")
+    parser.add_argument('--map-requests', type=int, default=2000, help="harita uç noktası başına istek, 0 atlar")
+    parser.add_argument('--output', help="sonucu JSON satırı olarak bu dosyaya ekle (zaman içinde izlemek için)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rates = parse_rates(args.rate)
+    result = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'qt': QtCore.QT_VERSION_STR,
+        'config': {'duration_s': args.duration, 'rates_hz': rates, 'tlog': args.tlog, 'speed': args.speed,
+                   'max_fps': args.max_fps},
+        'ui': bench_ui(args.duration, rates, args.tlog, args.speed, args.max_fps),
+    }
+    if args.map_requests:
+        result['map'] = bench_map(args.map_requests)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+    return result
+
+
+if __name__ == '__main__':
+    main()
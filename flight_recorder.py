@@ -0,0 +1,121 @@
+import datetime
+import os
+import queue
+import struct
+import threading
+import time
+
+
+class FlightRecorder(object):
+    # tlog layout: every frame is a big-endian uint64 unix time in microseconds followed by the raw MAVLink packet
+    TIMESTAMP = struct.Struct('>Q')
+
+    def __init__(self, directory='logs', prefix='ucus', max_bytes=256 * 1024 * 1024, max_seconds=3600,
+                 queue_size=100000, batch_size=1024, flush_interval=0.5):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes  # rotate after this many bytes (0 = never)
+        self.max_seconds = max_seconds  # rotate after this many seconds (0 = never)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self.dropped = 0
+        self.path = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._file = None
+        self._file_bytes = 0
+        self._file_opened = 0.0
+
+    def attach(self, vehicle):
+        # Both directions, like any tlog: commands, PARAM_SETs, mission uploads and setpoints the GCS sent
+        vehicle.add_message_listener('*', self._on_message)
+        vehicle.add_send_listener(self.record)
+
+    def detach(self, vehicle):
+        vehicle.remove_message_listener('*', self._on_message)
+        vehicle.remove_send_listener(self.record)
+
+    def _on_message(self, _vehicle, name, msg):
+        if name == 'BAD_DATA':
+            return
+        self.record(msg.get_msgbuf(), getattr(msg, '_timestamp', None))
+
+    def record(self, packet, timestamp=None):
+        # Called on the receive thread: only a non-blocking put, the writer thread does the I/O
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            self._queue.put_nowait((int(timestamp * 1.0e6), bytes(packet)))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name='FlightRecorder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _open(self):
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.directory, f"{self.prefix}_{stamp}.tlog")
+        n = 1
+        while os.path.exists(path):
+            path = os.path.join(self.directory, f"{self.prefix}_{stamp}_{n}.tlog")
+            n += 1
+        self.path = path
+        self._file = open(path, 'wb', buffering=1024 * 1024)
+        self._file_bytes = 0
+        self._file_opened = time.monotonic()
+
+    def _rotate_due(self):
+        if self.max_bytes and self._file_bytes >= self.max_bytes:
+            return True
+        return bool(self.max_seconds) and time.monotonic() - self._file_opened >= self.max_seconds
+
+    def _run(self):
+        pack = self.TIMESTAMP.pack
+        self._open()
+        last_flush = time.monotonic()
+        running = True
+        try:
+            while running:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    item = False
+                batch = bytearray()
+                count = 0
+                # Drain whatever is queued so one write() covers many frames
+                while item is not False:
+                    if item is None:
+                        running = False
+                        break
+                    batch += pack(item[0])
+                    batch += item[1]
+                    count += 1
+                    if count >= self.batch_size:
+                        break
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                if batch:
+                    self._file.write(batch)
+                    self._file_bytes += len(batch)
+                    self.frames += count
+                now = time.monotonic()
+                if now - last_flush >= self.flush_interval:
+                    self._file.flush()
+                    last_flush = now
+                if running and self._rotate_due():
+                    self._file.close()
+                    self._open()
+        finally:
+            self._file.close()
+            self._file = None
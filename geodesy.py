@@ -0,0 +1,97 @@
+import collections
+import math
+
+import numpy as np
+
+
+EARTH_RADIUS = 6371000.0  # m, mean radius used by every function here
+
+TrackStats = collections.namedtuple('TrackStats', [
+    'total_distance',  # m flown along the track
+    'max_range',  # m, farthest fix from home
+    'max_range_index',  # index of that fix
+    'groundspeed_histogram',  # (counts, bin edges in m/s), None without groundspeed samples
+])
+
+
+def distance(lat1, lon1, lat2, lon2):
+    # Scalar haversine in metres; per-frame callers stay clear of NumPy's call overhead
+    lat1, lon1, lat2, lon2 = math.radians(lat1), math.radians(lon1), math.radians(lat2), math.radians(lon2)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    # Great-circle distance in metres, arrays broadcast against each other
+    lat1, lon1 = np.radians(lat1), np.radians(lon1)
+    lat2, lon2 = np.radians(lat2), np.radians(lon2)
+    a = np.sin((lat2 - lat1) * 0.5) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing(lat1, lon1, lat2, lon2):
+    # Initial bearing in degrees (0 = north, clockwise) from point 1 to point 2
+    lat1, lat2 = np.radians(lat1), np.radians(lat2)
+    dlon = np.radians(lon2) - np.radians(lon1)
+    y = np.sin(dlon) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def destination(lat, lon, bearing_deg, distance_m):
+    # Point reached from (lat, lon) after distance_m metres on bearing_deg, returns (lat, lon)
+    lat, lon = np.radians(lat), np.radians(lon)
+    theta = np.radians(bearing_deg)
+    delta = np.asarray(distance_m, dtype=float) / EARTH_RADIUS
+    lat2 = np.arcsin(np.sin(lat) * np.cos(delta) + np.cos(lat) * np.sin(delta) * np.cos(theta))
+    lon2 = lon + np.arctan2(np.sin(theta) * np.sin(delta) * np.cos(lat), np.cos(delta) - np.sin(lat) * np.sin(lat2))
+    return np.degrees(lat2), (np.degrees(lon2) + 540.0) % 360.0 - 180.0
+
+
+def path_length(lat, lon):
+    # Cumulative distance along a track in metres, same length as the input, starting at 0
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    result = np.zeros(lat.shape)
+    if lat.size > 1:
+        np.cumsum(haversine(lat[:-1], lon[:-1], lat[1:], lon[1:]), out=result[1:])
+    return result
+
+
+def to_local(lat, lon, lat0, lon0):
+    # Equirectangular east/north metres around (lat0, lon0); exact enough over a few kilometres
+    east = np.radians(np.asarray(lon, dtype=float) - lon0) * EARTH_RADIUS * math.cos(math.radians(lat0))
+    north = np.radians(np.asarray(lat, dtype=float) - lat0) * EARTH_RADIUS
+    return east, north
+
+
+def from_local(east, north, lat0, lon0):
+    lat = lat0 + np.degrees(np.asarray(north, dtype=float) / EARTH_RADIUS)
+    lon = lon0 + np.degrees(np.asarray(east, dtype=float) / (EARTH_RADIUS * math.cos(math.radians(lat0))))
+    return lat, lon
+
+
+def track_stats(lat, lon, home=None, groundspeed=None, bins=20, max_speed=None):
+    # Whole-flight statistics; home defaults to the first fix, NaN fixes are ignored
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    if lat.size == 0:
+        return TrackStats(0.0, 0.0, None, None)
+    valid = ~(np.isnan(lat) | np.isnan(lon))
+    lat, lon = lat[valid], lon[valid]
+    if lat.size == 0:
+        return TrackStats(0.0, 0.0, None, None)
+    home_lat, home_lon = home if home is not None else (lat[0], lon[0])
+    legs = haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    ranges = haversine(home_lat, home_lon, lat, lon)
+    far = int(np.argmax(ranges))
+    max_range_index = int(np.flatnonzero(valid)[far])
+
+    histogram = None
+    if groundspeed is not None:
+        speeds = np.asarray(groundspeed, dtype=float)
+        speeds = speeds[~np.isnan(speeds)]
+        if speeds.size:
+            top = max_speed if max_speed is not None else max(float(speeds.max()), 1.0)
+            histogram = np.histogram(speeds, bins=bins, range=(0.0, top))
+    return TrackStats(float(legs.sum()), float(ranges[far]), max_range_index, histogram)
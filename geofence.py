@@ -0,0 +1,277 @@
+import collections
+import math
+import os
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+from pymavlink import mavutil
+
+import survey
+from geodesy import EARTH_RADIUS
+from mission import MissionItem
+
+
+# FenceStatus.state, worst first wins
+OK, NEAR, BREACH = 0, 1, 2
+
+Zone = collections.namedtuple('Zone', [
+    'name',
+    'inclusion',  # True: the vehicle must stay inside, False: it must stay out
+    'rings',  # polygon: [outer, *holes] as [(lat, lon)] without the closing vertex; circle: None
+    'center',  # circle: (lat, lon); polygon: None
+    'radius',  # circle radius in m
+])
+
+FenceStatus = collections.namedtuple('FenceStatus', [
+    'state',  # OK, NEAR or BREACH
+    'zone',  # name of the zone that set the state, None when OK
+    'distance',  # m to that zone's boundary (how far past it for a breach)
+])
+
+M_PER_DEGREE = math.radians(1.0) * EARTH_RADIUS
+
+
+def polygon(rings, inclusion=False, name=''):
+    rings = [list(ring[:-1]) if len(ring) > 1 and tuple(ring[0]) == tuple(ring[-1]) else list(ring)
+             for ring in rings]
+    if len(rings[0]) < 3:
+        raise ValueError(f"Poligonda en az 3 köşe olmalı: {name}")
+    return Zone(name, inclusion, rings, None, None)
+
+
+def circle(lat, lon, radius, inclusion=False, name=''):
+    return Zone(name, inclusion, None, (lat, lon), float(radius))
+
+
+def _inclusion(value, default):
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ('inclusion', 'include', 'true', '1')
+    return bool(value)
+
+
+def load_geojson(path, inclusion=False):
+    # Polygon/MultiPolygon features, and Point features with a "radius" property as circles.
+    # properties.fence = "inclusion" / "exclusion" picks the type, `inclusion` is the default.
+    zones = []
+    for geometry, properties in survey.geojson_features(path):
+        kind = _inclusion(properties.get('fence'), inclusion)
+        name = str(properties.get('name') or f"bölge {len(zones) + 1}")
+        if geometry and geometry['type'] == 'Point' and 'radius' in properties:
+            lon, lat = geometry['coordinates'][:2]
+            zones.append(circle(lat, lon, properties['radius'], kind, name))
+        for outer, holes in survey.geometry_polygons(geometry):
+            zones.append(polygon([outer] + holes, kind, name))
+    return zones
+
+
+def _local_name(element):
+    return element.tag.rsplit('}', 1)[-1]  # without the KML namespace
+
+
+def _children(element, name):
+    return [child for child in element.iter() if _local_name(child) == name]
+
+
+def _kml_ring(element):
+    coordinates = _children(element, 'coordinates')
+    if not coordinates:
+        return []
+    # "lon,lat[,alt] lon,lat[,alt] ..."
+    return [(float(lat), float(lon)) for lon, lat, *_alt in
+            (point.split(',') for point in coordinates[0].text.split())]
+
+
+def load_kml(path, inclusion=False):
+    # Placemark polygons, and points with a "radius" ExtendedData value as circles;
+    # ExtendedData "fence" = inclusion / exclusion as in load_geojson
+    zones = []
+    for placemark in _children(ElementTree.parse(path).getroot(), 'Placemark'):
+        names = _children(placemark, 'name')
+        data = {item.get('name'): ''.join(item.itertext()).strip() for item in _children(placemark, 'Data')}
+        kind = _inclusion(data.get('fence'), inclusion)
+        name = names[0].text.strip() if names and names[0].text else f"bölge {len(zones) + 1}"
+        for shape in _children(placemark, 'Polygon'):
+            outer = [_kml_ring(boundary) for boundary in shape if _local_name(boundary) == 'outerBoundaryIs']
+            holes = [_kml_ring(boundary) for boundary in shape if _local_name(boundary) == 'innerBoundaryIs']
+            if outer:
+                zones.append(polygon(outer[:1] + holes, kind, name))
+        if 'radius' in data:
+            for point in _children(placemark, 'Point'):
+                (lat, lon), = _kml_ring(point)
+                zones.append(circle(lat, lon, float(data['radius']), kind, name))
+    return zones
+
+
+def load(path, inclusion=False):
+    if os.path.splitext(path)[1].lower() == '.kml':
+        return load_kml(path, inclusion)
+    return load_geojson(path, inclusion)
+
+
+class Geofence(object):
+    # Inclusion/exclusion zones behind a lat/lon grid index. A position is only tested against the
+    # zones whose bounding box (plus margin) touches its cell; edges and circles of those zones are
+    # gathered into arrays once per cell and checked with one vectorized pass.
+    # As on ArduPilot, the vehicle has to be inside every inclusion zone and outside every exclusion zone.
+    LARGE_ZONE_CELLS = 256  # zones spanning more cells are tested everywhere instead of being gridded
+    MAX_CACHED_CELLS = 4096
+
+    def __init__(self, zones, margin=50.0, cell=None):
+        self.zones = list(zones)
+        self.margin = margin  # m, closer than this to a boundary is a near-breach
+        n = len(self.zones)
+        self._inclusion = np.array([zone.inclusion for zone in self.zones], dtype=bool)
+
+        # Every polygon edge in flat arrays (x = lon, y = lat in degrees); zone i owns edges[start[i]:end[i]]
+        x1, y1, x2, y2 = [], [], [], []
+        self._edge_range = np.zeros((n, 2), dtype=np.int64)
+        boxes = np.zeros((n, 4))  # south, west, north, east
+        count = 0
+        for i, zone in enumerate(self.zones):
+            if zone.rings is None:
+                lat, lon = zone.center
+                dlat = zone.radius / M_PER_DEGREE
+                dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+                boxes[i] = (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+                self._edge_range[i] = (count, count)
+                continue
+            for ring in zone.rings:
+                ring = np.asarray(ring, dtype=float)
+                y1.append(ring[:, 0])
+                x1.append(ring[:, 1])
+                y2.append(np.roll(ring[:, 0], -1))
+                x2.append(np.roll(ring[:, 1], -1))
+            outer = np.asarray(zone.rings[0], dtype=float)
+            boxes[i] = (outer[:, 0].min(), outer[:, 1].min(), outer[:, 0].max(), outer[:, 1].max())
+            size = sum(len(ring) for ring in zone.rings)
+            self._edge_range[i] = (count, count + size)
+            count += size
+        empty = [np.empty(0)]
+        self._x1, self._y1 = np.concatenate(x1 or empty), np.concatenate(y1 or empty)
+        self._x2, self._y2 = np.concatenate(x2 or empty), np.concatenate(y2 or empty)
+        self._edge_zone = np.repeat(np.arange(n), self._edge_range[:, 1] - self._edge_range[:, 0])
+
+        circles = [i for i, zone in enumerate(self.zones) if zone.rings is None]
+        self._circle_zone = np.array(circles, dtype=np.int64)
+        self._circle_lat = np.array([self.zones[i].center[0] for i in circles])
+        self._circle_lon = np.array([self.zones[i].center[1] for i in circles])
+        self._circle_radius = np.array([self.zones[i].radius for i in circles])
+
+        # Boxes grow by the margin, so a cell also finds the zones the vehicle is close to
+        if n:
+            dlat = margin / M_PER_DEGREE
+            dlon = dlat / max(math.cos(math.radians(np.abs(boxes[:, [0, 2]]).max())), 0.01)
+            boxes += (-dlat, -dlon, dlat, dlon)
+        if cell is None:
+            # About one zone across per cell
+            extent = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) if n else np.ones(1)
+            cell = float(np.clip(np.median(extent), 1e-4, 1.0))
+        self.cell = cell  # degrees
+
+        # Inclusion zones decide the state everywhere (outside one is a breach), so they are always tested
+        self._global = [i for i in range(n) if self.zones[i].inclusion]
+        self._grid = collections.defaultdict(list)
+        for i, (south, west, north, east) in enumerate(boxes):
+            if self.zones[i].inclusion:
+                continue
+            rows = range(int(math.floor(south / cell)), int(math.floor(north / cell)) + 1)
+            columns = range(int(math.floor(west / cell)), int(math.floor(east / cell)) + 1)
+            if len(rows) * len(columns) > self.LARGE_ZONE_CELLS:
+                self._global.append(i)
+                continue
+            for row in rows:
+                for column in columns:
+                    self._grid[row, column].append(i)
+        self._cells = {}
+
+    def __len__(self):
+        return len(self.zones)
+
+    def _cell(self, key):
+        # (zones, edge indexes, edge -> position in zones, circle indexes, circle -> position in zones)
+        cached = self._cells.get(key)
+        if cached is not None:
+            return cached
+        if len(self._cells) >= self.MAX_CACHED_CELLS:
+            self._cells.clear()
+        zones = np.array(sorted(set(self._global) | set(self._grid.get(key, ()))), dtype=np.int64)
+        position = np.full(len(self.zones), -1, dtype=np.int64)
+        position[zones] = np.arange(len(zones))
+        ranges = self._edge_range[zones]
+        edges = np.concatenate([np.arange(start, end) for start, end in ranges] or [np.empty(0, dtype=np.int64)])
+        circles = np.nonzero(position[self._circle_zone] >= 0)[0]
+        cached = (zones, edges, position[self._edge_zone[edges]], circles, position[self._circle_zone[circles]])
+        self._cells[key] = cached
+        return cached
+
+    def check(self, lat, lon):
+        zones, edges, edge_owner, circles, circle_owner = self._cell(
+            (int(math.floor(lat / self.cell)), int(math.floor(lon / self.cell))))
+        if not len(zones):
+            return FenceStatus(OK, None, None)
+        inside = np.zeros(len(zones), dtype=bool)
+        distance = np.full(len(zones), np.inf)
+
+        if len(edges):
+            x1, y1, x2, y2 = self._x1[edges], self._y1[edges], self._x2[edges], self._y2[edges]
+            # Even-odd ray cast towards +lon, holes fall out of the parity
+            crosses = (y1 > lat) != (y2 > lat)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = x1 + (lat - y1) / (y2 - y1) * (x2 - x1)
+            crosses &= lon < x_cross
+            inside = np.bincount(edge_owner[crosses], minlength=len(zones)) % 2 == 1
+            # Point to segment distance on a local flat projection around the position
+            kx = M_PER_DEGREE * math.cos(math.radians(lat))
+            ax, ay = (x1 - lon) * kx, (y1 - lat) * M_PER_DEGREE
+            dx, dy = (x2 - x1) * kx, (y2 - y1) * M_PER_DEGREE
+            length = dx * dx + dy * dy
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = np.clip(np.where(length > 0, -(ax * dx + ay * dy) / length, 0.0), 0.0, 1.0)
+            np.minimum.at(distance, edge_owner, np.hypot(ax + t * dx, ay + t * dy))
+
+        if len(circles):
+            kx = M_PER_DEGREE * math.cos(math.radians(lat))
+            center = np.hypot((self._circle_lon[circles] - lon) * kx, (self._circle_lat[circles] - lat) * M_PER_DEGREE)
+            radius = self._circle_radius[circles]
+            inside[circle_owner] = center <= radius
+            distance[circle_owner] = np.abs(center - radius)
+
+        inclusion = self._inclusion[zones]
+        breach = inside != inclusion  # out of an inclusion zone or inside an exclusion zone
+        if breach.any():
+            worst = np.nonzero(breach)[0]
+            worst = worst[np.argmax(distance[worst])]
+            return FenceStatus(BREACH, self.zones[zones[worst]].name, float(distance[worst]))
+        closest = int(np.argmin(distance))
+        if distance[closest] < self.margin:
+            return FenceStatus(NEAR, self.zones[zones[closest]].name, float(distance[closest]))
+        return FenceStatus(OK, None, None)
+
+    def unsendable_holes(self):
+        # Names of exclusion zones whose holes mission_items() leaves out, the vehicle's fence differs there
+        return [zone.name for zone in self.zones if not zone.inclusion and zone.rings is not None
+                and len(zone.rings) > 1]
+
+    def mission_items(self):
+        # The zones as MAV_MISSION_TYPE_FENCE items. The fence protocol has no holes: holes of an
+        # inclusion polygon become exclusion polygons, holes of an exclusion polygon cannot be sent
+        # (see unsendable_holes()).
+        items = []
+        for zone in self.zones:
+            if zone.rings is None:
+                command = (mavutil.mavlink.MAV_CMD_NAV_FENCE_CIRCLE_INCLUSION if zone.inclusion
+                           else mavutil.mavlink.MAV_CMD_NAV_FENCE_CIRCLE_EXCLUSION)
+                items.append(MissionItem(command, zone.center[0], zone.center[1], 0.0, zone.radius,
+                                         frame=mavutil.mavlink.MAV_FRAME_GLOBAL))
+                continue
+            rings = [(zone.rings[0], zone.inclusion)]
+            if zone.inclusion:
+                rings += [(hole, False) for hole in zone.rings[1:]]
+            for ring, inclusion in rings:
+                command = (mavutil.mavlink.MAV_CMD_NAV_FENCE_POLYGON_VERTEX_INCLUSION if inclusion
+                           else mavutil.mavlink.MAV_CMD_NAV_FENCE_POLYGON_VERTEX_EXCLUSION)
+                items.extend(MissionItem(command, lat, lon, 0.0, len(ring), frame=mavutil.mavlink.MAV_FRAME_GLOBAL)
+                             for lat, lon in ring)
+        return items
@@ -0,0 +1,107 @@
+import collections
+import threading
+import time
+
+from pymavlink import mavutil
+
+
+LinkStats = collections.namedtuple('LinkStats', [
+    'quality',  # fraction of packets received, from MAVLink sequence gaps
+    'rx_packets',  # packets/s received
+    'rx_bytes',  # bytes/s received
+    'tx_bytes',  # bytes/s sent
+    'rtt',  # TIMESYNC round trip in seconds (None until answered)
+    'heartbeat_age',  # seconds since the last autopilot heartbeat
+    'rssi',  # RADIO_STATUS local/remote RSSI (None without a SiK style radio)
+    'remrssi',
+])
+
+
+class LinkHealthMonitor(object):
+    def __init__(self, window=10, history=120):
+        self.window = window  # seconds in the sliding window
+        self.history = collections.deque(maxlen=history)  # one quality sample per stats() call
+        self.vehicle = None
+        self.rtt = None
+        self.last_heartbeat = None
+        self.radio = None
+        self._buckets = collections.deque()  # [second, received, lost, rx_bytes, tx_bytes]
+        self._last_seq = {}
+        self._timesync_sent = None
+        self._lock = threading.Lock()
+
+    def attach(self, vehicle):
+        self.vehicle = vehicle
+        vehicle.add_message_listener('*', self._on_message)
+        vehicle.message_factory.set_send_callback(self._on_send)
+
+    def detach(self, vehicle):
+        vehicle.remove_message_listener('*', self._on_message)
+        vehicle.message_factory.set_send_callback(None)
+
+    def _bucket(self, now):
+        second = int(now)
+        buckets = self._buckets
+        if not buckets or buckets[-1][0] != second:
+            buckets.append([second, 0, 0, 0, 0])
+            while buckets[0][0] <= second - self.window:
+                buckets.popleft()
+        return buckets[-1]
+
+    def _on_send(self, msg, *args, **kwargs):
+        with self._lock:
+            self._bucket(time.monotonic())[4] += len(msg.get_msgbuf())
+
+    def _on_message(self, _vehicle, name, msg):
+        now = time.monotonic()
+        if name == 'BAD_DATA':
+            return
+        source = (msg.get_srcSystem(), msg.get_srcComponent())
+        seq = msg.get_seq()
+        with self._lock:
+            bucket = self._bucket(now)
+            last = self._last_seq.get(source)
+            if last is not None:
+                gap = (seq - last - 1) % 256
+                if gap < 128:  # larger jumps are a restart or a second link, not loss
+                    bucket[2] += gap
+            self._last_seq[source] = seq
+            bucket[1] += 1
+            bucket[3] += len(msg.get_msgbuf())
+
+        if name == 'HEARTBEAT' and msg.type != mavutil.mavlink.MAV_TYPE_GCS:
+            self.last_heartbeat = now
+        elif name == 'RADIO_STATUS':
+            self.radio = msg
+        elif name == 'TIMESYNC' and msg.tc1 != 0 and msg.ts1 == self._timesync_sent:
+            self.rtt = (time.monotonic_ns() - msg.ts1) / 1.0e9
+            self._timesync_sent = None
+
+    def request_timesync(self):
+        self._timesync_sent = time.monotonic_ns()
+        self.vehicle.send_mavlink(self.vehicle.message_factory.timesync_encode(0, self._timesync_sent))
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            self._bucket(now)
+            buckets = list(self._buckets)
+        # The current second is still filling, rates use the completed ones
+        done = buckets[:-1] or buckets
+        seconds = max(1, len(done))
+        received = sum(b[1] for b in done)
+        lost = sum(b[2] for b in done)
+        quality = received / float(received + lost) if received + lost else 0.0
+        radio = self.radio
+        stats = LinkStats(
+            quality=quality,
+            rx_packets=received / float(seconds),
+            rx_bytes=sum(b[3] for b in done) / float(seconds),
+            tx_bytes=sum(b[4] for b in done) / float(seconds),
+            rtt=self.rtt,
+            heartbeat_age=now - self.last_heartbeat if self.last_heartbeat is not None else None,
+            rssi=radio.rssi if radio is not None else None,
+            remrssi=radio.remrssi if radio is not None else None,
+        )
+        self.history.append(quality)
+        return stats
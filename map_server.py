@@ -0,0 +1,182 @@
+import collections
+import json
+import math
+import queue
+import threading
+
+from flask import Flask, Response, abort, jsonify
+import folium
+
+import profiling
+from tile_cache import TileCache
+
+
+app = Flask(__name__)
+
+
+class LocationStream(object):
+    def __init__(self, track_length=2000, client_queue_size=64):
+        self.last = None
+        self.track = collections.deque(maxlen=track_length)
+        self.client_queue_size = client_queue_size
+        self._clients = []
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        client = queue.Queue(maxsize=self.client_queue_size)
+        with self._lock:
+            self._clients.append(client)
+            track = list(self.track)
+        return client, track
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.remove(client)
+
+    def publish(self, lat, lon, alt=None, heading=None):
+        event = {'lat': lat, 'lon': lon, 'alt': alt, 'heading': heading}
+        with self._lock:
+            if event == self.last:
+                return
+            moved = self.last is None or (self.last['lat'], self.last['lon']) != (lat, lon)
+            self.last = event
+            if moved:
+                self.track.append((lat, lon))
+            clients = list(self._clients)
+        for client in clients:
+            # A slow browser only loses its own oldest fixes, it never blocks the publisher
+            while True:
+                try:
+                    client.put_nowait(event)
+                    break
+                except queue.Full:
+                    profiling.count('map.dropped')
+                    try:
+                        client.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def publish_telemetry(self, telemetry):
+        location = telemetry.get('current_location')
+        if location is None or location.lat is None or location.lon is None:
+            return
+        attitude = telemetry.get('attitude')
+        heading = None
+        if attitude is not None and attitude.yaw is not None:
+            heading = math.degrees(attitude.yaw) % 360
+        self.publish(location.lat, location.lon, location.alt, heading)
+
+
+location_stream = LocationStream()
+tile_cache = None
+_map_html = None
+
+TILE_ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+
+LIVE_MAP_SCRIPT = """
+var droneIcon = L.divIcon({className: '', iconSize: [30, 30], iconAnchor: [15, 15],
+    html: '<div id="drone" style="font-size:30px;line-height:30px;color:#d00;">&#x27A4;</div>'});
+var droneMarker = L.marker([%(lat)f, %(lon)f], {icon: droneIcon}).addTo(%(map)s);
+var droneTrack = L.polyline([], {color: 'red', weight: 2}).addTo(%(map)s);
+var droneFollow = true, droneFirstFix = true, droneLast = null;
+%(map)s.on('dragstart', function() { droneFollow = false; });
+%(map)s.on('dblclick', function() { droneFollow = true; });
+var droneSource = new EventSource('/stream');
+droneSource.addEventListener('track', function(e) {
+    var track = JSON.parse(e.data);
+    droneTrack.setLatLngs(track);
+    droneLast = track.length ? track[track.length - 1] : null;
+});
+droneSource.onmessage = function(e) {
+    var p = JSON.parse(e.data), ll = [p.lat, p.lon];
+    droneMarker.setLatLng(ll);
+    // Heading-only updates repeat the position, the track only grows when the vehicle moved
+    if (droneLast === null || droneLast[0] !== p.lat || droneLast[1] !== p.lon) {
+        droneTrack.addLatLng(ll);
+        droneLast = ll;
+    }
+    if (p.heading !== null) {
+        document.getElementById('drone').style.transform = 'rotate(' + (p.heading - 90) + 'deg)';
+    }
+    if (droneFirstFix) {
+        %(map)s.setView(ll, %(map)s.getZoom());
+        droneFirstFix = false;
+    } else if (droneFollow) {
+        %(map)s.panTo(ll, {animate: false});
+    }
+};
+"""
+
+
+def build_map(lat, lon, zoom_start=15):
+    # Rendered once; position updates reach the page over /stream
+    # Tiles come from this server's cache, so the map works without a network
+    drone_map = folium.Map(location=[lat, lon], zoom_start=zoom_start, tiles=None)
+    folium.TileLayer(tiles='/tiles/{z}/{x}/{y}.png', attr=TILE_ATTRIBUTION, name='OpenStreetMap',
+                     max_zoom=19).add_to(drone_map)
+    script = LIVE_MAP_SCRIPT % {'lat': lat, 'lon': lon, 'map': drone_map.get_name()}
+    drone_map.get_root().script.add_child(folium.Element(script))
+    return drone_map.get_root().render()
+
+
+@app.route('/')
+@profiling.timed('http.index')
+def index():
+    return Response(_map_html, mimetype='text/html')
+
+
+@app.route('/location')
+@profiling.timed('http.location')
+def location():
+    last = location_stream.last
+    if last is None:
+        return jsonify(lat=None, lon=None)
+    return jsonify(**last)
+
+
+@app.route('/tiles/<int:z>/<int:x>/<int:y>.png')
+@profiling.timed('http.tiles')
+def tile(z, x, y):
+    data = tile_cache.get(z, x, y)
+    if data is None:
+        abort(404)
+    return Response(data, mimetype='image/png', headers={'Cache-Control': 'max-age=86400'})
+
+
+@app.route('/metrics')
+def metrics():
+    return Response(profiling.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/metrics.json')
+def metrics_json():
+    return Response(profiling.to_json(), mimetype='application/json')
+
+
+@app.route('/stream')
+def stream():
+    def events():
+        client, track = location_stream.subscribe()
+        try:
+            yield f"event: track\ndata: {json.dumps(track)}\n\n"
+            if location_stream.last is not None:
+                yield f"data: {json.dumps(location_stream.last)}\n\n"
+            while True:
+                try:
+                    event = client.get(timeout=15)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            location_stream.unsubscribe(client)
+
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def start_flask_app(lat=0.0, lon=0.0, host='127.0.0.1', port=5000):
+    global _map_html, tile_cache
+    tile_cache = TileCache()
+    _map_html = build_map(lat, lon)
+    app.run(host=host, port=port, threaded=True)
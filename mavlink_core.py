@@ -0,0 +1,394 @@
+import asyncio
+import functools
+import logging
+import sys
+import threading
+import time
+
+from pymavlink import mavutil
+from pymavlink.dialects.v20 import ardupilotmega as mavlink2
+
+from parameters import ParameterSet
+from telemetry import message_to_data
+
+
+log = logging.getLogger(__name__)
+
+# telemetry key -> dronekit style attribute name notified to attribute listeners
+ATTRIBUTE_NAMES = {
+    'attitude': 'attitude',
+    'location': 'location.global_relative_frame',
+    'current_location': 'location.global_frame',
+    'battery': 'battery',
+    'groundspeed': 'groundspeed',
+    'airspeed': 'airspeed',
+    'gps': 'gps_0',
+    'mode': 'mode',
+    'armed': 'armed',
+    'home_location': 'home_location',
+}
+
+
+class Locations(object):
+    def __init__(self):
+        self.global_frame = None
+        self.global_relative_frame = None
+
+
+class MavlinkCore(object):
+    # One asyncio loop in a background thread serves every link
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='MavlinkCore', daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def submit(self, coro):
+        # Runs a coroutine on the core loop from any thread, returns a concurrent.futures.Future
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def connect(self, connection_string, baud=57600, source_system=255, on_error=None, conn=None):
+        # Returns at once; the port is opened on the loop and on_error(exception) is called if that fails.
+        # conn: an already open mavutil style connection used instead of connection_string (benchmark source)
+        vehicle = MavlinkVehicle(self, connection_string, baud, source_system)
+        vehicle.on_error = on_error
+        self.loop.call_soon_threadsafe(vehicle.open, conn)
+        return vehicle
+
+
+class MavlinkVehicle(object):
+    # Subset of the dronekit Vehicle API used by the GCS, plus awaitable commands and parameters
+    def __init__(self, core, connection_string, baud=57600, source_system=255):
+        self.core = core
+        self.connection_string = connection_string
+        self.baud = baud
+        self.conn = None
+        self.on_error = None
+        self.target_system = None
+        self.target_component = None  # component of the autopilot heartbeat
+        self.autopilot = None  # MAV_AUTOPILOT of the vehicle, protocol details differ between ArduPilot and PX4
+        self.last_heartbeat = None
+
+        self.attitude = None
+        self.location = Locations()
+        self.battery = None
+        self.groundspeed = None
+        self.airspeed = None
+        self.gps_0 = None
+        self.mode = None
+        self.armed = False
+        self.home_location = None
+        self.parameters = ParameterSet(self)
+
+        # Outgoing messages are encoded here (always MAVLink 2) and written to whatever port is open
+        self.mav = mavlink2.MAVLink(self, srcSystem=source_system,
+                                    srcComponent=mavutil.mavlink.MAV_COMP_ID_MISSIONPLANNER)
+        self._send_lock = threading.Lock()
+        self._attribute_listeners = {}
+        self._message_listeners = {}
+        self._connect_listeners = ()
+        self._send_listeners = ()
+        self._ack_waiters = {}  # command id -> future
+        self._command_locks = {}
+        self._param_waiters = {}  # param name -> [future]
+        self._tasks = []
+        self._reader_fd = None
+        self._reader_port = None  # conn.port the reader was added for
+
+    @property
+    def message_factory(self):
+        return self.mav
+
+    @property
+    def is_armable(self):
+        return self.mode is not None and self.mode.name != 'INITIALISING' and \
+            self.gps_0 is not None and self.gps_0.fix_type > 1
+
+    def mode_mapping(self):
+        if self.conn is None:
+            return {}
+        return self.conn.mode_mapping() or {}
+
+    def call(self, coro):
+        return self.core.submit(coro)
+
+    # --- connection, runs on the core loop ---
+
+    def open(self, conn=None):
+        self._tasks.append(self.core.loop.create_task(self._open(conn)))
+
+    async def _open(self, conn=None):
+        loop = asyncio.get_running_loop()
+        try:
+            if conn is None:
+                conn = await loop.run_in_executor(None, functools.partial(
+                    mavutil.mavlink_connection, self.connection_string, baud=self.baud,
+                    source_system=self.mav.srcSystem, autoreconnect=True))
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+            return
+        self.conn = conn
+        fd = getattr(self.conn, 'fd', None)
+        if fd is not None and sys.platform != 'win32':
+            self._reader_fd = fd
+            self._reader_port = getattr(conn, 'port', None)
+            loop.add_reader(fd, self._read)
+        else:
+            self._tasks.append(loop.create_task(self._poll()))
+        self._tasks.append(loop.create_task(self._heartbeat()))
+
+    def close(self):
+        self.core.loop.call_soon_threadsafe(self._close)
+
+    def _close(self):
+        if self._reader_fd is not None:
+            self.core.loop.remove_reader(self._reader_fd)
+            self._reader_fd = None
+        for task in self._tasks:
+            task.cancel()
+        if self.conn is not None:
+            self.conn.close()
+
+    def write(self, buf):
+        # File interface for self.mav; drops packets until the port is open and while a TCP link reconnects
+        # (mavtcp.write would otherwise reconnect on the loop thread)
+        if self.conn is not None and getattr(self.conn, 'port', True) is not None:
+            self.conn.write(buf)
+            for fn in self._send_listeners:
+                fn(buf)
+
+    def send_mavlink(self, msg):
+        with self._send_lock:
+            self.mav.send(msg)
+
+    def send_packed(self, packed):
+        # setpoint.PackedMessage: same frame every time, only the sequence number and CRC change
+        mav = self.mav
+        with self._send_lock:
+            buf = packed.stamp(mav.seq)
+            self.write(buf)
+            mav.seq = (mav.seq + 1) % 256
+            mav.total_packets_sent += 1
+            mav.total_bytes_sent += len(buf)
+            if mav.send_callback is not None:
+                mav.send_callback(packed.msg, *mav.send_callback_args, **mav.send_callback_kwargs)
+
+    def _read(self):
+        while True:
+            try:
+                msg = self.conn.recv_msg()
+            except OSError:
+                break
+            if msg is None:
+                break
+            self._handle(msg)
+        if self._reader_fd is not None:
+            self._follow_port()
+
+    def _follow_port(self):
+        # autoreconnect replaces conn.port with a new socket (new fd) and leaves conn.fd on the closed one,
+        # so the reader moves to whatever port the connection has now
+        port = getattr(self.conn, 'port', None)
+        if port is self._reader_port:
+            return
+        loop = self.core.loop
+        loop.remove_reader(self._reader_fd)
+        self._reader_port = port
+        if port is None:
+            # The reconnect failed; keep retrying off the loop so the other vehicles are not blocked
+            self._tasks.append(loop.create_task(self._reconnect()))
+            return
+        self._reader_fd = port.fileno()
+        loop.add_reader(self._reader_fd, self._read)
+
+    async def _reconnect(self):
+        loop = asyncio.get_running_loop()
+        while getattr(self.conn, 'port', None) is None:
+            try:
+                await loop.run_in_executor(None, self.conn.reconnect)
+            except OSError:
+                await asyncio.sleep(1.0)
+        self._follow_port()
+
+    async def _poll(self):
+        # Ports without a selectable file descriptor (serial on Windows)
+        while True:
+            self._read()
+            await asyncio.sleep(0.005)
+
+    async def _heartbeat(self):
+        while True:
+            self.send_mavlink(self.mav.heartbeat_encode(mavutil.mavlink.MAV_TYPE_GCS,
+                                                        mavutil.mavlink.MAV_AUTOPILOT_INVALID, 0, 0, 0))
+            if self.target_system is not None and self.home_location is None:
+                self.send_mavlink(self.mav.command_long_encode(
+                    self.target_system, 0, mavutil.mavlink.MAV_CMD_GET_HOME_POSITION, 0, 0, 0, 0, 0, 0, 0, 0))
+            await asyncio.sleep(1.0)
+
+    # --- incoming messages ---
+
+    def _handle(self, msg):
+        msg_type = msg.get_type()
+        if msg_type == 'BAD_DATA':
+            return
+        if msg_type == 'HEARTBEAT' and msg.type != mavutil.mavlink.MAV_TYPE_GCS and \
+                msg.autopilot != mavutil.mavlink.MAV_AUTOPILOT_INVALID:
+            if self.target_system is None:
+                self.target_system = msg.get_srcSystem()
+                self.target_component = msg.get_srcComponent()
+                self.autopilot = msg.autopilot
+                # Telemetry first; parameters follow in the background (from disk when unchanged)
+                self.parameters.start()
+                self._notify_connected()
+            self.last_heartbeat = time.monotonic()
+        elif msg_type == 'COMMAND_ACK' and self.from_autopilot(msg):
+            # Only the autopilot's answer completes a waiter, not an ACK another component sent
+            future = self._ack_waiters.get(msg.command)
+            if future is not None and not future.done() and msg.result != mavutil.mavlink.MAV_RESULT_IN_PROGRESS:
+                future.set_result(msg.result)
+        elif msg_type == 'PARAM_VALUE' and self.from_autopilot(msg):
+            for future in self._param_waiters.pop(msg.param_id, ()):
+                if not future.done():
+                    future.set_result(msg)
+
+        if self.target_system is None or msg.get_srcSystem() == self.target_system:
+            for key, value in message_to_data(msg).items():
+                self._set_attribute(key, value)
+
+        for listener in self._message_listeners.get(msg_type, ()) + self._message_listeners.get('*', ()):
+            try:
+                listener(self, msg_type, msg)
+            except Exception:
+                log.exception("message listener failed")
+
+    def _set_attribute(self, key, value):
+        if key == 'location':
+            self.location.global_relative_frame = value
+        elif key == 'current_location':
+            self.location.global_frame = value
+        elif key == 'gps':
+            self.gps_0 = value
+        else:
+            setattr(self, key, value)
+        name = ATTRIBUTE_NAMES[key]
+        for listener in self._attribute_listeners.get(name, ()):
+            try:
+                listener(self, name, value)
+            except Exception:
+                log.exception("attribute listener failed")
+
+    # --- dronekit compatible listeners ---
+
+    def add_attribute_listener(self, attr_name, fn):
+        self._attribute_listeners[attr_name] = self._attribute_listeners.get(attr_name, ()) + (fn,)
+
+    def remove_attribute_listener(self, attr_name, fn):
+        self._attribute_listeners[attr_name] = tuple(
+            f for f in self._attribute_listeners.get(attr_name, ()) if f != fn)
+
+    def add_message_listener(self, name, fn):
+        # Tuples are replaced, never mutated, so the loop thread can iterate them without a lock
+        self._message_listeners[name] = self._message_listeners.get(name, ()) + (fn,)
+
+    def remove_message_listener(self, name, fn):
+        self._message_listeners[name] = tuple(f for f in self._message_listeners.get(name, ()) if f != fn)
+
+    def add_send_listener(self, fn):
+        # fn(frame bytes) for every frame written to the port, from send_mavlink and send_packed alike,
+        # on the sending thread with the send lock held
+        self._send_listeners += (fn,)
+
+    def remove_send_listener(self, fn):
+        self._send_listeners = tuple(f for f in self._send_listeners if f != fn)
+
+    def from_autopilot(self, msg):
+        # Cameras, gimbals and companion computers on the same link answer with their own ids
+        return msg.get_srcSystem() == self.target_system and msg.get_srcComponent() == self.target_component
+
+    def add_connect_listener(self, fn):
+        # fn(vehicle) on the core loop once the first autopilot heartbeat arrived: the port is open, the
+        # vehicle has a peer to answer and target_system is known. connect() returns long before that,
+        # so anything sent once at startup belongs here. Right away when the link is already up.
+        self.core.loop.call_soon_threadsafe(self._add_connect_listener, fn)
+
+    def _add_connect_listener(self, fn):
+        if self.target_system is None:
+            self._connect_listeners += (fn,)
+        else:
+            self._call_listener(fn)
+
+    def remove_connect_listener(self, fn):
+        self._connect_listeners = tuple(f for f in self._connect_listeners if f != fn)
+
+    def _notify_connected(self):
+        listeners, self._connect_listeners = self._connect_listeners, ()
+        for fn in listeners:
+            self._call_listener(fn)
+
+    def _call_listener(self, fn):
+        try:
+            fn(self)
+        except Exception:
+            log.exception("connect listener failed")
+
+    # --- awaitable API, call from the core loop or through call() ---
+
+    async def command_long(self, command, *params, timeout=1.5, retries=3):
+        # MAV_RESULT of the final COMMAND_ACK, None if the vehicle never answered
+        params = tuple(params) + (0,) * (7 - len(params))
+        lock = self._command_locks.setdefault(command, asyncio.Lock())
+        async with lock:
+            future = asyncio.get_running_loop().create_future()
+            self._ack_waiters[command] = future
+            try:
+                for confirmation in range(retries):
+                    self.send_mavlink(self.mav.command_long_encode(
+                        self.target_system or 0, self.target_component or 0, command, confirmation, *params))
+                    try:
+                        return await asyncio.wait_for(asyncio.shield(future), timeout)
+                    except asyncio.TimeoutError:
+                        continue
+                return None
+            finally:
+                self._ack_waiters.pop(command, None)
+
+    async def _param_request(self, name, msg, timeout, retries):
+        for _ in range(retries):
+            future = asyncio.get_running_loop().create_future()
+            waiters = self._param_waiters.setdefault(name, [])
+            waiters.append(future)
+            self.send_mavlink(msg)
+            try:
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                continue
+            finally:
+                # A name that never answers (_HASH_CHECK on ArduPilot) must not collect dead futures
+                if future in waiters:
+                    waiters.remove(future)
+                if not waiters and self._param_waiters.get(name) is waiters:
+                    del self._param_waiters[name]
+        return None
+
+    async def param_get(self, name, timeout=1.0, retries=3):
+        # PARAM_VALUE message, None on timeout
+        msg = self.mav.param_request_read_encode(self.target_system or 0, self.target_component or 0,
+                                                 name.encode(), -1)
+        return await self._param_request(name, msg, timeout, retries)
+
+    async def param_set(self, name, value, param_type=mavutil.mavlink.MAV_PARAM_TYPE_REAL32, timeout=1.0,
+                        retries=3):
+        # The autopilot answers a PARAM_SET with PARAM_VALUE carrying the value it actually stored
+        msg = self.mav.param_set_encode(self.target_system or 0, self.target_component or 0, name.encode(), value,
+                                        param_type)
+        return await self._param_request(name, msg, timeout, retries)
@@ -0,0 +1,565 @@
+import asyncio
+import collections
+import threading
+import time
+
+from PyQt5 import QtCore, QtWidgets
+from pymavlink import mavutil
+
+import tile_cache
+
+
+MISSION = mavutil.mavlink.MAV_MISSION_TYPE_MISSION
+FENCE = mavutil.mavlink.MAV_MISSION_TYPE_FENCE
+RALLY = mavutil.mavlink.MAV_MISSION_TYPE_RALLY
+TYPE_NAMES = {MISSION: "Görev", FENCE: "Geofence", RALLY: "Toplanma noktası"}
+
+MissionItem = collections.namedtuple('MissionItem', [
+    'command', 'lat', 'lon', 'alt', 'param1', 'param2', 'param3', 'param4', 'frame', 'autocontinue',
+], defaults=(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT, 1))
+
+# x/y of these frames are degrees * 1e7 in MISSION_ITEM_INT, other frames carry raw numbers
+GLOBAL_FRAMES = {
+    mavutil.mavlink.MAV_FRAME_GLOBAL,
+    mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT,
+    mavutil.mavlink.MAV_FRAME_GLOBAL_TERRAIN_ALT,
+    mavutil.mavlink.MAV_FRAME_GLOBAL_INT,
+    mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT,
+    mavutil.mavlink.MAV_FRAME_GLOBAL_TERRAIN_ALT_INT,
+}
+
+MISSION_MESSAGES = ('MISSION_REQUEST_INT', 'MISSION_REQUEST', 'MISSION_ACK', 'MISSION_COUNT', 'MISSION_ITEM_INT')
+
+
+def waypoint(lat, lon, alt, hold=0.0):
+    return MissionItem(mavutil.mavlink.MAV_CMD_NAV_WAYPOINT, lat, lon, alt, param1=hold)
+
+
+def survey_mission(outer, holes=(), altitude=50.0, side_overlap=0.7, front_overlap=0.8, angle=0.0,
+                   overshoot=0.0, camera=(13.2, 8.8, 8.8)):
+    # Lawnmower over a polygon, spacing and camera trigger distance from the footprint and overlaps
+    import survey  # NumPy, loaded on the first survey rather than at startup
+    width, length = survey.footprint(altitude, *camera)
+    lat, lon = survey.lawnmower(outer, holes, width * (1.0 - side_overlap), angle, overshoot)
+    trigger = MissionItem(mavutil.mavlink.MAV_CMD_DO_SET_CAM_TRIGG_DIST, param1=length * (1.0 - front_overlap),
+                          frame=mavutil.mavlink.MAV_FRAME_MISSION)
+    items = [trigger] + [waypoint(a, b, altitude) for a, b in zip(lat.tolist(), lon.tolist())]
+    items.append(trigger._replace(param1=0.0))
+    return items
+
+
+def command_name(command):
+    entry = mavutil.mavlink.enums['MAV_CMD'].get(command)
+    return entry.name.replace('MAV_CMD_', '') if entry is not None else str(command)
+
+
+def command_id(name):
+    name = name.strip().upper()
+    if name.isdigit():
+        return int(name)
+    return getattr(mavutil.mavlink, 'MAV_CMD_' + name.replace('MAV_CMD_', ''))
+
+
+def read_waypoints(path):
+    # QGC WPL 110 text files (Mission Planner / MAVProxy), seq 0 is the home position
+    items = []
+    with open(path) as f:
+        if not f.readline().startswith('QGC WPL'):
+            raise ValueError(f"{path}: QGC WPL dosyası değil")
+        for line in f:
+            fields = line.split()
+            if len(fields) < 12:
+                continue
+            p1, p2, p3, p4, x, y, z = (float(v) for v in fields[4:11])
+            items.append(MissionItem(int(fields[3]), x, y, z, p1, p2, p3, p4, int(fields[2]), int(fields[11])))
+    return items
+
+
+def write_waypoints(path, items):
+    with open(path, 'w') as f:
+        f.write('QGC WPL 110\n')
+        for seq, item in enumerate(items):
+            f.write('\t'.join(str(v) for v in (
+                seq, 1 if seq == 0 else 0, item.frame, item.command, item.param1, item.param2, item.param3,
+                item.param4, item.lat, item.lon, item.alt, item.autocontinue)) + '\n')
+
+
+class MissionProtocol(object):
+    # MAVLink mission protocol for one vehicle; coroutines run on the MAVLink core loop
+    def __init__(self, vehicle, timeout=1.0, min_timeout=0.05, retries=8, window=16):
+        self.vehicle = vehicle
+        self.timeout = timeout  # upper bound of the silence before the last step is repeated
+        self.min_timeout = min_timeout
+        self.retries = retries  # silent timeouts in a row before a transfer is given up
+        self.window = window  # MISSION_REQUEST_INTs outstanding during a download
+        # Smoothed request/answer round trip. The upload is paced by the vehicle, one item per round trip,
+        # so on a lossy radio the time goes into waiting for retries: they fire after 4 round trips
+        # instead of a fixed second.
+        self.rtt = None
+        self._lock = asyncio.Lock()  # the protocol allows one transfer per vehicle at a time
+
+    def _retry_timeout(self):
+        if self.rtt is None:
+            return self.timeout
+        return min(self.timeout, max(self.min_timeout, 4 * self.rtt))
+
+    def _sample_rtt(self, rtt):
+        self.rtt = rtt if self.rtt is None else 0.875 * self.rtt + 0.125 * rtt
+
+    def _subscribe(self, mission_type):
+        queue = asyncio.Queue()
+
+        def listener(_vehicle, _name, msg):
+            if msg.get_srcSystem() == self.vehicle.target_system and \
+                    getattr(msg, 'mission_type', MISSION) == mission_type:
+                queue.put_nowait(msg)
+        for name in MISSION_MESSAGES:
+            self.vehicle.add_message_listener(name, listener)
+        return queue, listener
+
+    def _unsubscribe(self, listener):
+        for name in MISSION_MESSAGES:
+            self.vehicle.remove_message_listener(name, listener)
+
+    def _encode(self, seq, item, mission_type):
+        if item.frame in GLOBAL_FRAMES:
+            x, y = int(round(item.lat * 1e7)), int(round(item.lon * 1e7))
+        else:
+            x, y = int(item.lat), int(item.lon)
+        return self.vehicle.message_factory.mission_item_int_encode(
+            self.vehicle.target_system, 0, seq, item.frame, item.command, 0, item.autocontinue,
+            item.param1, item.param2, item.param3, item.param4, x, y, item.alt, mission_type)
+
+    @staticmethod
+    def _decode(msg):
+        scale = 1e-7 if msg.frame in GLOBAL_FRAMES else 1
+        return MissionItem(msg.command, msg.x * scale, msg.y * scale, msg.z, msg.param1, msg.param2, msg.param3,
+                           msg.param4, msg.frame, msg.autocontinue)
+
+    @staticmethod
+    def _ack_text(result):
+        return mavutil.mavlink.enums['MAV_MISSION_RESULT'][result].name.replace('MAV_MISSION_', '')
+
+    async def upload(self, items, mission_type=MISSION, progress=None):
+        # (accepted, detail). The vehicle pulls items one by one; every answer is encoded up front and
+        # only the last message is repeated, and only when the vehicle goes quiet.
+        vehicle = self.vehicle
+        messages = [self._encode(seq, item, mission_type) for seq, item in enumerate(items)]
+        count_msg = vehicle.message_factory.mission_count_encode(vehicle.target_system, 0, len(items), mission_type)
+        async with self._lock:
+            queue, listener = self._subscribe(mission_type)
+            try:
+                vehicle.send_mavlink(count_msg)
+                last_sent = count_msg
+                sent_at = time.monotonic()
+                resent = False  # round trips of repeated messages are ambiguous and not sampled
+                requested = set()
+                silent = 0
+                while True:
+                    try:
+                        msg = await asyncio.wait_for(queue.get(), self._retry_timeout())
+                    except asyncio.TimeoutError:
+                        silent += 1
+                        if silent > self.retries:
+                            return False, "zaman aşımı"
+                        vehicle.send_mavlink(last_sent)
+                        resent = True
+                        continue
+                    silent = 0
+                    msg_type = msg.get_type()
+                    if msg_type in ('MISSION_REQUEST_INT', 'MISSION_REQUEST') and msg.seq < len(messages):
+                        now = time.monotonic()
+                        if not resent:
+                            self._sample_rtt(now - sent_at)
+                        last_sent = messages[msg.seq]
+                        vehicle.send_mavlink(last_sent)
+                        sent_at, resent = now, False
+                        requested.add(msg.seq)
+                        if progress is not None:
+                            progress(len(requested), len(messages))
+                    elif msg_type == 'MISSION_ACK':
+                        if msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                            return True, f"{len(messages)} öğe"
+                        return False, self._ack_text(msg.type)
+            finally:
+                self._unsubscribe(listener)
+
+    async def download(self, mission_type=MISSION, progress=None):
+        # (items, detail); items is None on failure. Requests are pipelined `window` deep and a
+        # timeout re-requests only the sequence numbers still missing.
+        vehicle = self.vehicle
+        factory = vehicle.message_factory
+        # PX4 answers requests strictly in order, ArduPilot answers any seq at any time
+        window = 1 if vehicle.autopilot == mavutil.mavlink.MAV_AUTOPILOT_PX4 else self.window
+        async with self._lock:
+            queue, listener = self._subscribe(mission_type)
+            try:
+                count = None
+                for _ in range(self.retries):
+                    vehicle.send_mavlink(factory.mission_request_list_encode(vehicle.target_system, 0, mission_type))
+                    deadline = time.monotonic() + self.timeout
+                    while count is None and time.monotonic() < deadline:
+                        try:
+                            msg = await asyncio.wait_for(queue.get(), deadline - time.monotonic())
+                        except asyncio.TimeoutError:
+                            break
+                        if msg.get_type() == 'MISSION_COUNT':
+                            count = msg.count
+                    if count is not None:
+                        break
+                if count is None:
+                    return None, "zaman aşımı"
+
+                items = [None] * count
+                missing = collections.OrderedDict.fromkeys(range(count))
+                in_flight = {}  # seq -> time requested
+                resent = set()
+                silent = 0
+                while missing:
+                    now = time.monotonic()
+                    for seq in missing:
+                        if len(in_flight) >= window:
+                            break
+                        if seq not in in_flight:
+                            vehicle.send_mavlink(factory.mission_request_int_encode(
+                                vehicle.target_system, 0, seq, mission_type))
+                            in_flight[seq] = now
+                    try:
+                        msg = await asyncio.wait_for(queue.get(), self._retry_timeout())
+                    except asyncio.TimeoutError:
+                        silent += 1
+                        if silent > self.retries:
+                            return None, f"zaman aşımı ({count - len(missing)}/{count})"
+                        resent.update(in_flight)
+                        in_flight.clear()  # everything outstanding is asked for again
+                        continue
+                    msg_type = msg.get_type()
+                    if msg_type == 'MISSION_ITEM_INT' and msg.seq in missing:
+                        silent = 0
+                        items[msg.seq] = self._decode(msg)
+                        del missing[msg.seq]
+                        requested_at = in_flight.pop(msg.seq, None)
+                        if requested_at is not None and msg.seq not in resent:
+                            self._sample_rtt(time.monotonic() - requested_at)
+                        if progress is not None:
+                            progress(count - len(missing), count)
+                    elif msg_type == 'MISSION_ACK' and msg.type != mavutil.mavlink.MAV_MISSION_ACCEPTED:
+                        return None, self._ack_text(msg.type)
+                vehicle.send_mavlink(factory.mission_ack_encode(
+                    vehicle.target_system, 0, mavutil.mavlink.MAV_MISSION_ACCEPTED, mission_type))
+                return items, f"{count} öğe"
+            finally:
+                self._unsubscribe(listener)
+
+    async def clear(self, mission_type=MISSION):
+        vehicle = self.vehicle
+        async with self._lock:
+            queue, listener = self._subscribe(mission_type)
+            try:
+                for _ in range(self.retries):
+                    vehicle.send_mavlink(vehicle.message_factory.mission_clear_all_encode(
+                        vehicle.target_system, 0, mission_type))
+                    try:
+                        while True:
+                            msg = await asyncio.wait_for(queue.get(), self._retry_timeout())
+                            if msg.get_type() == 'MISSION_ACK':
+                                return msg.type == mavutil.mavlink.MAV_MISSION_ACCEPTED, self._ack_text(msg.type)
+                    except asyncio.TimeoutError:
+                        continue
+                return False, "zaman aşımı"
+            finally:
+                self._unsubscribe(listener)
+
+
+class MissionDispatcher(QtCore.QObject):
+    # Qt side of MissionProtocol: transfers run on the core loop, results come back as signals
+    progress = QtCore.pyqtSignal(int, int)  # done, total
+    finished = QtCore.pyqtSignal(str, bool, str, object)  # name, accepted, detail, downloaded items
+
+    def __init__(self, vehicle, parent=None):
+        super().__init__(parent)
+        self.vehicle = vehicle
+        self.protocol = MissionProtocol(vehicle)
+
+    def _run(self, name, coro):
+        future = self.vehicle.call(coro)
+        future.add_done_callback(lambda f: self._finished(name, f))
+
+    def _finished(self, name, future):
+        if future.exception() is not None:
+            self.finished.emit(name, False, str(future.exception()), None)
+            return
+        result, detail = future.result()
+        if isinstance(result, list):
+            self.finished.emit(name, True, detail, result)
+        else:
+            self.finished.emit(name, bool(result), detail, None)
+
+    def upload(self, items, mission_type=MISSION):
+        self._run(f"{TYPE_NAMES[mission_type]} yükleme", self.protocol.upload(items, mission_type, self.progress.emit))
+
+    def download(self, mission_type=MISSION):
+        self._run(f"{TYPE_NAMES[mission_type]} indirme", self.protocol.download(mission_type, self.progress.emit))
+
+    def clear(self, mission_type=MISSION):
+        self._run(f"{TYPE_NAMES[mission_type]} silme", self.protocol.clear(mission_type))
+
+
+class MissionEditor(QtWidgets.QDialog):
+    COLUMNS = ("Komut", "Enlem", "Boylam", "İrtifa", "P1", "P2", "P3", "P4")
+    COMMANDS = ('WAYPOINT', 'TAKEOFF', 'LOITER_TIME', 'LOITER_UNLIM', 'RETURN_TO_LAUNCH', 'LAND',
+                'DO_CHANGE_SPEED', 'DO_SET_CAM_TRIGG_DIST')
+    TILE_ZOOM = (10, 17)  # zoom levels prefetched for offline maps
+    TILE_MARGIN = 500.0  # metres of map around the mission
+
+    # Tile prefetch runs on its own thread, these bring its progress back to the dialog
+    tiles_progress = QtCore.pyqtSignal(int, int)
+    tiles_finished = QtCore.pyqtSignal(str)
+
+    def __init__(self, dispatcher, parent=None, tile_url=None):
+        super().__init__(parent)
+        self.dispatcher = dispatcher
+        self.tile_url = tile_url  # tile server "Harita İndir" may bulk download from, None disables it
+        self.setWindowTitle("Görev Planlama")
+        self.setStyleSheet("color: rgb(0, 245, 0);\n"
+                           "background-color: rgb(60, 60, 60);")
+        layout = QtWidgets.QVBoxLayout(self)
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setStyleSheet("color: rgb(0, 0, 0);")
+        layout.addWidget(self.table, 1)
+
+        buttons = QtWidgets.QHBoxLayout()
+        for text, slot in (("Ekle", self.ekle), ("Sil", self.sil), ("Tarama...", self.tarama),
+                           ("Aç...", self.dosya_ac), ("Kaydet...", self.dosya_kaydet), ("Araçtan İndir", self.indir),
+                           ("Araca Yükle", self.yukle), ("Araçtakini Sil", self.temizle),
+                           ("Harita İndir", self.harita_indir)):
+            button = QtWidgets.QPushButton(text, self)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        layout.addWidget(self.progress_bar)
+        self.status = QtWidgets.QLabel(self)
+        layout.addWidget(self.status)
+
+        dispatcher.progress.connect(self.ilerleme)
+        dispatcher.finished.connect(self.aktarim_bitti)
+        self.tiles_progress.connect(self.ilerleme)
+        self.tiles_finished.connect(self.status.setText)
+        self._tiles_cancel = None
+        self.resize(900, 600)
+
+    # --- table <-> MissionItem ---
+
+    def set_items(self, items):
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(0)
+        self.table.setRowCount(len(items))
+        for row, item in enumerate(items):
+            self._set_row(row, item)
+        self.table.setUpdatesEnabled(True)
+
+    def _set_row(self, row, item):
+        cell = QtWidgets.QTableWidgetItem(command_name(item.command))
+        cell.setData(QtCore.Qt.UserRole, (item.frame, item.autocontinue))
+        self.table.setItem(row, 0, cell)
+        for column, value in enumerate((item.lat, item.lon, item.alt, item.param1, item.param2, item.param3,
+                                        item.param4), 1):
+            self.table.setItem(row, column, QtWidgets.QTableWidgetItem(f"{value:.7f}" if column < 3 else f"{value:g}"))
+
+    def items(self):
+        items = []
+        for row in range(self.table.rowCount()):
+            cell = self.table.item(row, 0)
+            frame, autocontinue = cell.data(QtCore.Qt.UserRole) or (mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT, 1)
+            values = [float(self.table.item(row, column).text() or 0) for column in range(1, len(self.COLUMNS))]
+            items.append(MissionItem(command_id(cell.text()), *values, frame=frame, autocontinue=autocontinue))
+        return items
+
+    def _has_home(self):
+        # ArduPilot keeps home at seq 0 of the mission (and overwrites whatever is uploaded there), PX4 does not
+        return self.dispatcher.vehicle.autopilot != mavutil.mavlink.MAV_AUTOPILOT_PX4
+
+    def _home(self):
+        home = self.dispatcher.vehicle.home_location
+        if home is not None:
+            return waypoint(home.lat, home.lon, 0)
+        first = next((i for i in self.items() if i.frame in GLOBAL_FRAMES and (i.lat or i.lon)), None)
+        return waypoint(first.lat, first.lon, 0) if first is not None else waypoint(0, 0, 0)
+
+    # --- buttons ---
+
+    def ekle(self):
+        row = self.table.rowCount()
+        if row:
+            try:
+                last = self.items()[-1]
+            except (ValueError, AttributeError, OSError) as e:
+                self.status.setText(f"Geçersiz satır: {e}")
+                return
+            item = waypoint(last.lat, last.lon, last.alt)
+        else:
+            location = self.dispatcher.vehicle.location.global_relative_frame
+            item = waypoint(location.lat, location.lon, 30) if location is not None else waypoint(0, 0, 30)
+        self.table.insertRow(row)
+        self._set_row(row, item)
+
+    def sil(self):
+        for row in sorted({index.row() for index in self.table.selectedIndexes()}, reverse=True):
+            self.table.removeRow(row)
+
+    def tarama(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Tarama Alanı", "", "GeoJSON (*.geojson *.json)")
+        if not path:
+            return
+        import survey
+        try:
+            polygons = survey.load_geojson_polygons(path)
+        except (OSError, ValueError, KeyError) as e:
+            self.status.setText(str(e))
+            return
+        if not polygons:
+            self.status.setText(f"Poligon bulunamadı: {path}")
+            return
+        dialog = SurveyDialog(self)
+        if dialog.exec_() != QtWidgets.QDialog.Accepted:
+            return
+        items = []
+        try:
+            for outer, holes in polygons:
+                items.extend(survey_mission(outer, holes, **dialog.values()))
+        except ValueError as e:
+            self.status.setText(f"Tarama oluşturulamadı: {e}")
+            return
+        row = self.table.rowCount()
+        self.table.setRowCount(row + len(items))
+        for i, item in enumerate(items):
+            self._set_row(row + i, item)
+        self.status.setText(f"Tarama: {len(items)} öğe eklendi")
+
+    def dosya_ac(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Görev Aç", "", "Waypoints (*.waypoints *.txt)")
+        if not path:
+            return
+        try:
+            items = read_waypoints(path)
+        except (OSError, ValueError) as e:
+            self.status.setText(str(e))
+            return
+        self.set_items(items[1:])  # without home
+        self.status.setText(f"{len(items) - 1} öğe yüklendi: {path}")
+
+    def dosya_kaydet(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Görev Kaydet", "", "Waypoints (*.waypoints)")
+        if not path:
+            return
+        try:
+            write_waypoints(path, [self._home()] + self.items())
+        except (ValueError, AttributeError, OSError) as e:
+            self.status.setText(f"Kaydedilemedi: {e}")
+            return
+        self.status.setText(f"Kaydedildi: {path}")
+
+    def indir(self):
+        self.progress_bar.setValue(0)
+        self.dispatcher.download()
+
+    def yukle(self):
+        try:
+            items = self.items()
+            if self._has_home():
+                items.insert(0, self._home())
+        except (ValueError, AttributeError) as e:
+            self.status.setText(f"Geçersiz satır: {e}")
+            return
+        self.progress_bar.setValue(0)
+        self.dispatcher.upload(items)
+
+    def temizle(self):
+        self.dispatcher.clear()
+
+    def harita_indir(self):
+        # Map tiles over the mission's bounding box, for flying where there is no network
+        if self._tiles_cancel is not None:
+            self._tiles_cancel.set()
+            return
+        try:
+            tile_cache.check_prefetch_url(self.tile_url)
+        except ValueError as e:
+            self.status.setText(f"Harita indirilemez: {e} (--tile-url)")
+            return
+        try:
+            points = [(i.lat, i.lon) for i in self.items() if i.frame in GLOBAL_FRAMES and (i.lat or i.lon)]
+        except (ValueError, AttributeError, OSError) as e:
+            self.status.setText(f"Geçersiz satır: {e}")
+            return
+        if not points:
+            self.status.setText("Haritası indirilecek konum yok")
+            return
+        import geodesy
+        lats, lons = zip(*points)
+        south, west = geodesy.from_local(-self.TILE_MARGIN, -self.TILE_MARGIN, min(lats), min(lons))
+        north, east = geodesy.from_local(self.TILE_MARGIN, self.TILE_MARGIN, max(lats), max(lons))
+        self._tiles_cancel = threading.Event()
+        self.progress_bar.setValue(0)
+        self.status.setText("Harita karoları indiriliyor (durdurmak için tekrar basın)")
+        threading.Thread(target=self._prefetch_tiles, args=(south, west, north, east, self._tiles_cancel),
+                         name='TilePrefetch', daemon=True).start()
+
+    def _prefetch_tiles(self, south, west, north, east, cancel):
+        text = "Harita indirilemedi"
+        try:
+            cache = tile_cache.TileCache(url=self.tile_url)
+            try:
+                fetched, failed = cache.prefetch(south, west, north, east, *self.TILE_ZOOM,
+                                                 progress=self.tiles_progress.emit, cancel=cancel)
+            finally:
+                cache.close()
+            text = f"Harita: {fetched} karo indirildi, {failed} başarısız"
+        except (OSError, ValueError) as e:
+            text = f"Harita indirilemedi: {e}"
+        finally:
+            self._tiles_cancel = None
+            self.tiles_finished.emit(text)
+
+    def ilerleme(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+
+    def aktarim_bitti(self, name, accepted, detail, items):
+        if items is not None:
+            self.set_items(items[1:] if self._has_home() else items)
+        self.status.setText(f"{name} {'tamamlandı' if accepted else 'başarısız'}: {detail}")
+
+
+class SurveyDialog(QtWidgets.QDialog):
+    FIELDS = (
+        ('altitude', "İrtifa (m)", 1, 1000, 50),
+        ('side_overlap', "Yan bindirme (%)", 0, 95, 70),
+        ('front_overlap', "İleri bindirme (%)", 0, 95, 80),
+        ('angle', "Yön (°)", 0, 359, 0),
+        ('overshoot', "Dönüş payı (m)", 0, 200, 0),
+    )
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Tarama")
+        layout = QtWidgets.QFormLayout(self)
+        self.boxes = {}
+        for name, label, low, high, value in self.FIELDS:
+            box = QtWidgets.QDoubleSpinBox(self)
+            box.setRange(low, high)
+            box.setValue(value)
+            layout.addRow(label, box)
+            self.boxes[name] = box
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel, self)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
+
+    def values(self):
+        values = {name: box.value() for name, box in self.boxes.items()}
+        values['side_overlap'] /= 100.0
+        values['front_overlap'] /= 100.0
+        return values
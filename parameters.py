@@ -0,0 +1,491 @@
+import asyncio
+import json
+import os
+import re
+import struct
+import time
+import zlib
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+from pymavlink import mavutil
+
+
+INT_TYPES = {
+    mavutil.mavlink.MAV_PARAM_TYPE_UINT8: 'B',
+    mavutil.mavlink.MAV_PARAM_TYPE_INT8: 'b',
+    mavutil.mavlink.MAV_PARAM_TYPE_UINT16: 'H',
+    mavutil.mavlink.MAV_PARAM_TYPE_INT16: 'h',
+    mavutil.mavlink.MAV_PARAM_TYPE_UINT32: 'I',
+    mavutil.mavlink.MAV_PARAM_TYPE_INT32: 'i',
+}
+
+HASH_PARAM = '_HASH_CHECK'  # PX4 reports a hash of its whole parameter set under this name
+
+
+def read_param_file(path):
+    # Mission Planner (NAME,VALUE), MAVProxy (NAME VALUE) and QGC (sysid compid NAME VALUE type) files
+    values = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.split('#', 1)[0].replace(',', ' ').split()
+            if len(fields) >= 5 and fields[0].isdigit() and fields[1].isdigit():
+                name, value = fields[2], fields[3]
+            elif len(fields) >= 2:
+                name, value = fields[0], fields[1]
+            else:
+                continue
+            values[name] = float(value)
+    return values
+
+
+def write_param_file(path, values):
+    with open(path, 'w') as f:
+        for name in sorted(values):
+            f.write(f"{name},{values[name]:g}\n")
+
+
+def same_value(a, b):
+    # Parameters travel as float32, compare at that precision
+    return struct.pack('<f', float(a)) == struct.pack('<f', float(b))
+
+
+class ParameterSet(object):
+    # Parameters of one vehicle: served from the disk cache at once, refreshed from the vehicle in the background
+    def __init__(self, vehicle, cache_dir=os.path.join(os.path.expanduser('~'), '.gcs', 'params'),
+                 stall_timeout=1.0, request_window=8):
+        self.vehicle = vehicle
+        self.cache_dir = cache_dir
+        self.stall_timeout = stall_timeout  # seconds without PARAM_VALUE before missing indices are re-requested
+        self.request_window = request_window  # PARAM_REQUEST_READs in flight while filling gaps
+        self.values = {}
+        self.types = {}
+        self.count = None
+        self.complete = False  # every parameter confirmed by the vehicle (or by the hash check)
+        self.from_cache = False  # values came from disk and are not yet confirmed
+        self.vehicle_hash = None
+        self._received = set()  # param_index values seen during the current download
+        self._received_names = set()  # names of those list entries
+        self._last_value = 0.0
+        self._got_value = None  # asyncio.Event set by every PARAM_VALUE while downloading
+        self._listeners = ()
+        self._attached = False
+        self._task = None
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def __len__(self):
+        return len(self.values)
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def items(self):
+        return self.values.items()
+
+    def add_listener(self, fn):
+        # fn(name, value) on the core loop thread; name is None when a download or cache load completes
+        self._listeners = self._listeners + (fn,)
+
+    def remove_listener(self, fn):
+        self._listeners = tuple(f for f in self._listeners if f != fn)
+
+    def _notify(self, name, value):
+        for fn in self._listeners:
+            fn(name, value)
+
+    @property
+    def bytewise(self):
+        # PX4 packs integer parameters bit for bit into the float field, ArduPilot casts them
+        return self.vehicle.autopilot == mavutil.mavlink.MAV_AUTOPILOT_PX4
+
+    def decode(self, value, param_type):
+        if self.bytewise and param_type in INT_TYPES:
+            return struct.unpack('<' + INT_TYPES[param_type], struct.pack('<f', value)[:struct.calcsize(INT_TYPES[param_type])])[0]
+        if param_type in INT_TYPES:
+            return int(value)
+        return value
+
+    def encode(self, value, param_type):
+        if self.bytewise and param_type in INT_TYPES:
+            packed = struct.pack('<' + INT_TYPES[param_type], int(value))
+            return struct.unpack('<f', packed.ljust(4, b'\0'))[0]
+        return float(value)
+
+    def diff(self, values):
+        # [(name, current, wanted)] for every parameter in values that differs; current is None if unknown
+        return [(name, self.values.get(name), value) for name, value in sorted(values.items())
+                if name not in self.values or not same_value(self.values[name], value)]
+
+    async def apply(self, values, window=8, progress=None):
+        # {name: None if the PARAM_VALUE echo confirmed the value, else the reason}. At most `window`
+        # PARAM_SETs are unanswered at a time, so the autopilot's receive queue is never flooded.
+        # List entries of a running download carry the same names and possibly the old values; one of them
+        # would be taken for the PARAM_SET echo, so nothing is set before the download is complete
+        while not self.complete:
+            await asyncio.sleep(0.1)
+        semaphore = asyncio.Semaphore(window)
+        results = {}
+
+        async def set_one(name, value):
+            param_type = self.types.get(name)
+            if param_type is None:
+                results[name] = "bilinmeyen parametre"
+            else:
+                async with semaphore:
+                    msg = await self.vehicle.param_set(name, self.encode(value, param_type), param_type)
+                if msg is None:
+                    results[name] = "yanıt yok"
+                else:
+                    stored = self.decode(msg.param_value, msg.param_type)
+                    results[name] = None if same_value(stored, value) else f"araç {stored:g} değerini sakladı"
+            if progress is not None:
+                progress(len(results), len(values))
+
+        await asyncio.gather(*(set_one(name, value) for name, value in values.items()))
+        return results
+
+    # --- disk cache: <key>_<hash>.json, <key>.latest names the newest one ---
+
+    async def cache_key(self, timeout=0.5):
+        # Fleet vehicles usually all have sysid 1, so the key names the aircraft: autopilot type and the
+        # UID from AUTOPILOT_VERSION, or the sysid and connection string when the board reports no UID
+        vehicle = self.vehicle
+        uid = await self._autopilot_uid(timeout)
+        if uid:
+            return f"{vehicle.autopilot}-{uid:016x}"
+        connection = re.sub(r'[^A-Za-z0-9.]+', '_', vehicle.connection_string)
+        return f"{vehicle.autopilot}-{vehicle.target_system}-{connection}"
+
+    async def _autopilot_uid(self, timeout):
+        vehicle = self.vehicle
+        future = asyncio.get_running_loop().create_future()
+
+        def on_version(_vehicle, _name, msg):
+            if vehicle.from_autopilot(msg) and not future.done():
+                future.set_result(msg.uid)
+        vehicle.add_message_listener('AUTOPILOT_VERSION', on_version)
+        try:
+            for _ in range(2):
+                vehicle.send_mavlink(vehicle.message_factory.command_long_encode(
+                    vehicle.target_system, vehicle.target_component or 0,
+                    mavutil.mavlink.MAV_CMD_REQUEST_AUTOPILOT_CAPABILITIES, 0, 1, 0, 0, 0, 0, 0, 0))
+                try:
+                    return await asyncio.wait_for(asyncio.shield(future), timeout)
+                except asyncio.TimeoutError:
+                    continue
+            return 0
+        finally:
+            vehicle.remove_message_listener('AUTOPILOT_VERSION', on_version)
+
+    def _cache_path(self, key, set_hash):
+        return os.path.join(self.cache_dir, f"{key}_{set_hash}.json")
+
+    def _latest_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.latest")
+
+    def content_hash(self):
+        text = ';'.join(f"{name}={self.values[name]!r}" for name in sorted(self.values))
+        return f"{zlib.crc32(text.encode()):08x}"
+
+    def load_cache(self, key):
+        try:
+            with open(self._latest_path(key)) as f:
+                set_hash = f.read().strip()
+            with open(self._cache_path(key, set_hash)) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.values.update(cached['values'])
+        self.types.update(cached['types'])
+        self.count = cached['count']
+        self.vehicle_hash = cached.get('vehicle_hash')
+        self.from_cache = True
+        self._notify(None, None)
+        return True
+
+    def save_cache(self, key):
+        set_hash = self.vehicle_hash or self.content_hash()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._cache_path(key, set_hash), 'w') as f:
+                json.dump({'values': self.values, 'types': self.types, 'count': self.count,
+                           'vehicle_hash': self.vehicle_hash, 'saved': time.time()}, f)
+            with open(self._latest_path(key), 'w') as f:
+                f.write(set_hash)
+        except OSError:
+            pass
+
+    # --- download, runs on the core loop ---
+
+    def start(self):
+        # Safe from any thread; a second call while a download runs does nothing
+        def schedule():
+            if not self._attached:
+                # Stays registered so PARAM_SET echoes keep the values current after the download
+                self.vehicle.add_message_listener('PARAM_VALUE', self._on_param_value)
+                self._attached = True
+            if self._task is None or self._task.done():
+                self._task = self.vehicle.core.loop.create_task(self.load())
+        self.vehicle.core.loop.call_soon_threadsafe(schedule)
+
+    def _on_param_value(self, _vehicle, _name, msg):
+        if not self.vehicle.from_autopilot(msg):
+            return  # another component's parameters, not this set's
+        name = msg.param_id
+        if name == HASH_PARAM:
+            self.vehicle_hash = struct.pack('<f', msg.param_value).hex()
+            return
+        value = self.decode(msg.param_value, msg.param_type)
+        changed = self.values.get(name) != value
+        self.values[name] = value
+        self.types[name] = msg.param_type
+        self.count = msg.param_count
+        if msg.param_index != 65535:  # 65535 = answer to a single read/set, not part of the list
+            self._received.add(msg.param_index)
+            self._received_names.add(name)
+        self._last_value = time.monotonic()
+        if self._got_value is not None:
+            self._got_value.set()
+        if changed:
+            self._notify(name, value)
+
+    async def load(self):
+        vehicle = self.vehicle
+        while vehicle.target_system is None:
+            await asyncio.sleep(0.1)
+        key = await self.cache_key()
+        if not self.values:
+            self.load_cache(key)
+
+        if self.from_cache and self.vehicle_hash is not None:
+            cached_hash = self.vehicle_hash
+            msg = await vehicle.param_get(HASH_PARAM, retries=2)
+            if msg is not None and self.vehicle_hash == cached_hash:
+                # Same parameter set as last time, nothing to download
+                self.complete = True
+                self.from_cache = False
+                self._notify(None, None)
+                return
+        await self._download()
+        # The vehicle's list replaces the cached one: parameters it no longer has are dropped
+        for name in set(self.values) - self._received_names:
+            del self.values[name]
+            self.types.pop(name, None)
+        self.complete = True
+        self.from_cache = False
+        self.save_cache(key)
+        self._notify(None, None)
+
+    async def _download(self):
+        vehicle = self.vehicle
+        factory = vehicle.message_factory
+        self.complete = False
+        self._received = set()
+        self._received_names = set()
+        self._last_value = time.monotonic()
+        self._got_value = asyncio.Event()
+        vehicle.send_mavlink(factory.param_request_list_encode(vehicle.target_system, 0))
+        filling = False
+        requested = {}  # index -> time its PARAM_REQUEST_READ was sent
+        while True:
+            try:
+                await asyncio.wait_for(self._got_value.wait(), self.stall_timeout / 4)
+            except asyncio.TimeoutError:
+                pass
+            self._got_value.clear()
+            if self.count is not None and len(self._received) >= self.count:
+                return
+            now = time.monotonic()
+            if not filling:
+                if now - self._last_value < self.stall_timeout:
+                    continue  # the list is still streaming
+                if self.count is None:
+                    # Nothing arrived at all, ask for the list again
+                    vehicle.send_mavlink(factory.param_request_list_encode(vehicle.target_system, 0))
+                    self._last_value = now
+                    continue
+                filling = True
+            # The stream is over: only the missing indices are requested, request_window at a time.
+            # Each answer makes room for the next read, unanswered reads are repeated after stall_timeout.
+            for index in [i for i in requested if i in self._received]:
+                del requested[index]
+            for index, sent in list(requested.items()):
+                if now - sent > self.stall_timeout:
+                    vehicle.send_mavlink(factory.param_request_read_encode(vehicle.target_system, 0, b'', index))
+                    requested[index] = now
+            if len(requested) < self.request_window:
+                for index in range(self.count):
+                    if index not in self._received and index not in requested:
+                        vehicle.send_mavlink(factory.param_request_read_encode(
+                            vehicle.target_system, 0, b'', index))
+                        requested[index] = now
+                        if len(requested) >= self.request_window:
+                            break
+
+
+class ParameterEditor(QtWidgets.QDialog):
+    COLUMNS = ("Parametre", "Değer", "Yeni", "Durum")
+    _changed = QtCore.pyqtSignal()
+    _progress = QtCore.pyqtSignal(int, int)
+    _applied = QtCore.pyqtSignal(object)
+
+    def __init__(self, parameters, parent=None):
+        super().__init__(parent)
+        self.parameters = parameters
+        self.rows = {}  # parameter name -> table row
+        self.setStyleSheet("color: rgb(0, 245, 0);\n"
+                           "background-color: rgb(60, 60, 60);")
+        layout = QtWidgets.QVBoxLayout(self)
+        self.search = QtWidgets.QLineEdit(self)
+        self.search.setPlaceholderText("Ara...")
+        self.search.textChanged.connect(self.filtrele)
+        layout.addWidget(self.search)
+        self.table = QtWidgets.QTableWidget(0, len(self.COLUMNS), self)
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setStyleSheet("color: rgb(0, 0, 0);")
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().hide()
+        layout.addWidget(self.table, 1)
+
+        buttons = QtWidgets.QHBoxLayout()
+        for text, slot in (("Dosyayla Karşılaştır...", self.karsilastir), ("Kaydet...", self.kaydet),
+                           ("Değişiklikleri Temizle", self.temizle), ("Uygula", self.uygula),
+                           ("Araçtan Yenile", self.yenile)):
+            button = QtWidgets.QPushButton(text, self)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        layout.addLayout(buttons)
+        self.progress_bar = QtWidgets.QProgressBar(self)
+        layout.addWidget(self.progress_bar)
+        self.status = QtWidgets.QLabel(self)
+        layout.addWidget(self.status)
+
+        # Downloads report every parameter; the table is rebuilt at most every 200 ms
+        self._refresh_timer = QtCore.QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.timeout.connect(self.doldur)
+        self._changed.connect(self._schedule_refresh)
+        self._progress.connect(self.ilerleme)
+        self._applied.connect(self.uygulandi)
+        parameters.add_listener(self._on_parameter)
+        self.resize(700, 800)
+        self.doldur()
+
+    def _on_parameter(self, _name, _value):
+        self._changed.emit()  # core loop thread -> GUI thread
+
+    def _schedule_refresh(self):
+        if not self._refresh_timer.isActive():
+            self._refresh_timer.start(200)
+
+    def doldur(self):
+        values = self.parameters.values
+        table = self.table
+        table.setUpdatesEnabled(False)
+        for name in sorted(values):
+            row = self.rows.get(name)
+            if row is None:
+                row = self.rows[name] = table.rowCount()
+                table.insertRow(row)
+                table.setItem(row, 0, QtWidgets.QTableWidgetItem(name))
+                for column in (1, 2, 3):
+                    table.setItem(row, column, QtWidgets.QTableWidgetItem(""))
+                table.item(row, 0).setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable)
+                table.item(row, 1).setFlags(QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable)
+            table.item(row, 1).setText(f"{values[name]:g}")
+        table.setUpdatesEnabled(True)
+        self.filtrele(self.search.text())
+        state = "önbellekten, doğrulanıyor" if self.parameters.from_cache else \
+            "tam" if self.parameters.complete else "indiriliyor"
+        self.status.setText(f"{len(values)} parametre ({state})")
+
+    def filtrele(self, text):
+        text = text.strip().upper()
+        for name, row in self.rows.items():
+            self.table.setRowHidden(row, bool(text) and text not in name)
+
+    def pending(self):
+        # {name: value} typed into (or loaded into) the "Yeni" column
+        changes = {}
+        for name, row in self.rows.items():
+            text = self.table.item(row, 2).text().strip()
+            if text:
+                changes[name] = float(text)
+        return changes
+
+    def karsilastir(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Parametre Dosyası", "",
+                                                        "Parametreler (*.param *.parm *.params *.txt)")
+        if not path:
+            return
+        try:
+            wanted = read_param_file(path)
+        except (OSError, ValueError) as e:
+            self.status.setText(str(e))
+            return
+        unknown = []
+        for name, _current, value in self.parameters.diff(wanted):
+            row = self.rows.get(name)
+            if row is None:
+                unknown.append(name)
+                continue
+            self.table.item(row, 2).setText(f"{value:g}")
+            self.table.item(row, 2).setForeground(QtGui.QColor(255, 140, 45))
+        self.search.setText("")
+        changes = len(self.pending())
+        self.status.setText(f"{os.path.basename(path)}: {changes} farklı değer"
+                            + (f", araçta olmayan: {', '.join(unknown[:10])}" if unknown else ""))
+
+    def kaydet(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Parametreleri Kaydet", "", "Parametreler (*.param)")
+        if path:
+            write_param_file(path, self.parameters.values)
+            self.status.setText(f"Kaydedildi: {path}")
+
+    def temizle(self):
+        for row in self.rows.values():
+            self.table.item(row, 2).setText("")
+            self.table.item(row, 3).setText("")
+
+    def uygula(self):
+        try:
+            changes = self.pending()
+        except ValueError as e:
+            self.status.setText(f"Geçersiz değer: {e}")
+            return
+        if not changes:
+            self.status.setText("Uygulanacak değişiklik yok.")
+            return
+        self.progress_bar.setMaximum(len(changes))
+        self.progress_bar.setValue(0)
+        if not self.parameters.complete:
+            self.status.setText("Parametreler indiriliyor, indirme bitince uygulanacak.")
+        future = self.parameters.vehicle.call(self.parameters.apply(changes, progress=self._progress.emit))
+        future.add_done_callback(lambda f: self._applied.emit(f.exception() or f.result()))
+
+    def ilerleme(self, done, total):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+
+    def uygulandi(self, results):
+        if isinstance(results, Exception):
+            self.status.setText(f"Uygulama başarısız: {results}")
+            return
+        failed = {name: reason for name, reason in results.items() if reason is not None}
+        for name, reason in results.items():
+            row = self.rows.get(name)
+            if row is None:
+                continue
+            self.table.item(row, 3).setText(reason or "doğrulandı")
+            if reason is None:
+                self.table.item(row, 2).setText("")
+        self.doldur()
+        self.status.setText(f"{len(results) - len(failed)}/{len(results)} parametre doğrulandı"
+                            + (f", başarısız: {', '.join(sorted(failed))}" if failed else ""))
+
+    def yenile(self):
+        self.parameters.start()
@@ -0,0 +1,95 @@
+import time
+
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPainter, QPen
+
+import profiling
+
+
+class PerformanceOverlay(QtWidgets.QWidget):
+    # Translucent box over the main window: FPS, updates waiting for the GUI thread, superseded updates and the
+    # slowest spans of the last interval (histogram differences, not totals since start)
+    TOP_SPANS = 6
+
+    def __init__(self, parent=None, interval=500):
+        super().__init__(parent)
+        self.interval = interval  # ms between refreshes while visible
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.lines = []
+        self.text_font = QFont('Monospace', 9)
+        self.text_font.setStyleHint(QFont.TypeWriter)
+        self.text_pen = QPen(QColor(0, 245, 0))
+        self.background = QColor(0, 0, 0, 220)
+        self._previous = None
+        self._previous_time = None
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def showEvent(self, event):
+        self._previous = None
+        self.refresh()
+        self._timer.start(self.interval)
+        self.raise_()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        now = time.monotonic()
+        current = profiling.snapshot()
+        previous, elapsed = self._previous, now - (self._previous_time or now)
+        self._previous, self._previous_time = current, now
+        if previous is None or elapsed <= 0:
+            self.lines = ["Performans: ölçülüyor..."]
+        else:
+            self.lines = self._lines(previous, current, elapsed)
+        metrics = QFontMetrics(self.text_font)
+        self.resize(12 + max(metrics.horizontalAdvance(line) for line in self.lines),
+                    8 + len(self.lines) * (metrics.height() + 1))
+        if self.parentWidget() is not None:
+            self.move(self.parentWidget().width() - self.width() - 8, 8)
+        self.update()
+
+    @staticmethod
+    def _window(previous, current):
+        # Per-span (counts, count, total) over the interval
+        spans = {}
+        for name, (counts, n, total, _max) in current['spans'].items():
+            old = previous['spans'].get(name)
+            if old is not None:
+                counts = [a - b for a, b in zip(counts, old[0])]
+                n, total = n - old[1], total - old[2]
+            if n:
+                spans[name] = (counts, n, total)
+        return spans
+
+    def _lines(self, previous, current, elapsed):
+        spans = self._window(previous, current)
+        rate = lambda name: (current['counters'].get(name, 0) - previous['counters'].get(name, 0)) / elapsed
+        paint = spans.get('hud.paint')
+        paint_p99 = profiling.quantile(paint[0], 0.99) * 1000 if paint else 0.0
+        dropped = rate('fetcher.superseded') + rate('ui.superseded') + rate('map.dropped')
+        lines = [
+            f"FPS {rate('ui.frames'):5.1f}   kuyruk {current['gauges'].get('fetcher.backlog', 0):3d}   "
+            f"düşen {dropped:6.1f}/s",
+            f"HUD boyama p99 {paint_p99:6.2f} ms",
+        ]
+        # Where the time went: spans by total time in the interval
+        for name, (counts, n, total) in sorted(spans.items(), key=lambda item: -item[1][2])[:self.TOP_SPANS]:
+            lines.append(f"{name:<22} {100.0 * total / elapsed:5.1f}%  p99 "
+                         f"{profiling.quantile(counts, 0.99) * 1000:6.2f} ms  {n / elapsed:6.0f}/s")
+        return lines
+
+    def paintEvent(self, event):
+        qp = QPainter(self)
+        qp.fillRect(self.rect(), self.background)
+        qp.setFont(self.text_font)
+        qp.setPen(self.text_pen)
+        height = qp.fontMetrics().height() + 1
+        for i, line in enumerate(self.lines):
+            qp.drawText(6, 4 + qp.fontMetrics().ascent() + i * height, line)
+        qp.end()
@@ -0,0 +1,205 @@
+import bisect
+import functools
+import http.server
+import json
+import re
+import threading
+import time
+
+
+# Histogram bucket upper bounds in seconds: 10 us to ~10 s, four buckets per doubling (<= 19 % quantile error)
+BOUNDS = tuple(1e-5 * 2 ** (i / 4.0) for i in range(81))
+# Prometheus gets every fourth bound, one per doubling; cumulative counts there are exact
+PROMETHEUS_BOUNDS = BOUNDS[::4]
+
+enabled = True  # False turns span() into a shared no-op context
+
+histograms = {}  # span name -> Histogram
+counters = {}  # name -> int, e.g. updates superseded before they were drawn
+gauges = {}  # name -> last value, e.g. queue depth
+_lock = threading.Lock()
+
+
+class Histogram(object):
+    # Fixed log buckets: recording is a bisect and a few increments, no samples are kept
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)  # the last bucket is everything above BOUNDS[-1]
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        index = bisect.bisect_left(BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.count, self.total, self.max
+
+
+def quantile(counts, q):
+    # Seconds, linear inside the bucket holding the q-th sample; None without samples
+    n = sum(counts)
+    if not n:
+        return None
+    rank = q * n
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            low = BOUNDS[index - 1] if index > 0 else 0.0
+            high = BOUNDS[index] if index < len(BOUNDS) else BOUNDS[-1] * 2
+            return low + (high - low) * (rank - seen) / count
+        seen += count
+    return BOUNDS[-1]
+
+
+def histogram(name):
+    found = histograms.get(name)
+    if found is None:
+        with _lock:
+            found = histograms.setdefault(name, Histogram())
+    return found
+
+
+class _Span(object):
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    # with profiling.span('ui.update_data'): ...
+    if not enabled:
+        return _NO_SPAN
+    return _Span(histogram(name))
+
+
+def timed(name):
+    # Decorator form of span(), keeps the function's name (Flask endpoints rely on it)
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    if enabled:
+        with _lock:
+            counters[name] = counters.get(name, 0) + n
+
+
+def gauge(name, value):
+    if enabled:
+        gauges[name] = value
+
+
+def snapshot():
+    # {'spans': {name: (counts, count, total, max)}, 'counters': {...}, 'gauges': {...}}
+    with _lock:
+        names = list(histograms.items())
+        counter_values = dict(counters)
+    return {'spans': {name: h.snapshot() for name, h in names}, 'counters': counter_values, 'gauges': dict(gauges)}
+
+
+def _span_summary(counts, n, total, maximum):
+    ms = lambda seconds: round(seconds * 1000.0, 4) if seconds is not None else None
+    return {'count': n, 'total_ms': ms(total), 'mean_ms': ms(total / n) if n else None,
+            'p50_ms': ms(quantile(counts, 0.5)), 'p90_ms': ms(quantile(counts, 0.9)),
+            'p99_ms': ms(quantile(counts, 0.99)), 'max_ms': ms(maximum)}
+
+
+def to_json():
+    data = snapshot()
+    return json.dumps({
+        'spans': {name: _span_summary(*values) for name, values in sorted(data['spans'].items())},
+        'counters': data['counters'],
+        'gauges': data['gauges'],
+    }, indent=2)
+
+
+def _metric_name(name):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+
+def to_prometheus():
+    # Text exposition format 0.0.4
+    data = snapshot()
+    lines = ['# HELP gcs_span_seconds Time spent in instrumented GCS code paths.',
+             '# TYPE gcs_span_seconds histogram']
+    for name, (counts, n, total, _max) in sorted(data['spans'].items()):
+        cumulative = 0
+        bucket = 0
+        for bound in PROMETHEUS_BOUNDS:
+            while bucket < len(BOUNDS) and BOUNDS[bucket] <= bound:
+                cumulative += counts[bucket]
+                bucket += 1
+            lines.append(f'gcs_span_seconds_bucket{{span="{name}",le="{bound:.6g}"}} {cumulative}')
+        lines.append(f'gcs_span_seconds_bucket{{span="{name}",le="+Inf"}} {n}')
+        lines.append(f'gcs_span_seconds_sum{{span="{name}"}} {total:.9f}')
+        lines.append(f'gcs_span_seconds_count{{span="{name}"}} {n}')
+    for name, value in sorted(data['counters'].items()):
+        metric = f'gcs_{_metric_name(name)}_total'
+        lines += [f'# TYPE {metric} counter', f'{metric} {value}']
+    for name, value in sorted(data['gauges'].items()):
+        metric = f'gcs_{_metric_name(name)}'
+        lines += [f'# TYPE {metric} gauge', f'{metric} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/metrics':
+            body, content_type = to_prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path == '/metrics.json':
+            body, content_type = to_json(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=9464):
+    # /metrics (Prometheus) and /metrics.json without Flask, so it also works with --no-map and --headless
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='MetricsServer', daemon=True).start()
+    return server
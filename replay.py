@@ -0,0 +1,322 @@
+import array
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+from pymavlink import mavutil
+
+from telemetry import HUD_MESSAGE_IDS, message_to_data
+
+
+class TlogIndex(object):
+    # Sidecar file next to the log: header (magic, log size, frame count) + offsets, timestamps, msgids
+    INDEX_HEADER = struct.Struct('<8sQQ')
+    INDEX_MAGIC = b'GCSTIDX1'
+    TIMESTAMP = struct.Struct('>Q')
+
+    def __init__(self, path, save_index=True, build=True):
+        # build=False leaves a log without a valid sidecar unindexed (ready False) until build() is called,
+        # so the scan can run off the GUI thread
+        self.path = path
+        self.save_index = save_index
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self.data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self.offsets = array.array('Q')
+        self.timestamps = array.array('Q')
+        self.msgids = array.array('I')
+        self.ready = self._load_index()
+        if not self.ready and build:
+            self.build()
+
+    def build(self, progress=None, cancelled=None):
+        # progress(percent) after every 1 % of the file; cancelled() is checked there too. False if cancelled.
+        if not self._build(progress, cancelled):
+            del self.offsets[:], self.timestamps[:], self.msgids[:]
+            return False
+        if self.save_index:
+            self._save_index()
+        self.ready = True
+        return True
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def start(self):
+        return self.timestamps[0] if self.timestamps else 0
+
+    @property
+    def duration(self):
+        return (self.timestamps[-1] - self.timestamps[0]) / 1.0e6 if self.timestamps else 0.0
+
+    def find(self, seconds):
+        # First frame at or after `seconds` from the start of the log
+        return bisect.bisect_left(self.timestamps, self.start + int(seconds * 1.0e6))
+
+    def frame(self, i):
+        start = self.offsets[i] + 8
+        return self.data[start:start + self._frame_length(self.data, start)]
+
+    @staticmethod
+    def _frame_length(data, start):
+        if data[start] == 0xFE:
+            return data[start + 1] + 8
+        return data[start + 1] + 12 + (13 if data[start + 2] & 0x01 else 0)
+
+    def close(self):
+        if self.size:
+            self.data.close()
+        self._file.close()
+
+    def _build(self, progress=None, cancelled=None):
+        data, size = self.data, self.size
+        unpack_ts = self.TIMESTAMP.unpack_from
+        offsets, timestamps, msgids = self.offsets, self.timestamps, self.msgids
+        step = max(size // 100, 1)
+        report = step
+        o = 0
+        while o + 16 <= size:
+            if o >= report:
+                if cancelled is not None and cancelled():
+                    return False
+                if progress is not None:
+                    progress(min(99, o * 100 // size))
+                report = o + step
+            magic = data[o + 8]
+            if magic == 0xFE:
+                msgid = data[o + 13]
+            elif magic == 0xFD and o + 18 <= size:
+                msgid = data[o + 15] | data[o + 16] << 8 | data[o + 17] << 16
+            else:
+                o += 1  # not a frame start, resync byte by byte
+                continue
+            length = self._frame_length(data, o + 8)
+            if o + 8 + length > size:
+                break
+            offsets.append(o)
+            timestamps.append(unpack_ts(data, o)[0])
+            msgids.append(msgid)
+            o += 8 + length
+        return True
+
+    def _index_path(self):
+        return self.path + '.idx'
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'rb') as f:
+                magic, size, count = self.INDEX_HEADER.unpack(f.read(self.INDEX_HEADER.size))
+                if magic != self.INDEX_MAGIC or size != self.size:
+                    return False
+                self.offsets.fromfile(f, count)
+                self.timestamps.fromfile(f, count)
+                self.msgids.fromfile(f, count)
+        except (OSError, EOFError, struct.error):
+            del self.offsets[:], self.timestamps[:], self.msgids[:]
+            return False
+        return True
+
+    def _save_index(self):
+        try:
+            with open(self._index_path(), 'wb') as f:
+                f.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, self.size, len(self.offsets)))
+                self.offsets.tofile(f)
+                self.timestamps.tofile(f)
+                self.msgids.tofile(f)
+        except OSError:
+            pass  # read-only media, the index is rebuilt next time
+
+
+class TlogReplay(QtCore.QThread):
+    dataFetched = QtCore.pyqtSignal(object)
+    positionChanged = QtCore.pyqtSignal(float)  # seconds from the start of the log
+    # A log opened for the first time is indexed by run(), ~14 s per GB; the .idx sidecar makes later opens instant
+    indexProgress = QtCore.pyqtSignal(int)  # percent
+    indexReady = QtCore.pyqtSignal()
+
+    def __init__(self, path, speed=1.0, max_rate=30, preroll=5.0, store=None):
+        super().__init__()
+        self.index = TlogIndex(path, build=False)
+        # TelemetryStore recorded at log time (seconds from the start), not when the HUD got the data
+        self.store = store
+        if store is not None:
+            store.clock = lambda: self.position
+        self.speed = speed  # 1.0 = real time, 0 = as fast as the HUD can draw
+        self.max_rate = max_rate  # emits per second, 0 = every change
+        self.preroll = preroll  # seconds decoded before a seek point to rebuild the HUD state
+        self.paused = False
+        self._seek_to = 0.0
+        self._reanchor = False
+        self._i = 0
+        self._running = False
+        self._wake = threading.Event()
+        # At most two updates waiting on the GUI thread, the replay thread blocks instead of piling up signals
+        self._credits = threading.Semaphore(2)
+        self.dataFetched.connect(self._consumed)
+
+    def _consumed(self, _data):
+        self._credits.release()
+
+    def seek(self, seconds):
+        self._seek_to = max(0.0, min(seconds, self.index.duration))
+        self._wake.set()
+
+    def set_speed(self, speed):
+        self.speed = speed
+        self._reanchor = True
+        self._wake.set()
+
+    def set_paused(self, paused):
+        self.paused = paused
+        self._reanchor = True  # restart the clock from where we stopped
+        self._wake.set()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        self._credits.release()
+        self.wait()
+        self.index.close()
+
+    @property
+    def position(self):
+        i = min(self._i, len(self.index) - 1)
+        return (self.index.timestamps[i] - self.index.start) / 1.0e6 if i >= 0 else 0.0
+
+    def _decode(self, mav, i):
+        try:
+            msg = mav.decode(bytearray(self.index.frame(i)))
+        except mavutil.mavlink.MAVError:
+            return {}
+        data = message_to_data(msg)
+        if self.store is not None:
+            self.store.append(data, (self.index.timestamps[i] - self.index.start) / 1.0e6)
+        return data
+
+    def _emit(self, data):
+        while not self._credits.acquire(timeout=0.1):
+            if not self._running:
+                return False
+        self.dataFetched.emit(data)
+        self.positionChanged.emit(self.position)
+        return True
+
+    def run(self):
+        self._running = True
+        index = self.index
+        if not index.ready:
+            if not index.build(self.indexProgress.emit, lambda: not self._running):
+                return
+        self.indexReady.emit()
+        timestamps, msgids = index.timestamps, index.msgids
+        mav = mavutil.mavlink.MAVLink(None)
+        mav.robust_parsing = True
+        self._i = 0
+        pending = {}
+        last_emit = 0.0
+        anchor_wall = anchor_ts = 0
+
+        while self._running:
+            if self._seek_to is not None:
+                seconds, self._seek_to = self._seek_to, None
+                self._i = index.find(seconds)
+                pending = {}
+                if self.store is not None:
+                    self.store.clear()  # samples stay in time order
+                for j in range(index.find(max(0.0, seconds - self.preroll)), self._i):
+                    if msgids[j] in HUD_MESSAGE_IDS:
+                        pending.update(self._decode(mav, j))
+                self._reanchor = True
+            if self._reanchor and self._i < len(index):
+                self._reanchor = False
+                anchor_wall = time.monotonic()
+                anchor_ts = timestamps[self._i]
+            if self.paused or self._i >= len(index):
+                if pending and self._emit(pending):
+                    pending = {}
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            now = time.monotonic()
+            if self.speed:
+                delay = anchor_wall + (timestamps[self._i] - anchor_ts) / 1.0e6 / self.speed - now
+                if delay > 0:
+                    if pending and self._emit(pending):
+                        pending = {}
+                        last_emit = now
+                    if self._wake.wait(delay):
+                        self._wake.clear()
+                    continue
+
+            if msgids[self._i] in HUD_MESSAGE_IDS:
+                pending.update(self._decode(mav, self._i))
+            self._i += 1
+            if pending and (not self.max_rate or now - last_emit >= 1.0 / self.max_rate):
+                if self._emit(pending):
+                    pending = {}
+                    last_emit = now
+
+
+class ReplayControls(QtWidgets.QWidget):
+    SPEEDS = (('1x', 1.0), ('10x', 10.0), ('MAX', 0))
+
+    def __init__(self, replay, parent=None):
+        super().__init__(parent)
+        self.replay = replay
+        self.setWindowTitle(f"Kayıt Oynatma - {os.path.basename(replay.index.path)}")
+        self.setStyleSheet("color: rgb(0, 245, 0);\n"
+                           "background-color: rgb(60, 60, 60);")
+        font = QtGui.QFont()
+        font.setPointSize(11)
+        self.setFont(font)
+        layout = QtWidgets.QHBoxLayout(self)
+        self.play_button = QtWidgets.QPushButton("DURAKLAT", self)
+        self.play_button.clicked.connect(self.oynat_duraklat)
+        layout.addWidget(self.play_button)
+        self.speed_box = QtWidgets.QComboBox(self)
+        for name, _speed in self.SPEEDS:
+            self.speed_box.addItem(name)
+        self.speed_box.currentIndexChanged.connect(lambda i: self.replay.set_speed(self.SPEEDS[i][1]))
+        layout.addWidget(self.speed_box)
+        self.slider = QtWidgets.QSlider(QtCore.Qt.Horizontal, self)
+        self.slider.sliderReleased.connect(lambda: self.replay.seek(self.slider.value()))
+        layout.addWidget(self.slider, 1)
+        self.time_label = QtWidgets.QLabel(self)
+        layout.addWidget(self.time_label)
+        replay.positionChanged.connect(self.konum_guncelle)
+        replay.indexProgress.connect(self.indeksleniyor)
+        replay.indexReady.connect(self.indekslendi)
+        if replay.index.ready:
+            self.indekslendi()
+        else:
+            self.slider.setEnabled(False)  # the duration is unknown until the log is indexed
+            self.indeksleniyor(0)
+        self.resize(700, 60)
+
+    def indeksleniyor(self, percent):
+        self.time_label.setText(f"İndeksleniyor %{percent}")
+
+    def indekslendi(self):
+        self.slider.setRange(0, max(1, int(self.replay.index.duration)))
+        self.slider.setEnabled(True)
+
+    def oynat_duraklat(self):
+        paused = not self.replay.paused
+        self.replay.set_paused(paused)
+        self.play_button.setText("OYNAT" if paused else "DURAKLAT")
+
+    def konum_guncelle(self, seconds):
+        if not self.slider.isSliderDown():
+            self.slider.setValue(int(seconds))
+        self.time_label.setText(f"{int(seconds) // 60:02d}:{int(seconds) % 60:02d} / "
+                                f"{int(self.replay.index.duration) // 60:02d}:{int(self.replay.index.duration) % 60:02d}")
+
+    def closeEvent(self, event):
+        self.replay.stop()
+        super().closeEvent(event)
@@ -0,0 +1,144 @@
+import collections
+import math
+import struct
+import threading
+import time
+
+from pymavlink import mavutil
+from pymavlink.dialects.v20.ardupilotmega import x25crc
+
+
+# SET_POSITION_TARGET_LOCAL_NED type_mask values
+VELOCITY_ONLY = 0b0000111111000111
+POSITION_ONLY = 0b0000111111111000
+
+JitterStats = collections.namedtuple('JitterStats', [
+    'sent',  # setpoints sent
+    'missed',  # ticks skipped because the streamer woke up a whole period late
+    'mean',  # ms late against the ideal schedule
+    'p50',
+    'p99',
+    'max',
+])
+
+
+class PackedMessage(object):
+    # A message encoded once; stamp() only rewrites the sequence number and the CRC of the frame
+    SEQ_OFFSET = {0xFE: 2, 0xFD: 4}
+
+    def __init__(self, mav, msg):
+        self.msg = msg
+        self.buf = bytearray(msg.pack(mav))
+        self.crc_extra = struct.pack('B', msg.crc_extra)
+        self.seq_offset = self.SEQ_OFFSET[self.buf[0]]
+
+    def stamp(self, seq):
+        buf = self.buf
+        buf[self.seq_offset] = seq
+        crc = x25crc(buf[1:-2])
+        crc.accumulate(self.crc_extra)
+        struct.pack_into('<H', buf, len(buf) - 2, crc.crc)
+        return bytes(buf)
+
+
+class SetpointStreamer(object):
+    # Streams SET_POSITION_TARGET_LOCAL_NED at a fixed rate for guided/offboard control.
+    # Ticks are scheduled at start + k * period on the monotonic clock, so sleep overshoot
+    # never accumulates; a tick that is more than a period late is skipped instead of bursting.
+    def __init__(self, vehicle, rate=10.0, frame=mavutil.mavlink.MAV_FRAME_LOCAL_NED, spin=0.0005,
+                 jitter_samples=1000):
+        self.vehicle = vehicle
+        self.rate = min(rate, 50.0)
+        self.frame = frame
+        self.spin = spin  # seconds busy-waited before a deadline, time.sleep alone overshoots
+        self.sent = 0
+        self.missed = 0
+        self.lateness = collections.deque(maxlen=jitter_samples)  # seconds late per sent tick
+        self._packed = None
+        self._target_lock = threading.Lock()
+        self._running = False
+        self._wake = threading.Event()
+        self._thread = None
+        self.set_velocity(0, 0, 0)
+
+    def set_target(self, type_mask, x=0, y=0, z=0, vx=0, vy=0, vz=0, ax=0, ay=0, az=0, yaw=0, yaw_rate=0):
+        # Encoded here once; every tick until the next call re-sends the same frame
+        msg = self.vehicle.message_factory.set_position_target_local_ned_encode(
+            0, self.vehicle.target_system or 0, 0, self.frame, type_mask,
+            x, y, z, vx, vy, vz, ax, ay, az, yaw, yaw_rate)
+        signing = self.vehicle.message_factory.signing.sign_outgoing
+        with self._target_lock:
+            # Signed frames carry a timestamp and signature, those are re-encoded on every tick
+            self._packed = msg if signing else PackedMessage(self.vehicle.message_factory, msg)
+
+    def set_velocity(self, vx, vy, vz):
+        self.set_target(VELOCITY_ONLY, vx=vx, vy=vy, vz=vz)
+
+    def set_position(self, x, y, z):
+        self.set_target(POSITION_ONLY, x=x, y=y, z=z)
+
+    def set_rate(self, rate):
+        self.rate = min(rate, 50.0)
+        self._wake.set()  # restart the schedule at the new period
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='SetpointStreamer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_for(self, duration):
+        # Blocks the calling thread while streaming for `duration` seconds
+        self.start()
+        time.sleep(duration)
+        self.stop()
+
+    def _send(self):
+        with self._target_lock:
+            packed = self._packed
+        if isinstance(packed, PackedMessage):
+            self.vehicle.send_packed(packed)
+        else:
+            self.vehicle.send_mavlink(packed)
+        self.sent += 1
+
+    def _run(self):
+        while self._running:
+            self._wake.clear()
+            period = 1.0 / self.rate
+            start = time.monotonic()
+            tick = 0
+            while self._running and not self._wake.is_set():
+                deadline = start + tick * period
+                delay = deadline - time.monotonic()
+                if delay > self.spin:
+                    self._wake.wait(delay - self.spin)
+                    continue
+                while time.monotonic() < deadline:
+                    pass
+                now = time.monotonic()
+                self._send()
+                self.lateness.append(now - deadline)
+                # Late by whole periods (GC pause, suspended laptop): skip them, keep the phase
+                next_tick = max(tick + 1, int(math.floor((now - start) / period)) + 1)
+                self.missed += next_tick - tick - 1
+                tick = next_tick
+
+    def stats(self):
+        late = sorted(self.lateness)
+        if not late:
+            return JitterStats(self.sent, self.missed, 0.0, 0.0, 0.0, 0.0)
+        return JitterStats(
+            sent=self.sent,
+            missed=self.missed,
+            mean=sum(late) / len(late) * 1000,
+            p50=late[len(late) // 2] * 1000,
+            p99=late[min(len(late) - 1, int(len(late) * 0.99))] * 1000,
+            max=late[-1] * 1000,
+        )
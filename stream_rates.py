@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import threading
+import time
+
+from pymavlink import mavutil
+
+
+# Hz per message type. The HUD only needs attitude fast, the rest is cheap to keep slow.
+PROFILES = {
+    'varsayilan': {
+        'ATTITUDE': 25,
+        'GLOBAL_POSITION_INT': 5,
+        'VFR_HUD': 5,
+        'GPS_RAW_INT': 2,
+        'SYS_STATUS': 1,
+        'HOME_POSITION': 0.2,
+    },
+    # 57600 baud radios: ~5 kB/s shared with commands and the other direction
+    'dusuk_bant': {
+        'ATTITUDE': 10,
+        'GLOBAL_POSITION_INT': 3,
+        'VFR_HUD': 2,
+        'GPS_RAW_INT': 1,
+        'SYS_STATUS': 0.5,
+        'HOME_POSITION': 0.1,
+    },
+}
+
+# REQUEST_DATA_STREAM fallback for autopilots without MAV_CMD_SET_MESSAGE_INTERVAL
+DATA_STREAMS = {
+    'ATTITUDE': mavutil.mavlink.MAV_DATA_STREAM_EXTRA1,
+    'GLOBAL_POSITION_INT': mavutil.mavlink.MAV_DATA_STREAM_POSITION,
+    'VFR_HUD': mavutil.mavlink.MAV_DATA_STREAM_EXTRA2,
+    'GPS_RAW_INT': mavutil.mavlink.MAV_DATA_STREAM_EXTENDED_STATUS,
+    'SYS_STATUS': mavutil.mavlink.MAV_DATA_STREAM_EXTENDED_STATUS,
+}
+
+log = logging.getLogger(__name__)
+
+
+class StreamRateManager(object):
+    def __init__(self, vehicle, profile='varsayilan', min_scale=0.125, degrade_below=0.90, recover_above=0.97,
+                 hold_time=5.0):
+        self.vehicle = vehicle
+        self.rates = dict(PROFILES[profile] if isinstance(profile, str) else profile)
+        self.min_scale = min_scale
+        self.degrade_below = degrade_below  # link quality (0..1) that halves all rates
+        self.recover_above = recover_above  # link quality that doubles them again
+        self.hold_time = hold_time  # seconds between two adaptations
+        self.scale = 1.0
+        self.link_quality = None
+        self.use_data_streams = False  # set once the autopilot rejects SET_MESSAGE_INTERVAL
+        self.retry_interval = 5.0  # seconds before unacknowledged intervals are sent again
+        self._last_change = 0.0
+        self._generation = 0  # bumped by every apply(), older ones stop resending
+        self._lock = threading.Lock()
+
+    def start(self):
+        # The profile is sent once the vehicle's first heartbeat shows the link is up
+        self.vehicle.add_connect_listener(self._on_connect)
+
+    def stop(self):
+        self.vehicle.remove_connect_listener(self._on_connect)
+        with self._lock:
+            self._generation += 1  # abandons an apply still waiting for ACKs
+
+    def set_rate(self, msg_name, rate):
+        self.rates[msg_name] = rate
+        self.apply()
+
+    def _on_connect(self, _vehicle):
+        self.apply()
+
+    def apply(self):
+        if self.vehicle.target_system is None:
+            return  # _on_connect sends the current rates
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        self.vehicle.call(self._apply(generation))
+
+    async def _apply(self, generation):
+        # Each interval goes through command_long, which resends until its COMMAND_ACK arrives. Messages
+        # still unacknowledged after that are sent again every retry_interval until a newer apply() or
+        # stop() takes over.
+        pending = dict(self.rates)
+        while pending and not self.use_data_streams:
+            for msg_name, rate in list(pending.items()):
+                if generation != self._generation:
+                    return
+                msg_id = getattr(mavutil.mavlink, 'MAVLINK_MSG_ID_' + msg_name)
+                interval_us = int(1.0e6 / (rate * self.scale)) if rate > 0 else -1  # -1 disables the stream
+                result = await self.vehicle.command_long(mavutil.mavlink.MAV_CMD_SET_MESSAGE_INTERVAL,
+                                                         msg_id, interval_us)
+                if result in (mavutil.mavlink.MAV_RESULT_UNSUPPORTED, mavutil.mavlink.MAV_RESULT_DENIED):
+                    self.use_data_streams = True
+                    break
+                if result is not None:
+                    del pending[msg_name]
+            if pending and not self.use_data_streams:
+                log.warning("no ACK for SET_MESSAGE_INTERVAL %s, retrying", ', '.join(pending))
+                await asyncio.sleep(self.retry_interval)
+        if self.use_data_streams and generation == self._generation:
+            self._apply_data_streams()
+
+    def _apply_data_streams(self):
+        # Streams group several messages, each group gets the rate of its fastest member
+        stream_rates = {}
+        for msg_name, rate in self.rates.items():
+            stream_id = DATA_STREAMS.get(msg_name)
+            if stream_id is not None:
+                stream_rates[stream_id] = max(stream_rates.get(stream_id, 0), rate * self.scale)
+        vehicle = self.vehicle
+        for stream_id, rate in stream_rates.items():
+            vehicle.send_mavlink(vehicle.message_factory.request_data_stream_encode(
+                vehicle.target_system, vehicle.target_component or 0, stream_id, max(1, int(round(rate))),
+                1 if rate > 0 else 0))
+
+    def update_link_quality(self, quality):
+        # quality: fraction of packets getting through (1.0 = no loss)
+        self.link_quality = quality
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_change < self.hold_time:
+                return
+            scale = self.scale
+            if quality < self.degrade_below:
+                scale = max(self.min_scale, scale / 2)
+            elif quality > self.recover_above:
+                scale = min(1.0, scale * 2)
+            if scale == self.scale:
+                return
+            self.scale = scale
+            self._last_change = now
+        self.apply()
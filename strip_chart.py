@@ -0,0 +1,141 @@
+import numpy as np
+from PyQt5 import QtCore, QtGui, QtWidgets
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QFont, QPainter, QPen
+
+
+def polyline(x, y):
+    # QPolygonF filled straight from NumPy: its QPointF array is a packed (n, 2) float64 buffer
+    n = len(x)
+    polygon = QtGui.QPolygonF(n)
+    buffer = polygon.data()
+    buffer.setsize(n * 16)
+    points = np.frombuffer(buffer, dtype=np.float64).reshape(n, 2)
+    points[:, 0] = x
+    points[:, 1] = y
+    return polygon
+
+
+class StripChart(QtWidgets.QWidget):
+    # Scrolling plot of one or more TelemetryStore channels sharing a y axis
+    def __init__(self, title, channels, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.channels = channels  # ((store channel, label, QColor), ...)
+        self.store = None
+        self.window = 300.0  # seconds shown, the newest sample is on the right edge
+        self.setMinimumHeight(90)
+
+        self.background = QColor(40, 40, 40)
+        self.grid_pen = QPen(QColor(90, 90, 90), 1, Qt.DotLine)
+        self.text_pen = QPen(QColor(0, 245, 0))
+        self.font = QFont('Arial', 8)
+        # Thin, aliased lines: a dense min/max envelope through the antialiasing stroker is ~100x slower
+        self.pens = [QPen(color, 1) for _channel, _label, color in channels]
+
+    def paintEvent(self, event):
+        qp = QPainter(self)
+        qp.fillRect(self.rect(), self.background)
+        qp.setFont(self.font)
+        metrics = qp.fontMetrics()
+        left, top = 45, metrics.height() + 2
+        width, height = self.width() - left - 4, self.height() - top - 4
+
+        series = []
+        if self.store is not None and width > 0 and height > 0:
+            end = self.store.clock()
+            start = end - self.window
+            for (channel, _label, _color), pen in zip(self.channels, self.pens):
+                t, v = self.store.read(channel, start, end, max_points=2 * width)
+                if len(v):
+                    # The last value holds until the next change, draw it up to now
+                    series.append((np.append(t, end), np.append(v, v[-1]), pen))
+
+        header = self.title
+        if series:
+            header += "   " + "   ".join(f"{label}: {values[-1]:.1f}" for (_c, label, _color), (_t, values, _p)
+                                           in zip(self.channels, series))
+        qp.setPen(self.text_pen)
+        qp.drawText(4, metrics.ascent() + 1, header)
+        if not series:
+            qp.end()
+            return
+
+        lo = min(float(values.min()) for _t, values, _p in series)
+        hi = max(float(values.max()) for _t, values, _p in series)
+        if hi - lo < 1e-6:
+            lo, hi = lo - 1.0, hi + 1.0
+        pad = (hi - lo) * 0.05
+        lo, hi = lo - pad, hi + pad
+
+        for i in range(5):
+            y = top + height * i / 4.0
+            qp.setPen(self.grid_pen)
+            qp.drawLine(QtCore.QPointF(left, y), QtCore.QPointF(left + width, y))
+            qp.setPen(self.text_pen)
+            qp.drawText(QtCore.QRectF(0, y - metrics.height() / 2.0, left - 4, metrics.height()),
+                        Qt.AlignRight | Qt.AlignVCenter, f"{hi - (hi - lo) * i / 4.0:.1f}")
+
+        x_scale = width / self.window
+        y_scale = height / (hi - lo)
+        for t, values, pen in series:
+            x = left + (t - start) * x_scale
+            y = top + (hi - values) * y_scale
+            qp.setPen(pen)
+            qp.drawPolyline(polyline(x, y))
+        qp.end()
+
+
+class StripChartPanel(QtWidgets.QWidget):
+    WINDOWS = (('1 dk', 60.0), ('5 dk', 300.0), ('30 dk', 1800.0), ('3 sa', 10800.0))
+
+    def __init__(self, parent=None, max_fps=30):
+        super().__init__(parent)
+        self.max_fps = max_fps  # repaints per second while visible
+        self.setStyleSheet("color: rgb(0, 245, 0);\n"
+                           "background-color: rgb(60, 60, 60);")
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        layout.setSpacing(2)
+        self.window_box = QtWidgets.QComboBox(self)
+        for name, _seconds in self.WINDOWS:
+            self.window_box.addItem(name)
+        self.window_box.setCurrentIndex(1)
+        self.window_box.currentIndexChanged.connect(lambda i: self.set_window(self.WINDOWS[i][1]))
+        layout.addWidget(self.window_box, 0, Qt.AlignRight)
+        self.charts = [
+            StripChart("İrtifa (m)", (('alt', "İrtifa", QColor(0, 245, 0)),), self),
+            StripChart("Hız (m/s)", (('airspeed', "Hava", QColor(0, 170, 255)),
+                                     ('groundspeed', "Yer", QColor(255, 140, 45))), self),
+            StripChart("Yönelim (°)", (('roll', "Roll", QColor(255, 255, 0)),
+                                       ('pitch', "Pitch", QColor(255, 80, 200))), self),
+            StripChart("Batarya (V)", (('battery_voltage', "Voltaj", QColor(0, 245, 0)),), self),
+            StripChart("Akım (A)", (('battery_current', "Akım", QColor(255, 80, 80)),), self),
+        ]
+        for chart in self.charts:
+            layout.addWidget(chart, 1)
+        # Charts scroll with time, so they are redrawn on a fixed clock instead of per message
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+
+    def set_store(self, store):
+        for chart in self.charts:
+            chart.store = store
+        self.refresh()
+
+    def set_window(self, seconds):
+        for chart in self.charts:
+            chart.window = seconds
+        self.refresh()
+
+    def refresh(self):
+        for chart in self.charts:
+            chart.update()
+
+    def showEvent(self, event):
+        self._timer.start(int(1000 / self.max_fps))
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
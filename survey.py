@@ -0,0 +1,111 @@
+import json
+import math
+
+import numpy as np
+
+import geodesy
+
+
+def footprint(altitude, sensor_width=13.2, sensor_height=8.8, focal_length=8.8):
+    # Ground footprint (across track, along track) in metres of a nadir camera; sensor and focal in mm
+    return altitude * sensor_width / focal_length, altitude * sensor_height / focal_length
+
+
+def geometry_polygons(geometry):
+    # [(outer ring, [hole rings])] of a Polygon/MultiPolygon geometry, [] for other types
+    if not geometry:
+        return []
+    if geometry['type'] == 'Polygon':
+        shapes = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        shapes = geometry['coordinates']
+    else:
+        return []
+    polygons = []
+    for rings in shapes:
+        # GeoJSON positions are [lon, lat]
+        rings = [[(lat, lon) for lon, lat, *_alt in ring] for ring in rings]
+        polygons.append((rings[0], rings[1:]))
+    return polygons
+
+
+def geojson_features(path):
+    # [(geometry, properties)] of a FeatureCollection, a single Feature or a bare geometry
+    with open(path) as f:
+        data = json.load(f)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    return [(feature.get('geometry', feature), feature.get('properties') or {}) for feature in features]
+
+
+def load_geojson_polygons(path):
+    # [(outer ring, [hole rings])] with rings as [(lat, lon)], from Polygon/MultiPolygon features
+    polygons = []
+    for geometry, _properties in geojson_features(path):
+        polygons.extend(geometry_polygons(geometry))
+    return polygons
+
+
+def scanline_segments(rings, spacing):
+    # Even-odd intersection of horizontal lines y = y0 + k * spacing with the rings (x/y in metres).
+    # Returns (y, x_start, x_end) arrays, one row per inside segment, sorted by line then x.
+    # Every edge against every line in one broadcast; holes fall out of the even-odd rule.
+    x1 = np.concatenate([ring[:, 0] for ring in rings])
+    y1 = np.concatenate([ring[:, 1] for ring in rings])
+    x2 = np.concatenate([np.roll(ring[:, 0], -1) for ring in rings])
+    y2 = np.concatenate([np.roll(ring[:, 1], -1) for ring in rings])
+    y_min, y_max = y1.min(), y1.max()
+    lines = np.arange(y_min + spacing / 2.0, y_max, spacing)
+    if not len(lines):
+        lines = np.array([(y_min + y_max) / 2.0])
+
+    ys, xs = [], []
+    # Chunks bound the (lines x edges) temporaries to a few MB for huge polygons
+    chunk = max(1, 4000000 // len(x1))
+    for start in range(0, len(lines), chunk):
+        y = lines[start:start + chunk, None]
+        crosses = (y1 <= y) != (y2 <= y)  # half open, a vertex on the line is counted once
+        line, edge = np.nonzero(crosses)
+        t = (lines[start + line] - y1[edge]) / (y2[edge] - y1[edge])
+        ys.append(lines[start + line])
+        xs.append(x1[edge] + t * (x2[edge] - x1[edge]))
+    ys = np.concatenate(ys)
+    xs = np.concatenate(xs)
+    order = np.lexsort((xs, ys))
+    ys, xs = ys[order], xs[order]
+    # Closed rings cross every line an even number of times, so inside spans are consecutive pairs
+    return ys[0::2], xs[0::2], xs[1::2]
+
+
+def lawnmower(outer, holes=(), spacing=50.0, angle=0.0, overshoot=0.0):
+    # Boustrophedon coverage of a polygon: (lat, lon) arrays of the turn points, in flight order.
+    # angle is the track direction in degrees from north; overshoot extends every pass for the turn.
+    if not spacing > 0:
+        raise ValueError(f"Hat aralığı pozitif olmalı: {spacing}")
+    lat0 = float(np.mean([p[0] for p in outer]))
+    lon0 = float(np.mean([p[1] for p in outer]))
+    theta = math.radians(90.0 - angle)  # track along the rotated x axis
+    cos_t, sin_t = math.cos(theta), math.sin(theta)
+    rings = []
+    for ring in [outer] + list(holes):
+        ring = np.asarray(ring, dtype=float)
+        east, north = geodesy.to_local(ring[:, 0], ring[:, 1], lat0, lon0)
+        rings.append(np.column_stack((east * cos_t + north * sin_t, -east * sin_t + north * cos_t)))
+
+    y, x_start, x_end = scanline_segments(rings, spacing)
+    if not len(y):
+        return np.empty(0), np.empty(0)
+    x_start = x_start - overshoot
+    x_end = x_end + overshoot
+    # Every other line is flown backwards: swap the ends and reverse the order of its segments
+    line = np.searchsorted(np.unique(y), y)
+    backwards = line % 2 == 1
+    order = np.lexsort((np.where(backwards, -x_start, x_start), line))
+    y, x_start, x_end, backwards = y[order], x_start[order], x_end[order], backwards[order]
+    first = np.where(backwards, x_end, x_start)
+    second = np.where(backwards, x_start, x_end)
+    x = np.column_stack((first, second)).ravel()
+    y = np.repeat(y, 2)
+
+    east = x * cos_t - y * sin_t
+    north = x * sin_t + y * cos_t
+    return geodesy.from_local(east, north, lat0, lon0)
@@ -0,0 +1,44 @@
+import collections
+
+from pymavlink import mavutil
+
+
+# Same attribute names as the dronekit objects, so the HUD code works with both
+Attitude = collections.namedtuple('Attitude', 'pitch yaw roll')
+LocationGlobal = collections.namedtuple('LocationGlobal', 'lat lon alt')
+LocationGlobalRelative = collections.namedtuple('LocationGlobalRelative', 'lat lon alt')
+Battery = collections.namedtuple('Battery', 'voltage current level')
+GPSInfo = collections.namedtuple('GPSInfo', 'eph epv fix_type satellites_visible')
+VehicleMode = collections.namedtuple('VehicleMode', 'name')
+
+# Message types that change something on the HUD
+HUD_MESSAGES = ('HEARTBEAT', 'SYS_STATUS', 'GPS_RAW_INT', 'ATTITUDE', 'GLOBAL_POSITION_INT', 'VFR_HUD',
+                'HOME_POSITION')
+HUD_MESSAGE_IDS = frozenset(getattr(mavutil.mavlink, 'MAVLINK_MSG_ID_' + name) for name in HUD_MESSAGES)
+
+
+def message_to_data(msg):
+    # Converts one MAVLink message into the data dict DataFetcher emits ({} if irrelevant)
+    msg_type = msg.get_type()
+    if msg_type == 'ATTITUDE':
+        return {'attitude': Attitude(msg.pitch, msg.yaw, msg.roll)}
+    if msg_type == 'GLOBAL_POSITION_INT':
+        lat, lon = msg.lat / 1.0e7, msg.lon / 1.0e7
+        return {'location': LocationGlobalRelative(lat, lon, msg.relative_alt / 1000.0),
+                'current_location': LocationGlobal(lat, lon, msg.alt / 1000.0)}
+    if msg_type == 'VFR_HUD':
+        return {'groundspeed': msg.groundspeed, 'airspeed': msg.airspeed}
+    if msg_type == 'SYS_STATUS':
+        current = msg.current_battery / 100.0 if msg.current_battery != -1 else None
+        level = msg.battery_remaining if msg.battery_remaining != -1 else None
+        return {'battery': Battery(msg.voltage_battery / 1000.0, current, level)}
+    if msg_type == 'GPS_RAW_INT':
+        return {'gps': GPSInfo(msg.eph, msg.epv, msg.fix_type, msg.satellites_visible)}
+    if msg_type == 'HOME_POSITION':
+        return {'home_location': LocationGlobal(msg.latitude / 1.0e7, msg.longitude / 1.0e7, msg.altitude / 1000.0)}
+    if msg_type == 'HEARTBEAT':
+        if msg.type == mavutil.mavlink.MAV_TYPE_GCS or msg.autopilot == mavutil.mavlink.MAV_AUTOPILOT_INVALID:
+            return {}
+        return {'mode': VehicleMode(mavutil.mode_string_v10(msg)),
+                'armed': bool(msg.base_mode & mavutil.mavlink.MAV_MODE_FLAG_SAFETY_ARMED)}
+    return {}
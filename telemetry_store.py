@@ -0,0 +1,143 @@
+import math
+import time
+
+import numpy as np
+
+
+# telemetry key -> (channel, field getter) pairs stored for plotting
+CHANNELS = {
+    'location': (('alt', lambda location: location.alt),),
+    'airspeed': (('airspeed', lambda airspeed: airspeed),),
+    'groundspeed': (('groundspeed', lambda groundspeed: groundspeed),),
+    'attitude': (('roll', lambda attitude: math.degrees(attitude.roll)),
+                 ('pitch', lambda attitude: math.degrees(attitude.pitch)),
+                 ('yaw', lambda attitude: math.degrees(attitude.yaw))),
+    'battery': (('battery_voltage', lambda battery: battery.voltage),
+                ('battery_current', lambda battery: battery.current),
+                ('battery_level', lambda battery: battery.level)),
+    'gps': (('gps_sats', lambda gps: gps.satellites_visible),),
+}
+CHANNEL_NAMES = tuple(channel for fields in CHANNELS.values() for channel, _getter in fields)
+
+
+def minmax_decimate(t, v, max_points, first_index=0):
+    # Keeps the min and the max of every bucket in time order (M4 without first/last), so spikes
+    # survive any zoom level. first_index is the absolute sample number of t[0]: buckets are aligned
+    # to it and stay put while new samples scroll in, instead of flickering every frame.
+    n = len(v)
+    if n <= max_points or max_points < 2:
+        return t, v
+    k = -(-n // (max_points // 2))  # samples per bucket
+    skip = (-first_index) % k
+    buckets = (n - skip) // k
+    if buckets <= 0:
+        return t, v
+    block = v[skip:skip + buckets * k].reshape(buckets, k)
+    lo = block.argmin(axis=1)
+    hi = block.argmax(axis=1)
+    base = np.arange(buckets) * k + skip
+    index = np.empty(2 * buckets, dtype=np.intp)
+    index[0::2] = base + np.minimum(lo, hi)
+    index[1::2] = base + np.maximum(lo, hi)
+    # Partial buckets at both ends get their min and max too
+    index = np.concatenate((_minmax_index(v, 0, skip), index, _minmax_index(v, skip + buckets * k, n)))
+    return t[index], v[index]
+
+
+def _minmax_index(v, lo, hi):
+    if hi - lo <= 2:
+        return np.arange(lo, hi)
+    a = lo + int(v[lo:hi].argmin())
+    b = lo + int(v[lo:hi].argmax())
+    return np.array(sorted({a, b}), dtype=np.intp)
+
+
+class ChannelBuffer(object):
+    # Fixed size ring of (time, value); one writer thread, readers may run on any thread
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.v = np.zeros(capacity, dtype=np.float32)
+        self.total = 0  # samples ever appended, the write position is total % capacity
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def append(self, timestamp, value):
+        i = self.total % self.capacity
+        self.t[i] = timestamp
+        self.v[i] = value
+        self.total += 1  # published last, a reader never sees a half written sample
+
+    def last(self):
+        if not self.total:
+            return None
+        i = (self.total - 1) % self.capacity
+        return self.t[i], self.v[i]
+
+    def window(self, start=None, end=None):
+        # Samples with start <= t <= end in time order as (t, v, absolute index of the first sample)
+        total = self.total
+        n = min(total, self.capacity)
+        head = total % self.capacity
+        if total <= self.capacity:
+            segments = ((0, n),)
+        else:
+            segments = ((head, self.capacity), (0, head))
+        ts, vs = [], []
+        first_index = None
+        absolute = total - n
+        for lo, hi in segments:
+            t = self.t[lo:hi]
+            a = 0 if start is None else int(np.searchsorted(t, start, 'left'))
+            b = len(t) if end is None else int(np.searchsorted(t, end, 'right'))
+            if b > a:
+                if first_index is None:
+                    first_index = absolute + a
+                ts.append(t[a:b])
+                vs.append(self.v[lo + a:lo + b])
+            absolute += hi - lo
+        if not ts:
+            return np.empty(0), np.empty(0, dtype=np.float32), total
+        if len(ts) == 1:
+            return ts[0].copy(), vs[0].copy(), first_index
+        return np.concatenate(ts), np.concatenate(vs), first_index
+
+
+class TelemetryStore(object):
+    # Columnar history of the plotted channels; memory is fixed at capacity samples per channel
+    def __init__(self, capacity=1 << 18, channels=CHANNEL_NAMES):
+        self.capacity = capacity  # 262144 samples = ~3 h of 25 Hz attitude, ~3 MB per channel
+        self.channels = {name: ChannelBuffer(capacity) for name in channels}
+        self.clock = time.monotonic  # the timestamps' "now"; a replay's store runs on the log's clock
+
+    def append(self, data, timestamp=None):
+        # data: telemetry dict (or delta) as emitted by DataFetcher
+        if timestamp is None:
+            timestamp = time.monotonic()
+        for key, value in data.items():
+            self.record(key, value, timestamp)
+
+    def record(self, key, value, timestamp=None):
+        fields = CHANNELS.get(key)
+        if fields is None or value is None:
+            return
+        if timestamp is None:
+            timestamp = time.monotonic()
+        for channel, getter in fields:
+            buffer = self.channels.get(channel)
+            sample = getter(value)
+            if buffer is not None and sample is not None:
+                buffer.append(timestamp, sample)
+
+    def read(self, channel, start=None, end=None, max_points=2000):
+        # Decimated (t, v) arrays of one channel, at most about max_points long
+        t, v, first_index = self.channels[channel].window(start, end)
+        return minmax_decimate(t, v, max_points, first_index)
+
+    def last(self, channel):
+        return self.channels[channel].last()
+
+    def clear(self):
+        for buffer in self.channels.values():
+            buffer.total = 0
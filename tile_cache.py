@@ -0,0 +1,203 @@
+import argparse
+import concurrent.futures
+import math
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.gcs', 'tiles.mbtiles')
+DEFAULT_URL = 'https://tile.openstreetmap.org/{z}/{x}/{y}.png'  # viewing only, see NO_BULK_HOSTS
+# Servers whose usage policy forbids bulk downloading; prefetch() refuses them and needs its own url
+NO_BULK_HOSTS = ('tile.openstreetmap.org',)
+USER_AGENT = 'GCS tile cache (https://github.com/bilalerg/GCS)'
+
+
+def tile_xy(lat, lon, zoom):
+    # Slippy map (XYZ) tile containing the point
+    n = 1 << zoom
+    lat = max(-85.0511, min(85.0511, lat))
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bbox(south, west, north, east, min_zoom, max_zoom):
+    for zoom in range(min_zoom, max_zoom + 1):
+        x0, y0 = tile_xy(north, west, zoom)
+        x1, y1 = tile_xy(south, east, zoom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield zoom, x, y
+
+
+class TileCache(object):
+    # MBTiles (SQLite) file of map tiles. Misses are fetched from url and stored; once the file grows
+    # past max_bytes the least recently served tiles are evicted. tile_row is TMS (y flipped) per the spec.
+    def __init__(self, path=DEFAULT_PATH, url=DEFAULT_URL, max_bytes=2 * 1024 ** 3, timeout=5.0):
+        self.path = path
+        self.url = url  # None = offline only, misses are never fetched
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.retry_after = 30.0  # seconds without upstream requests after a failed fetch
+        self._offline_until = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection shared by Flask's request threads and the prefetcher, serialized by a lock
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, '
+                             'tile_row INTEGER, tile_data BLOB, last_access REAL, '
+                             'PRIMARY KEY (zoom_level, tile_column, tile_row))')
+            self._db.execute('CREATE INDEX IF NOT EXISTS tiles_last_access ON tiles (last_access)')
+            self._db.execute("INSERT OR IGNORE INTO metadata VALUES ('name', 'GCS'), ('format', 'png')")
+            self.size = self._db.execute('SELECT COALESCE(SUM(LENGTH(tile_data)), 0) FROM tiles').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _row(zoom, y):
+        return (1 << zoom) - 1 - y
+
+    def get(self, zoom, x, y, fetch=True):
+        # PNG bytes, None when the tile is neither cached nor reachable
+        row = self._row(zoom, y)
+        with self._lock:
+            found = self._db.execute('SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+                                     (zoom, x, row)).fetchone()
+            if found is not None:
+                self._db.execute('UPDATE tiles SET last_access=? WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+                                 (time.time(), zoom, x, row))
+                self.hits += 1
+                return found[0]
+        self.misses += 1
+        # Without a network every miss would wait for the timeout, so failures pause upstream requests
+        if not fetch or time.monotonic() < self._offline_until:
+            return None
+        data = self.fetch(zoom, x, y)
+        if data is None:
+            self._offline_until = time.monotonic() + self.retry_after
+        else:
+            self.put([(zoom, x, y, data)])
+        return data
+
+    def contains(self, zoom, x, y):
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+                                    (zoom, x, self._row(zoom, y))).fetchone() is not None
+
+    def fetch(self, zoom, x, y):
+        if self.url is None:
+            return None
+        request = urllib.request.Request(self.url.format(z=zoom, x=x, y=y), headers={'User-Agent': USER_AGENT})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read()
+        except OSError:
+            return None  # offline, DNS failure, HTTP error: the map shows an empty tile
+
+    def put(self, tiles):
+        # tiles: [(zoom, x, y, data)], written in one transaction
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN')
+            for zoom, x, y, data in tiles:
+                row = self._row(zoom, y)
+                old = self._db.execute('SELECT LENGTH(tile_data) FROM tiles WHERE zoom_level=? AND tile_column=? '
+                                       'AND tile_row=?', (zoom, x, row)).fetchone()
+                self._db.execute('INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?)',
+                                 (zoom, x, row, sqlite3.Binary(data), now))
+                self.size += len(data) - (old[0] if old else 0)
+            self._db.execute('COMMIT')
+            if self.size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Oldest last_access first, down to 90 % of max_bytes so eviction does not run on every insert
+        target = self.max_bytes * 0.9
+        while self.size > target:
+            rows = self._db.execute('SELECT zoom_level, tile_column, tile_row, LENGTH(tile_data) FROM tiles '
+                                    'ORDER BY last_access LIMIT 256').fetchall()
+            if not rows:
+                self.size = 0
+                break
+            self._db.execute('BEGIN')
+            for zoom, column, row, length in rows:
+                self._db.execute('DELETE FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?',
+                                 (zoom, column, row))
+                self.size -= length
+            self._db.execute('COMMIT')
+
+    def prefetch(self, south, west, north, east, min_zoom=10, max_zoom=17, workers=4, max_tiles=50000,
+                 progress=None, cancel=None):
+        # Downloads every missing tile of the box; returns (fetched, failed). Only from a url set for
+        # it: tile servers limit bulk downloads and OSM allows none.
+        check_prefetch_url(self.url)
+        tiles = [tile for tile in tiles_in_bbox(south, west, north, east, min_zoom, max_zoom)
+                 if not self.contains(*tile)]
+        if len(tiles) > max_tiles:
+            raise ValueError(f"{len(tiles)} karo, sınır {max_tiles}: alanı ya da yakınlaştırmayı küçültün")
+        fetched = failed = 0
+        batch = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(self.fetch, *tile): tile for tile in tiles}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                data = future.result()
+                if data is None:
+                    failed += 1
+                else:
+                    batch.append(futures[future] + (data,))
+                    fetched += 1
+                if len(batch) >= 64:
+                    self.put(batch)
+                    batch = []
+                if progress is not None:
+                    progress(done, len(tiles))
+                if cancel is not None and cancel.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    break
+        if batch:
+            self.put(batch)
+        return fetched, failed
+
+
+def check_prefetch_url(url):
+    # ValueError unless url is a tile server that may be bulk downloaded from
+    if not url:
+        raise ValueError("toplu indirme için karo sunucusu adresi ayarlanmamış")
+    host = (urllib.parse.urlsplit(url).hostname or '').lower()
+    if any(host == blocked or host.endswith('.' + blocked) for blocked in NO_BULK_HOSTS):
+        raise ValueError(f"{host} toplu indirmeye izin vermiyor, başka bir karo sunucusu kullanın")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Uçuş öncesi harita karolarını önbelleğe indir")
+    parser.add_argument('--bbox', nargs=4, type=float, metavar=('GUNEY', 'BATI', 'KUZEY', 'DOGU'), required=True)
+    parser.add_argument('--zoom', nargs=2, type=int, metavar=('MIN', 'MAX'), default=(10, 17))
+    parser.add_argument('--path', default=DEFAULT_PATH)
+    parser.add_argument('--url', required=True,
+                        help="toplu indirmeye izin veren karo sunucusu, ör. https://karo.example.com/{z}/{x}/{y}.png "
+                             "(tile.openstreetmap.org kabul edilmez)")
+    args = parser.parse_args()
+    try:
+        check_prefetch_url(args.url)
+    except ValueError as e:
+        parser.error(str(e))
+    cache = TileCache(args.path, args.url)
+    result = cache.prefetch(*args.bbox, min_zoom=args.zoom[0], max_zoom=args.zoom[1],
+                            progress=lambda done, total: print(f"\r{done}/{total}", end='', flush=True))
+    print(f"\nindirilen: {result[0]}, başarısız: {result[1]}, önbellek: {cache.size / 1024 ** 2:.1f} MB")
+    cache.close()